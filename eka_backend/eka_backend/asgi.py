@@ -2,6 +2,8 @@
 ASGI config for eka_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Gunicorn serves it with uvicorn workers when ASYNC_VIEWS=True is set in the
+environment (see gunicorn.conf.py); the default deployment stays on WSGI.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +14,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eka_backend.settings')
+# Route the I/O-heavy endpoints to their async views (see users.async_views).
+os.environ.setdefault('ASYNC_VIEWS', 'True')
 
 application = get_asgi_application()
@@ -34,6 +34,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so request timings cover every other middleware (users.metrics).
+    'users.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -63,6 +65,12 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'eka_backend.wsgi.application'
 
+# Serve TrailsAPI, VehicleAnalysisAPI, ReportsAPI and the health check with async views
+# (users.async_views). Off by default: the deployment runs WSGI. Setting it in the environment
+# also makes gunicorn serve the ASGI app (gunicorn.conf.py); eka_backend.asgi turns it on for
+# any other ASGI server.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
+
 
 # --- THIS IS THE CRITICAL FIX ---
 # Database configuration now reads from environment variables.
@@ -74,9 +82,42 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': os.environ.get('DB_PORT'),
+        # Seconds a connection is reused across requests (0 closes it after each request). Under
+        # ASGI every request runs in its own thread and can't reuse it, so the default there is 0
+        # and every request opens a new Postgres connection: only run ASYNC_VIEWS=True with DB_HOST
+        # on PgBouncer (DB_POOL_MODE=transaction). The deployments set it explicitly.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0 if ASYNC_VIEWS else 60)),
+        # Ping reused connections before the first query of a request, so a dropped one is replaced.
+        'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        # 'transaction' when DB_HOST is a transaction-pooling proxy (PgBouncer pool_mode=transaction):
+        # a server-side cursor can't outlive the transaction it was opened in there.
+        'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_POOL_MODE', 'session') == 'transaction',
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+            'sslmode': os.environ.get('DB_SSLMODE', 'prefer'),
+        },
     }
 }
 
+# Read replicas (users.replicas): comma-separated host[:port] list, same credentials as DB_HOST.
+# Views with ReplicaReadsMixin read from them unless the user wrote within REPLICA_STICKY_SECONDS
+# or the replica is more than REPLICA_MAX_LAG_SECONDS behind (checked every REPLICA_LAG_CHECK_SECONDS).
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    replica_host, _, replica_port = replica.strip().partition(':')
+    DATABASES[f'replica{index}'] = {
+        **DATABASES['default'],
+        'HOST': replica_host,
+        'PORT': replica_port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+REPLICA_DATABASES = [alias for alias in DATABASES if alias != 'default']
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 15))
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_LAG_CHECK_SECONDS = float(os.environ.get('REPLICA_LAG_CHECK_SECONDS', 5))
+if REPLICA_DATABASES:
+    DATABASE_ROUTERS = ['users.replicas.ReplicaRouter']
+    MIDDLEWARE.append('users.replicas.ReplicaStickinessMiddleware')
+
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -98,15 +139,106 @@ USE_TZ = True
 STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache: per-process local memory by default, which is only correct with a single worker
+# process. Writes invalidate cached responses by bumping versions in this cache, so with
+# several workers or pods each one would keep serving its own stale copies: set CACHE_URL
+# (e.g. redis://redis:6379/1, needs the `redis` package) to share responses and versions.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+if os.environ.get('CACHE_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['CACHE_URL'],
+    }
+# Upper bound on how long cached responses and filter lists live; model signals invalidate them sooner.
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 900))
+
 # Django REST Framework settings
+# JWT authentication (users.authentication): 'claims' trusts the user claims signed into access
+# tokens and never queries users, 'cached' looks users up through a short-TTL per-process cache,
+# 'db' queries on every request.
+JWT_AUTH_MODE = os.environ.get('JWT_AUTH_MODE', 'claims')
+JWT_AUTHENTICATION_CLASSES = {
+    'claims': 'users.authentication.ClaimsJWTAuthentication',
+    'cached': 'users.authentication.CachedJWTAuthentication',
+    'db': 'rest_framework_simplejwt.authentication.JWTAuthentication',
+}
+# Seconds a user looked up by CachedJWTAuthentication is reused (saves in this process drop it at once).
+USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        JWT_AUTHENTICATION_CLASSES[JWT_AUTH_MODE],
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
 
+SIMPLE_JWT = {
+    # Refreshing re-reads the user so the claims in new access tokens stay current.
+    'TOKEN_REFRESH_SERIALIZER': 'users.serializers.UserTokenRefreshSerializer',
+}
+
+# Login password checks (users.login_pool): concurrent hashes per process, logins allowed to wait
+# behind them, the longest a login may wait to start, and the Retry-After sent when refused.
+LOGIN_POOL_WORKERS = int(os.environ.get('LOGIN_POOL_WORKERS', 2))
+LOGIN_POOL_QUEUE = int(os.environ.get('LOGIN_POOL_QUEUE', 16))
+LOGIN_POOL_MAX_WAIT_SECONDS = float(os.environ.get('LOGIN_POOL_MAX_WAIT_SECONDS', 5))
+LOGIN_RETRY_AFTER_SECONDS = int(os.environ.get('LOGIN_RETRY_AFTER_SECONDS', 2))
+
+# In-memory refresh-token blacklist filter (users.blacklist), only used with a shared CACHE_URL:
+# seconds between looks at the revocation announcements of other processes (the longest a token
+# revoked elsewhere can still be refreshed here), between top-ups from the database regardless,
+# and between full rebuilds.
+BLACKLIST_FILTER_VERSION_CHECK_SECONDS = float(os.environ.get('BLACKLIST_FILTER_VERSION_CHECK_SECONDS', 1))
+BLACKLIST_FILTER_REFRESH_SECONDS = float(os.environ.get('BLACKLIST_FILTER_REFRESH_SECONDS', 5))
+BLACKLIST_FILTER_REBUILD_SECONDS = float(os.environ.get('BLACKLIST_FILTER_REBUILD_SECONDS', 3600))
+
+# Telemetry ingestion: maximum rows per section in one request, and rows per INSERT statement.
+TELEMETRY_INGEST_MAX_BATCH = int(os.environ.get('TELEMETRY_INGEST_MAX_BATCH', 20000))
+TELEMETRY_INGEST_INSERT_BATCH = int(os.environ.get('TELEMETRY_INGEST_INSERT_BATCH', 2000))
+
+# Days of trail data kept by `manage.py trail_partitions` (0 keeps everything).
+TRAIL_RETENTION_DAYS = int(os.environ.get('TRAIL_RETENTION_DAYS', 0))
+
+# Seconds a simplified trail path stays cached (new points for that day invalidate it earlier).
+TRAIL_CACHE_TIMEOUT = int(os.environ.get('TRAIL_CACHE_TIMEOUT', 3600))
+# Seconds a downsampled (max_points) chart response stays cached.
+CHART_CACHE_TIMEOUT = int(os.environ.get('CHART_CACHE_TIMEOUT', 3600))
+
+# Telemetry rollups (users.rollups): assumptions used to turn trail points into dashboard totals.
+ROLLUP_BATCH_SIZE = int(os.environ.get('ROLLUP_BATCH_SIZE', 5000))
+ROLLUP_SAMPLE_INTERVAL_SECONDS = float(os.environ.get('ROLLUP_SAMPLE_INTERVAL_SECONDS', 5))
+ROLLUP_BATTERY_CAPACITY_KWH = float(os.environ.get('ROLLUP_BATTERY_CAPACITY_KWH', 250))
+ROLLUP_CO2_SAVINGS_KG_PER_KM = float(os.environ.get('ROLLUP_CO2_SAVINGS_KG_PER_KM', 1.3))
+
+# Live vehicle stream (/api/vehicle-stream/, ASGI only): how often each worker polls Vehicle for
+# changes, keep-alive interval, and how long one stream lasts before the client reconnects.
+VEHICLE_STREAM_POLL_SECONDS = float(os.environ.get('VEHICLE_STREAM_POLL_SECONDS', 1))
+VEHICLE_STREAM_HEARTBEAT_SECONDS = float(os.environ.get('VEHICLE_STREAM_HEARTBEAT_SECONDS', 15))
+VEHICLE_STREAM_MAX_SECONDS = float(os.environ.get('VEHICLE_STREAM_MAX_SECONDS', 300))
+VEHICLE_STREAM_RETRY_MS = int(os.environ.get('VEHICLE_STREAM_RETRY_MS', 2000))
+# Seconds a stream ticket (POST /api/vehicle-stream/ticket/) can be used to open the stream, once.
+STREAM_TICKET_TTL = int(os.environ.get('STREAM_TICKET_TTL', 30))
+
+# Request metrics (/api/metrics/, users.metrics). Set METRICS_DIR to a directory private to the
+# pod (e.g. an emptyDir) when running several gunicorn workers so a scrape covers all of them.
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+# Bearer token the scraper sends to /api/metrics/ (users.permissions.HasMetricsToken). Unset, the
+# endpoint refuses every request.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN') or None
+
+# Slow query log (users.slow_queries): queries taking at least SLOW_QUERY_MS are stored with their
+# plan (0 turns it off; EXPLAIN ANALYZE runs the query again, so enable it for investigations).
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+SLOW_QUERY_LOG_SIZE = int(os.environ.get('SLOW_QUERY_LOG_SIZE', 200))
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.environ.get('SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS', 60))
+
 # Custom User Model
 AUTH_USER_MODEL = 'users.User'
\ No newline at end of file
@@ -0,0 +1,51 @@
+"""
+Gunicorn settings, picked up automatically from the working directory (/app).
+
+Serves the WSGI app on threaded (gthread) workers. ASYNC_VIEWS=True serves
+the ASGI app on uvicorn workers instead, with the async views and the live
+vehicle stream (users.async_views).
+
+The application is imported once in the master and shared by the forked
+workers; each worker warms up before it serves (see users.warmup).
+"""
+import logging
+import os
+
+if os.environ.get('ASYNC_VIEWS', 'False') == 'True':
+    wsgi_app = 'eka_backend.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'eka_backend.wsgi:application'
+    worker_class = 'gthread'
+    # Requests served at once per worker. Logins wait on users.login_pool, which hashes at most
+    # LOGIN_POOL_WORKERS at a time and refuses (429) beyond LOGIN_POOL_QUEUE more, so a login burst
+    # holds at most their sum of these threads and the rest keep serving other requests. Each
+    # thread keeps its own database connection (DB_CONN_MAX_AGE).
+    threads = int(os.environ.get('GUNICORN_THREADS', 32))
+
+preload_app = True
+
+logger = logging.getLogger('gunicorn.error')
+
+
+def when_ready(server):
+    # Runs in the master before the first fork.
+    from django.conf import settings
+    from users import warmup
+    if server.cfg.workers > 1 and settings.CACHES['default']['BACKEND'].endswith('LocMemCache'):
+        logger.warning('%d workers share no cache: set CACHE_URL, or writes in one worker leave the others '
+                       'serving stale responses.', server.cfg.workers)
+    login_threads = settings.LOGIN_POOL_WORKERS + settings.LOGIN_POOL_QUEUE
+    if server.cfg.worker_class_str == 'gthread' and server.cfg.threads <= login_threads:
+        logger.warning('%d threads per worker but logins may hold %d: raise GUNICORN_THREADS or a login burst '
+                       'blocks every other request.', server.cfg.threads, login_threads)
+    warmup.preload()
+
+
+def post_worker_init(worker):
+    from users import warmup
+    try:
+        warmup.warm_up()
+    except Exception:
+        # Serve anyway; /api/ready/ stays 503 and retries the warmup in the background.
+        logger.exception('Worker %s failed to warm up', worker.pid)
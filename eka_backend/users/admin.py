@@ -1,3 +1,18 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import SlowQuery
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    """The slow query log (users.slow_queries), read-only."""
+    list_display = ('created_at', 'duration_ms', 'database', 'view', 'location')
+    list_filter = ('database',)
+    search_fields = ('view', 'location', 'sql')
+    readonly_fields = ('created_at', 'duration_ms', 'database', 'view', 'location', 'sql', 'plan')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,194 @@
+"""
+Async twins of the I/O-heavy endpoints, served when the app runs under ASGI
+(settings.ASYNC_VIEWS, switched on by eka_backend.asgi).
+
+Each view subclasses its synchronous counterpart and reuses its parameter
+parsing and response building; only the database and cache round trips are
+awaited (async ORM / async cache API), so a slow trail or chart query parks a
+coroutine instead of a whole worker. DRF 3.14 has no async dispatch, so
+AsyncAPIView supplies one: authentication and permission checks still run
+through DRF, in a pool thread since the JWT user lookup may hit the database.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import close_old_connections
+from django.http import Http404, StreamingHttpResponse
+from rest_framework import permissions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import availability, downsampling, exports, live
+from .authentication import StreamTicketAuthentication
+from .cache import FILTERS, aget_or_build, aversioned_key, chart_namespace, trail_namespace
+from .login_pool import LoginPoolSaturated, login_pool
+from .models import VehicleChartData
+from .pagination import ReportKeysetPagination
+from .renderers import EventStreamRenderer
+from .replicas import primary_reads
+from .serializers import VehicleChartDataSerializer
+from .views import HealthCheckAPI, LoginAPI, ReportsAPI, TrailsAPI, VehicleAnalysisAPI
+
+
+class AsyncAPIView(APIView):
+    """APIView whose handlers are coroutines."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        try:
+            # Not thread-sensitive: the shared sync thread would queue every request's auth behind each other.
+            await sync_to_async(self._initial, thread_sensitive=False)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            # options() and http_method_not_allowed() stay synchronous.
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    def _initial(self, request, *args, **kwargs):
+        try:
+            self.initial(request, *args, **kwargs)
+        finally:
+            # request_finished only cleans up the connections of the shared sync thread.
+            close_old_connections()
+
+
+async def aget_object_or_404(queryset, **filters):
+    """Async version of rest_framework.generics.get_object_or_404."""
+    try:
+        return await queryset.aget(**filters)
+    except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+        raise Http404
+
+
+class AsyncHealthCheckAPI(AsyncAPIView, HealthCheckAPI):
+    async def get(self, request, *args, **kwargs):
+        return Response({"status": "ok"}, status=status.HTTP_200_OK)
+
+
+class AsyncLoginAPI(AsyncAPIView, LoginAPI):
+    async def post(self, request, *args, **kwargs):
+        try:
+            user = await login_pool.aauthenticate(username=request.data.get('email'),
+                                                  password=request.data.get('password'))
+        except LoginPoolSaturated:
+            return self._saturated()
+        # Issuing the refresh token records it in the outstanding-token table.
+        return await sync_to_async(self._login_response)(user)
+
+
+class AsyncVehicleAnalysisAPI(AsyncAPIView, VehicleAnalysisAPI):
+    async def get(self, request, *args, **kwargs):
+        if 'fetch_filters' in request.query_params or not request.query_params:
+            return Response({"filters": await availability.achart_filters()})
+        params = self._chart_params(request.query_params)
+        if isinstance(params, Response):
+            return params
+        reg_id, date, max_points = params
+        charts_qs = VehicleChartData.objects.all()
+        if max_points is None:
+            chart_data = await aget_object_or_404(charts_qs, registration_id=reg_id, date=date)
+            return Response({"charts": VehicleChartDataSerializer(chart_data).data})
+        key = await aversioned_key(chart_namespace(reg_id, date), max_points)
+        charts = await cache.aget(key)
+        if charts is None:
+            with primary_reads():
+                chart_data = await aget_object_or_404(charts_qs, registration_id=reg_id, date=date)
+            charts = downsampling.downsample_charts(VehicleChartDataSerializer(chart_data).data, max_points)
+            await cache.aset(key, charts, timeout=settings.CHART_CACHE_TIMEOUT)
+        return Response({"charts": charts})
+
+
+class AsyncTrailsAPI(AsyncAPIView, TrailsAPI):
+    async def get(self, request, *args, **kwargs):
+        if 'fetch_filters' in request.query_params or not request.query_params:
+            return Response({"filters": await availability.atrail_filters()})
+        params = self._trail_params(request.query_params)
+        if isinstance(params, Response):
+            return params
+        vehicle_id, date, level = params
+        if level is None:
+            data = await self._atrail(vehicle_id, date, None)
+        else:
+            key = await aversioned_key(trail_namespace(vehicle_id, date), *level)
+            data = await cache.aget(key)
+            if data is None:
+                with primary_reads():
+                    data = await self._atrail(vehicle_id, date, level)
+                if data is not None:
+                    await cache.aset(key, data, timeout=settings.TRAIL_CACHE_TIMEOUT)
+        if data is None:
+            return self._not_found()
+        return Response(data)
+
+    async def _atrail(self, vehicle_id, date, level):
+        trail_points = self._trail_points(vehicle_id, date)
+        first_point = await trail_points.only('metrics', 'ecu_data').afirst()
+        if not first_point:
+            return None
+        path = [point async for point in trail_points.values_list('coordinates', flat=True)]
+        if level is None:
+            return self._trail_data(first_point, path, None)
+        # Simplifying a long path is CPU work; keep it off the event loop.
+        return await sync_to_async(self._trail_data, thread_sensitive=False)(first_point, path, level)
+
+
+class AsyncReportsAPI(AsyncAPIView, ReportsAPI):
+    async def get(self, request, *args, **kwargs):
+        if 'fetch_filters' in request.query_params:
+            return Response(await aget_or_build(FILTERS, 'reports', self._afilter_options))
+        if 'export' in request.query_params:
+            return self._aexport(request.query_params['export'])
+        if 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor':
+            self.pagination_class = ReportKeysetPagination
+        page = await self.paginator.apaginate_queryset(self.get_rows_queryset(), request, view=self)
+        return self.get_paginated_response(self.format_page(page))
+
+    async def _afilter_options(self):
+        results = []
+        for queryset in self._filter_querysets():
+            results.append([row async for row in queryset])
+        return self._filter_options(*results)
+
+    def _aexport(self, export_format):
+        if export_format not in exports.EXPORT_FORMATS:
+            return Response({'error': f"export must be one of: {', '.join(exports.EXPORT_FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        rows = exports.areport_rows(self.get_queryset())
+        response = StreamingHttpResponse(exports.astream(export_format, rows),
+                                         content_type=exports.EXPORT_FORMATS[export_format][0])
+        response['Content-Disposition'] = f'attachment; filename="reports.{export_format}"'
+        return response
+
+
+class VehicleStateStreamAPI(AsyncAPIView):
+    """
+    Server-Sent Events push of live Vehicle state: a snapshot on connect,
+    then only the changed fields. `fleet_type` narrows it like
+    VehicleSelectionAPI, which remains the polling fallback. Browsers pass
+    a `?ticket=` from POST /api/vehicle-stream/ticket/ (StreamTicketAPI).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [StreamTicketAuthentication]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+    async def get(self, request, *args, **kwargs):
+        events = live.vehicle_events(request.query_params.get('fleet_type'))
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Stop nginx-style proxies from buffering the stream.
+        response['X-Accel-Buffering'] = 'no'
+        return response
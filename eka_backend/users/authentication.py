@@ -0,0 +1,142 @@
+"""
+JWT authentication without a user query per request.
+
+Access tokens issued through UserRefreshToken carry signed user claims
+(email, role, username, is_staff, is_superuser). ClaimsJWTAuthentication
+trusts them and hands views a ClaimsUser built from the token, so reads never
+touch the users table. Claims are re-read from the database whenever a
+refresh token is exchanged (UserTokenRefreshSerializer), so changes reach
+clients within one access-token lifetime. Refresh tokens check the
+blacklist through the in-memory filter in users.blacklist first.
+
+Tokens issued before the claims existed fall back to CachedJWTAuthentication:
+the normal lookup, memoised per process for USER_CACHE_TTL seconds and
+dropped when the user is saved or deleted (users.signals).
+"""
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .blacklist import announce_revocation, blacklist_filter
+
+USER_CLAIMS = ('email', 'role', 'username', 'is_staff', 'is_superuser')
+
+
+def set_user_claims(token, user):
+    for claim in USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+
+
+class UserRefreshToken(RefreshToken):
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        set_user_claims(token, user)
+        return token
+
+    def check_blacklist(self):
+        # Most tokens were never revoked; the Bloom filter proves that without a query.
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_filter.add(self.payload[api_settings.JTI_CLAIM])
+        transaction.on_commit(announce_revocation)
+        return result
+
+
+class ClaimsUser(TokenUser):
+    """request.user for claims-authenticated requests; views needing the model instance load it by pk."""
+    @property
+    def email(self):
+        return self.token['email']
+
+    @property
+    def role(self):
+        return self.token['role']
+
+
+class UserCache:
+    """Per-process {user id: user} with a TTL, so a change elsewhere is seen within USER_CACHE_TTL."""
+    def __init__(self):
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        entry = self._users.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, user_id, user):
+        with self._lock:
+            self._users[user_id] = (time.monotonic() + settings.USER_CACHE_TTL, user)
+
+    def discard(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        user = user_cache.get(user_id)
+        if user is None:
+            # Raises for unknown or inactive users, which are therefore never cached.
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user)
+        return user
+
+
+class ClaimsJWTAuthentication(CachedJWTAuthentication):
+    def get_user(self, validated_token):
+        if all(claim in validated_token for claim in USER_CLAIMS) and api_settings.USER_ID_CLAIM in validated_token:
+            return ClaimsUser(validated_token)
+        return super().get_user(validated_token)
+
+
+STREAM_TICKET_KEY = 'eka:stream-ticket:{}'
+
+
+def issue_stream_ticket(raw_token):
+    """A random single-use ticket standing in for the access token for STREAM_TICKET_TTL seconds."""
+    ticket = secrets.token_urlsafe(32)
+    cache.set(STREAM_TICKET_KEY.format(ticket), raw_token, timeout=settings.STREAM_TICKET_TTL)
+    return ticket
+
+
+class StreamTicketAuthentication(ClaimsJWTAuthentication):
+    """
+    Also accepts `?ticket=` from issue_stream_ticket(), for EventSource
+    clients, which cannot send an Authorization header. The access token
+    itself never appears in a URL (and so in access logs); a ticket that
+    does is worthless once used or after STREAM_TICKET_TTL seconds. Tickets
+    live in the cache, so several workers need a shared one (CACHE_URL).
+    """
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            return result
+        ticket = request.query_params.get('ticket')
+        if not ticket:
+            return None
+        key = STREAM_TICKET_KEY.format(ticket)
+        raw_token = cache.get(key)
+        # delete() reports whether this call removed the key, so of two requests racing on a ticket one fails.
+        if raw_token is None or not cache.delete(key):
+            raise AuthenticationFailed('Invalid or expired stream ticket.')
+        validated_token = self.get_validated_token(raw_token.encode())
+        return self.get_user(validated_token), validated_token
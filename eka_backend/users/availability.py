@@ -0,0 +1,74 @@
+"""
+Date availability for the Vehicle Analysis and Trails filter lists.
+
+Each list is built from a single query: chart days come straight from
+VehicleChartData's (registration, date) unique index (the row *is* the
+calendar entry) and trail days from the TrailAvailability calendar. Rows are
+assembled here in the shape the filter endpoints have always returned; the
+a*-prefixed functions do the same through the async ORM. Results are cached
+in the FILTERS namespace.
+"""
+from .cache import FILTERS, aget_or_build, get_or_build
+from .models import TrailVehicle, VehicleType
+
+
+def _chart_rows():
+    return VehicleType.objects.values_list(
+        'id', 'name', 'registrations__id', 'registrations__registration_number', 'registrations__chart_data__date',
+    ).order_by('id', 'registrations__id', '-registrations__chart_data__date')
+
+
+def _trail_rows():
+    return TrailVehicle.objects.values_list(
+        'id', 'vehicle_type', 'registration_no', 'fleet', 'availability__date',
+    ).order_by('id', '-availability__date')
+
+
+def chart_filters():
+    """[{id, name, registrations: [{id, registration_number, dates}]}] ordered like the prefetch it replaces."""
+    return get_or_build(FILTERS, 'charts', lambda: _build_chart_filters(_chart_rows()))
+
+
+async def achart_filters():
+    async def build():
+        return _build_chart_filters([row async for row in _chart_rows()])
+    return await aget_or_build(FILTERS, 'charts', build)
+
+
+def trail_filters():
+    """[{id, vehicle_type, registration_no, fleet, available_dates}] with dates newest first."""
+    return get_or_build(FILTERS, 'trails', lambda: _build_trail_filters(_trail_rows()))
+
+
+async def atrail_filters():
+    async def build():
+        return _build_trail_filters([row async for row in _trail_rows()])
+    return await aget_or_build(FILTERS, 'trails', build)
+
+
+def _build_chart_filters(rows):
+    types, registrations = {}, {}
+    for type_id, type_name, reg_id, reg_no, day in rows:
+        if type_id not in types:
+            types[type_id] = {'id': type_id, 'name': type_name, 'registrations': []}
+        if reg_id is None:
+            continue
+        if reg_id not in registrations:
+            registrations[reg_id] = {'id': reg_id, 'registration_number': reg_no, 'dates': []}
+            types[type_id]['registrations'].append(registrations[reg_id])
+        if day is not None:
+            registrations[reg_id]['dates'].append(day)
+    return list(types.values())
+
+
+def _build_trail_filters(rows):
+    vehicles = {}
+    for vehicle_id, vehicle_type, registration_no, fleet, day in rows:
+        if vehicle_id not in vehicles:
+            vehicles[vehicle_id] = {
+                'id': vehicle_id, 'vehicle_type': vehicle_type,
+                'registration_no': registration_no, 'fleet': fleet, 'available_dates': [],
+            }
+        if day is not None:
+            vehicles[vehicle_id]['available_dates'].append(day)
+    return list(vehicles.values())
@@ -0,0 +1,125 @@
+"""
+In-memory pre-check for the refresh-token blacklist.
+
+Each process keeps a Bloom filter of blacklisted token ids (jti). A refresh
+token whose jti is not in the filter is certainly not blacklisted, so the
+blacklist query only runs for the ~1% false positives and for tokens that
+really were revoked.
+
+Revoking in this process adds the jti at once. Other processes announce
+revocations by bumping the 'token-blacklist' cache version, which is looked
+at no more than every BLACKLIST_FILTER_VERSION_CHECK_SECONDS, so a token
+revoked elsewhere can still be refreshed here for up to that long. When it
+moved, or every BLACKLIST_FILTER_REFRESH_SECONDS regardless, the filter is
+topped up with the rows added since (by BlacklistedToken id, re-reading a
+small trailing window). It is rebuilt from scratch every
+BLACKLIST_FILTER_REBUILD_SECONDS (dropping pruned tokens) or when it
+outgrows its capacity.
+
+Without a shared cache (CACHE_URL unset) announcements can't reach other
+processes, so the filter stands aside and every refresh checks the database.
+"""
+import math
+import threading
+import time
+from hashlib import blake2b
+
+from django.conf import settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+from . import cache
+from .cache import bump_version, get_version
+
+NAMESPACE = 'token-blacklist'
+ERROR_RATE = 0.01
+MIN_CAPACITY = 1024
+ID_OVERLAP = 1000
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        if item in self:
+            return
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class BlacklistFilter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.bloom = None
+        self.last_id = 0
+        self.version = None
+        self.checked_at = self.built_at = self.version_checked_at = 0.0
+
+    def might_contain(self, jti):
+        """False means the token is definitely not blacklisted."""
+        if not cache.is_shared():
+            return True
+        with self._lock:
+            self._refresh()
+            return jti in self.bloom
+
+    def add(self, jti):
+        with self._lock:
+            if self.bloom is not None:
+                self.bloom.add(jti)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self.bloom is None or now - self.built_at > settings.BLACKLIST_FILTER_REBUILD_SECONDS:
+            return self._rebuild(now)
+        due = now - self.checked_at >= settings.BLACKLIST_FILTER_REFRESH_SECONDS
+        if not due:
+            if now - self.version_checked_at < settings.BLACKLIST_FILTER_VERSION_CHECK_SECONDS:
+                return
+            self.version_checked_at = now
+            if get_version(NAMESPACE) == self.version:
+                return
+        self.version = get_version(NAMESPACE)
+        self.checked_at = self.version_checked_at = now
+        # Re-read a trailing window of ids in case a lower id committed after a higher one was seen.
+        rows = list(BlacklistedToken.objects.filter(id__gt=self.last_id - ID_OVERLAP)
+                    .order_by('id').values_list('id', 'token__jti'))
+        self._add_rows(rows)
+        if self.bloom.count > self.bloom.capacity:
+            # Past capacity the false-positive rate climbs; resize.
+            self._rebuild(now)
+
+    def _rebuild(self, now):
+        self.version = get_version(NAMESPACE)
+        rows = list(BlacklistedToken.objects.order_by('id').values_list('id', 'token__jti'))
+        # Headroom so the incremental top-ups fit until the next scheduled rebuild.
+        self.bloom = BloomFilter(max(MIN_CAPACITY, 2 * len(rows)))
+        self.last_id = 0
+        self._add_rows(rows)
+        self.checked_at = self.built_at = self.version_checked_at = now
+
+    def _add_rows(self, rows):
+        for row_id, jti in rows:
+            self.bloom.add(jti)
+            self.last_id = max(self.last_id, row_id)
+
+
+blacklist_filter = BlacklistFilter()
+
+
+def announce_revocation():
+    """Tells other processes (through the shared cache) to top up their filters now."""
+    bump_version(NAMESPACE)
@@ -0,0 +1,138 @@
+"""
+Version-keyed caching helpers.
+
+Cached entries embed the current version of their namespace in the key, so
+bumping the version invalidates every entry of the namespace at once without
+having to know or delete the individual keys. Versions start from the
+current time so a version key evicted from the cache can never roll back to
+a value that older entries were stored under.
+"""
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import QueryDict
+from rest_framework.response import Response
+
+from .replicas import primary_reads
+
+# Namespaces of cached API responses, invalidated by model signals (users.signals).
+DASHBOARD = 'dashboard'
+VEHICLE_SELECTION = 'vehicle-selection'
+# Filter dropdown options of Trails, Vehicle Analysis and Reports; bumped whenever the
+# calendars or vehicle/registration lists they are built from change.
+FILTERS = 'filters'
+RESPONSE_NAMESPACES = (DASHBOARD, VEHICLE_SELECTION, FILTERS)
+
+
+def _version_key(namespace):
+    return f'eka:version:{namespace}'
+
+
+def get_version(namespace):
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(namespace):
+    key = _version_key(namespace)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(namespace):
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), time.time_ns(), timeout=None)
+
+
+def versioned_key(namespace, *parts):
+    return ':'.join(['eka', namespace, str(get_version(namespace)), *map(str, parts)])
+
+
+async def aversioned_key(namespace, *parts):
+    return ':'.join(['eka', namespace, str(await aget_version(namespace)), *map(str, parts)])
+
+
+def is_shared():
+    """Whether every process sees the same cache, so a version bumped in one is seen by all."""
+    return not settings.CACHES['default']['BACKEND'].endswith(('LocMemCache', 'DummyCache'))
+
+
+def trail_namespace(vehicle_id, day):
+    return f'trail:{vehicle_id}:{day}'
+
+
+def chart_namespace(registration_id, day):
+    return f'chart:{registration_id}:{day}'
+
+
+def invalidate(*namespaces):
+    """Explicitly drops every cached response of the given namespaces (all when none given)."""
+    for namespace in namespaces or RESPONSE_NAMESPACES:
+        bump_version(namespace)
+
+
+def get_or_build(namespace, part, build):
+    key = versioned_key(namespace, part)
+    value = cache.get(key)
+    if value is None:
+        with primary_reads():
+            value = build()
+        cache.set(key, value, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+    return value
+
+
+async def aget_or_build(namespace, part, abuild):
+    key = await aversioned_key(namespace, part)
+    value = await cache.aget(key)
+    if value is None:
+        with primary_reads():
+            value = await abuild()
+        await cache.aset(key, value, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+    return value
+
+
+def response_key(namespace, handler, query_params):
+    """Cache key of a cached_response handler's data for the given query params."""
+    query = urlencode(sorted(query_params.lists()), doseq=True)
+    return versioned_key(namespace, handler.__qualname__, query)
+
+
+def warm_response(namespace, handler, build, query_params=None):
+    """Caches build() as cached_response would for a request with these query params, unless already cached."""
+    key = response_key(namespace, handler, query_params if query_params is not None else QueryDict())
+    if cache.get(key) is None:
+        cache.set(key, build(), timeout=settings.RESPONSE_CACHE_TIMEOUT)
+
+
+def cached_response(namespace):
+    """
+    Caches the data of successful responses of a view handler (get/retrieve)
+    per handler and query string under a versioned namespace. Authentication and
+    permissions still run on every request because DRF checks them before
+    the handler is called; the data itself must not depend on the user.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            key = response_key(namespace, handler, request.query_params)
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
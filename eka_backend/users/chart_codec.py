@@ -0,0 +1,162 @@
+"""
+Compact binary encoding for a day of VehicleChartData.
+
+All four charts of a day share one label (timestamp) axis, so it is stored
+once, followed by each series packed as little-endian float32. Layout:
+
+    b'EKC2' | uint32 points | uint32 labels_len | labels (utf-8, '\\x1f' joined)
+    for each chart in CHART_FIELDS:
+        uint16 series_count (EMPTY_CHART for a chart stored as {})
+        for each series: uint16 name_len | uint8 decimals | uint8 width | uint8 kind | name | values
+
+``decimals`` is the rounding that restores the original JSON values from
+float32 (NO_ROUNDING means none is needed). A series whose values float32
+can't reproduce exactly is stored as float64 instead (``width`` 8).
+``kind`` INTEGERS marks a series of JSON integers, decoded back to ints so
+the API keeps returning 25 rather than 25.0; a series mixing integers and
+floats is not packed. Missing values (None) round-trip through NaN.
+
+Blobs written before ``kind`` existed (b'EKC1', no kind byte) still decode,
+with their values as floats.
+"""
+import struct
+import sys
+from array import array
+
+CHART_FIELDS = ('battery_data', 'temperature_data', 'voltage_data', 'current_data')
+
+MAGIC = b'EKC2'
+LEGACY_MAGIC = b'EKC1'
+LABEL_SEPARATOR = '\x1f'
+EMPTY_CHART = 0xFFFF
+NO_ROUNDING = 0xFF
+MAX_DECIMALS = 6
+FLOATS, INTEGERS = 0, 1
+
+_HEADER = struct.Struct('<4sII')
+_CHART = struct.Struct('<H')
+_SERIES = struct.Struct('<HBBB')
+_LEGACY_SERIES = struct.Struct('<HBB')
+_SWAP = sys.byteorder != 'little'
+
+
+def _decimals(values):
+    for decimals in range(MAX_DECIMALS + 1):
+        if all(v is None or round(v, decimals) == v for v in values):
+            return decimals
+    return NO_ROUNDING
+
+
+def _restore(values, decimals, kind=FLOATS):
+    if kind == INTEGERS:
+        return [None if v != v else int(v) for v in values]
+    if decimals == NO_ROUNDING:
+        return [None if v != v else v for v in values]
+    return [None if v != v else round(v, decimals) for v in values]
+
+
+def _kind(data):
+    """INTEGERS or FLOATS, or None for a series mixing both (kept as JSON)."""
+    types = {type(v) for v in data if v is not None}
+    if types == {int}:
+        return INTEGERS
+    if types <= {float}:
+        return FLOATS
+    return None
+
+
+def _pack_series(data, kind):
+    """Returns (decimals, width, values) using float32 whenever it is lossless, None if float64 isn't either."""
+    filled = [float('nan') if v is None else v for v in data]
+    decimals = _decimals(data)
+    values = array('f', filled)
+    if _restore(values, decimals, kind) != data:
+        decimals, values = NO_ROUNDING, array('d', filled)
+        if _restore(values, decimals, kind) != data:
+            # Integers beyond float64's 53-bit mantissa.
+            return None
+    if _SWAP:
+        values.byteswap()
+    return decimals, values.itemsize, values.tobytes()
+
+
+def _shared_labels(charts):
+    labels = None
+    for chart in charts.values():
+        if chart == {}:
+            continue
+        if not isinstance(chart, dict) or set(chart) != {'labels', 'series'}:
+            return None
+        if labels is None:
+            labels = chart['labels']
+        elif chart['labels'] != labels:
+            return None
+    if labels is None or not all(isinstance(label, str) and LABEL_SEPARATOR not in label for label in labels):
+        return None
+    return labels
+
+
+def encode(charts):
+    """
+    Packs ``{field: {'labels': [...], 'series': [...]}}`` for CHART_FIELDS.
+    Returns None when the charts can't be represented exactly (different
+    label axes, extra keys, non-numeric data); callers keep the JSON then.
+    """
+    labels = _shared_labels(charts)
+    if labels is None:
+        return None
+    encoded_labels = LABEL_SEPARATOR.join(labels).encode()
+    parts = [_HEADER.pack(MAGIC, len(labels), len(encoded_labels)), encoded_labels]
+    for field in CHART_FIELDS:
+        chart = charts.get(field, {})
+        if chart == {}:
+            parts.append(_CHART.pack(EMPTY_CHART))
+            continue
+        parts.append(_CHART.pack(len(chart['series'])))
+        for series in chart['series']:
+            if not isinstance(series, dict) or set(series) != {'name', 'data'} or not isinstance(series['name'], str):
+                return None
+            data = series['data']
+            if len(data) != len(labels) or not all(v is None or type(v) in (int, float) for v in data):
+                return None
+            kind = _kind(data)
+            packed = _pack_series(data, kind) if kind is not None else None
+            if packed is None:
+                return None
+            name = series['name'].encode()
+            decimals, width, values = packed
+            parts += [_SERIES.pack(len(name), decimals, width, kind), name, values]
+    return b''.join(parts)
+
+
+def decode(blob):
+    """Inverse of encode(): returns the four charts in the original JSON shape."""
+    blob = bytes(blob)
+    magic, points, labels_len = _HEADER.unpack_from(blob)
+    if magic not in (MAGIC, LEGACY_MAGIC):
+        raise ValueError('Not a packed chart blob.')
+    series_header = _SERIES if magic == MAGIC else _LEGACY_SERIES
+    offset = _HEADER.size
+    labels = blob[offset:offset + labels_len].decode().split(LABEL_SEPARATOR) if points else []
+    offset += labels_len
+    charts = {}
+    for field in CHART_FIELDS:
+        (count,) = _CHART.unpack_from(blob, offset)
+        offset += _CHART.size
+        if count == EMPTY_CHART:
+            charts[field] = {}
+            continue
+        series = []
+        for _ in range(count):
+            name_len, decimals, width, *kind = series_header.unpack_from(blob, offset)
+            offset += series_header.size
+            name = blob[offset:offset + name_len].decode()
+            offset += name_len
+            values = array('f' if width == 4 else 'd')
+            values.frombytes(blob[offset:offset + points * width])
+            offset += points * width
+            if _SWAP:
+                values.byteswap()
+            series.append({'name': name, 'data': _restore(values, decimals, *kind)})
+        charts[field] = {'labels': labels, 'series': series}
+    return charts
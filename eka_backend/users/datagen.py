@@ -0,0 +1,285 @@
+"""
+Production-sized synthetic data for `manage.py seed_all_data --scale N`.
+
+Per unit of scale: VEHICLES_PER_SCALE live vehicles, REGISTRATIONS_PER_SCALE
+registrations with per-minute charts for every day of history,
+TRAIL_VEHICLES_PER_SCALE trail vehicles reporting every
+ROLLUP_SAMPLE_INTERVAL_SECONDS through an 8 hour shift, and
+REPORTS_PER_SCALE reports spread over the history. With the default 365
+days of history and 7 of trails that is about 2 GB of charts, 4M trail
+points and 1M reports per unit.
+
+The small tables are written by the calling process. The large ones are
+split into units (a registration's charts, a trail vehicle's points, a chunk
+of reports) that worker processes generate and stream into Postgres with
+COPY, so neither side ever holds a whole table in memory. Every unit draws
+from its own random.Random seeded with (seed, table, unit number) and units
+are numbered in id order, so the same seed and date produce the same data
+whatever the number of workers. Other databases get the same
+rows through bulk_create in a single process.
+"""
+import csv
+import io
+import json
+import math
+import os
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from . import cache, rollups
+from .models import (FleetVehicle, PerformanceStat, Report, ReportFacet, RollupState, TrailAvailability,
+                     TrailDataPoint, TrailVehicle, Vehicle, VehicleChartData, VehicleRegistration, VehicleRollupState,
+                     VehicleSummary, VehicleType)
+
+FLEET_TYPES = ('Eka 7', 'Eka 9', 'Eka 12', 'Eka 2.0')
+TRAIL_FLEETS = ('PMPML', 'BEST', 'BMTC', 'DTC')
+REPORT_TYPES = ('Performance', 'Health', 'Charging', 'Fault')
+VEHICLES_PER_SCALE = 1000
+REGISTRATIONS_PER_SCALE = 100
+TRAIL_VEHICLES_PER_SCALE = 100
+REPORTS_PER_SCALE = 1_000_000
+REPORTS_PER_UNIT = 50_000
+TRAIL_SHIFT_HOURS = 8
+KWH_PER_KM = 1.1
+KM_PER_DEGREE = 111.0
+WRITE_BATCH = 2000
+
+# chart field -> [(series name, low, high)]
+CHART_SERIES = {
+    'battery_data': [('Voltage', 20, 28)],
+    'temperature_data': [('Min Temp', 20, 32), ('Max Temp', 22, 36)],
+    'voltage_data': [('A Pack', 680, 705), ('B Pack', 685, 710)],
+    'current_data': [('Current', 670, 695), ('Peak', 690, 700)],
+}
+MINUTE_LABELS = [f'{h:02d}:{m:02d}' for h in range(24) for m in range(60)]
+ECU_DATA = [{'name': 'BMS', 'controls': [{'name': 'Enable', 'value': '1'}]},
+            {'name': 'MCU', 'controls': [{'name': 'Mode', 'value': 'Drive'}]}]
+
+# Tables emptied before a scaled seed, children first. The rollup state has no foreign key to the
+# points it was folded from, so it is listed explicitly; generate() rebuilds it at the end.
+SEEDED_MODELS = (Report, ReportFacet, TrailAvailability, VehicleRollupState, TrailDataPoint, TrailVehicle,
+                 VehicleChartData, VehicleRegistration, VehicleType, Vehicle, VehicleSummary, PerformanceStat,
+                 FleetVehicle, RollupState)
+
+
+def _walk(rng, low, high, steps):
+    """A bounded random walk, smoother (and closer to telemetry) than uniform noise."""
+    value, span, values = rng.uniform(low, high), (high - low) / 50, []
+    for _ in range(steps):
+        value = min(high, max(low, value + rng.uniform(-span, span)))
+        values.append(round(value, 2))
+    return values
+
+
+def _charts(rng, registration_id, days, anchor):
+    for offset in reversed(range(days)):
+        chart = VehicleChartData(registration_id=registration_id, date=anchor - timedelta(days=offset))
+        chart.set_charts({
+            field: {'labels': MINUTE_LABELS, 'series': [
+                {'name': name, 'data': _walk(rng, low, high, len(MINUTE_LABELS))} for name, low, high in series
+            ]} for field, series in CHART_SERIES.items()
+        })
+        yield chart
+
+
+def _trail_points(rng, vehicle_id, days, anchor):
+    interval = settings.ROLLUP_SAMPLE_INTERVAL_SECONDS
+    soc_per_km = KWH_PER_KM * 100 / settings.ROLLUP_BATTERY_CAPACITY_KWH
+    for offset in reversed(range(days)):
+        day = anchor - timedelta(days=offset)
+        lat, lng, soc = 18.45 + rng.random() / 5, 73.75 + rng.random() / 5, rng.uniform(85, 100)
+        heading = rng.uniform(0, 2 * math.pi)
+        for _ in range(int(TRAIL_SHIFT_HOURS * 3600 / interval)):
+            speed = max(0, min(60, rng.gauss(30, 15)))
+            if speed:
+                heading += rng.uniform(-0.2, 0.2)
+                km = speed * interval / 3600
+                lat += km / KM_PER_DEGREE * math.cos(heading)
+                lng += km / KM_PER_DEGREE * math.sin(heading)
+                soc = max(5, soc - km * soc_per_km)
+            yield TrailDataPoint(
+                vehicle_id=vehicle_id, date=day, ecu_data=ECU_DATA,
+                coordinates={'lat': round(lat, 6), 'lng': round(lng, 6)},
+                metrics={'speed': {'value': round(speed), 'unit': 'kmph'}, 'soc': {'value': round(soc, 1), 'unit': '%'}},
+            )
+
+
+def _reports(rng, count, registration_ids, days, now):
+    for _ in range(count):
+        yield Report(
+            registration_id=rng.choice(registration_ids), report_type=rng.choice(REPORT_TYPES),
+            name=now - timedelta(seconds=rng.randrange(days * 86400)), col2=f'Val-{rng.randint(10, 99)}',
+            signal=f'Sig-{rng.randint(100, 999)}', signal0=f'S0-{rng.randint(0, 1)}',
+            signal1=f'S1-{rng.randint(0, 1)}', signal2=f'S2-{rng.randint(0, 1)}',
+        )
+
+
+def _copy_value(value):
+    if isinstance(value, (bytes, memoryview)):
+        return '\\x' + bytes(value).hex()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(',', ':'))
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+class _CsvStream:
+    """File-like CSV view of model instances that COPY reads as it goes."""
+    def __init__(self, objects, fields):
+        self.objects, self.fields = iter(objects), fields
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, lineterminator='\n')
+        self.pending = ''
+        self.rows = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self.pending) < size:
+            batch = list(islice(self.objects, WRITE_BATCH))
+            if not batch:
+                break
+            self.buffer.seek(0)
+            self.buffer.truncate()
+            self.writer.writerows([_copy_value(getattr(obj, f.attname)) for f in self.fields] for obj in batch)
+            self.pending += self.buffer.getvalue()
+            self.rows += len(batch)
+        size = len(self.pending) if size < 0 else size
+        chunk, self.pending = self.pending[:size], self.pending[size:]
+        return chunk
+
+
+def write(model, objects):
+    """Writes unsaved instances (COPY on Postgres, bulk_create elsewhere); returns the row count."""
+    if connection.vendor == 'postgresql':
+        fields = [f for f in model._meta.concrete_fields if not f.primary_key or not f.auto_created]
+        stream = _CsvStream(objects, fields)
+        columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY {model._meta.db_table} ({columns}) FROM STDIN WITH (FORMAT csv)', stream)
+        return stream.rows
+    written, objects = 0, iter(objects)
+    while batch := list(islice(objects, WRITE_BATCH)):
+        model.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def _load(unit):
+    """Generates and writes one unit; runs in a worker process."""
+    kind, index, pk, options = unit
+    rng = random.Random(f"{options['seed']}:{kind}:{index}")
+    if kind == 'charts':
+        return kind, write(VehicleChartData, _charts(rng, pk, options['days'], options['anchor']))
+    if kind == 'trails':
+        return kind, write(TrailDataPoint, _trail_points(rng, pk, options['trail_days'], options['anchor']))
+    count = min(REPORTS_PER_UNIT, options['reports'] - index * REPORTS_PER_UNIT)
+    return kind, write(Report, _reports(rng, count, options['registration_ids'], options['days'], options['now']))
+
+
+def _init_worker():
+    # Needed under the spawn start method; a no-op in forked children.
+    import django
+    django.setup()
+
+
+def clear():
+    if connection.vendor == 'postgresql':
+        tables = ', '.join(model._meta.db_table for model in SEEDED_MODELS)
+        with connection.cursor() as cursor:
+            # Identities keep counting: a reused registration or vehicle id would be served the
+            # per-day chart and trail responses still cached for the row it replaced.
+            cursor.execute(f'TRUNCATE {tables} CASCADE')
+        return
+    for model in SEEDED_MODELS:
+        model.objects.all().delete()
+
+
+def _create_fleet(scale, rng, now):
+    vehicles_per_type = VEHICLES_PER_SCALE * scale // len(FLEET_TYPES)
+    FleetVehicle.objects.bulk_create([
+        FleetVehicle(title=name.upper(), total_count=vehicles_per_type, order=i, special=i == 0,
+                     active_count=rng.randint(vehicles_per_type // 2, vehicles_per_type))
+        for i, name in enumerate(FLEET_TYPES)
+    ])
+    for fleet_type in FLEET_TYPES:
+        summary = VehicleSummary.objects.create(
+            fleet_type=fleet_type, total_distance=Decimal(rng.randint(10**5, 10**6)),
+            co2_savings=Decimal(rng.randint(10**4, 10**5)), avg_energy_consumption=Decimal('0.9'),
+            run_time=Decimal(rng.randint(10**3, 10**4)), traction_energy=Decimal('1.1'), regen_energy=Decimal('0.2'),
+        )
+        write(Vehicle, (
+            Vehicle(summary=summary, name=f'MH{rng.randint(1, 50):02d} EK {i:05d}',
+                    rating=f'{rng.uniform(3.5, 5):.1f}', speed=rng.randint(0, 60), soc=rng.randint(5, 100),
+                    range=rng.randint(10, 180), temp=rng.randint(20, 42), address='Pune',
+                    updated_at=now)
+            for i in range(vehicles_per_type)
+        ))
+        vehicle_type = VehicleType.objects.create(name=fleet_type)
+        VehicleRegistration.objects.bulk_create([
+            VehicleRegistration(vehicle_type=vehicle_type, registration_number=f'{fleet_type.upper()}-REG-{i:05d}')
+            for i in range(REGISTRATIONS_PER_SCALE * scale // len(FLEET_TYPES))
+        ])
+    TrailVehicle.objects.bulk_create([
+        TrailVehicle(vehicle_type=FLEET_TYPES[i % len(FLEET_TYPES)].upper(), registration_no=f'MH 12 TR {i:05d}',
+                     fleet=TRAIL_FLEETS[i % len(TRAIL_FLEETS)])
+        for i in range(TRAIL_VEHICLES_PER_SCALE * scale)
+    ])
+
+
+def generate(scale, seed=0, days=365, trail_days=7, workers=None, log=print):
+    """Replaces the seeded tables with a dataset `scale` times the base volume."""
+    # Everything is dated relative to the start of today, not the current time.
+    anchor = date.today()
+    now = timezone.make_aware(datetime.combine(anchor, time()))
+    clear()
+    _create_fleet(scale, random.Random(f'{seed}:fleet'), now)
+    registration_ids = list(VehicleRegistration.objects.order_by('id').values_list('id', flat=True))
+    trail_vehicle_ids = list(TrailVehicle.objects.order_by('id').values_list('id', flat=True))
+    log(f'Created {Vehicle.objects.count()} vehicles, {len(registration_ids)} registrations '
+        f'and {len(trail_vehicle_ids)} trail vehicles.')
+
+    if connection.vendor == 'postgresql':
+        # Route the points straight into daily partitions instead of the DEFAULT one.
+        call_command('trail_partitions', days_back=trail_days, retention_days=0, stdout=io.StringIO())
+
+    report_total = REPORTS_PER_SCALE * scale
+    options = {'seed': seed, 'days': days, 'trail_days': trail_days, 'anchor': anchor, 'now': now,
+               'reports': report_total, 'registration_ids': registration_ids}
+    units = ([('charts', i, pk, options) for i, pk in enumerate(registration_ids)]
+             + [('trails', i, pk, options) for i, pk in enumerate(trail_vehicle_ids)]
+             + [('reports', i, None, options) for i in range(-(-report_total // REPORTS_PER_UNIT))])
+    totals = dict.fromkeys(('charts', 'trails', 'reports'), 0)
+    # SQLite and friends take one writer at a time, so only Postgres gets workers.
+    if connection.vendor != 'postgresql':
+        workers = 1
+    workers = workers or os.cpu_count()
+    if workers > 1:
+        # Children must not inherit an open connection; each opens its own.
+        connections.close_all()
+        with Pool(workers, initializer=_init_worker) as pool:
+            results = pool.imap_unordered(_load, units)
+            for done, (kind, rows) in enumerate(results, 1):
+                totals[kind] += rows
+                if done % max(1, len(units) // 20) == 0:
+                    log(f'{done}/{len(units)} units written')
+    else:
+        for kind, rows in map(_load, units):
+            totals[kind] += rows
+    log(f"Wrote {totals['charts']} chart days, {totals['trails']} trail points and {totals['reports']} reports.")
+
+    with transaction.atomic():
+        TrailAvailability.objects.bulk_create([
+            TrailAvailability(vehicle_id=pk, date=anchor - timedelta(days=offset))
+            for pk in trail_vehicle_ids for offset in range(trail_days)
+        ], batch_size=5000)
+        ReportFacet.rebuild()
+        rollups.rebuild()
+        transaction.on_commit(cache.invalidate)
@@ -0,0 +1,82 @@
+"""
+Shape-preserving downsampling of chart series (Largest-Triangle-Three-Buckets).
+
+All series of a chart share one label axis, so a single set of indices is
+picked per chart: each bucket keeps the point whose triangle area, summed
+over every series normalised to [0, 1], is largest. Labels and series stay
+aligned because they are all sliced with the same indices.
+"""
+import numpy as np
+
+
+def lttb_indices(values, threshold):
+    """
+    values: (series, points) float array, NaN for missing samples.
+    Returns the indices of the `threshold` points to keep, first and last included.
+    """
+    count = values.shape[1]
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+
+    # Normalise each series so large-valued series don't dominate the selection.
+    # Gaps count as mid-range values for selection only; the output keeps them as None.
+    low = np.nanmin(values, axis=1, keepdims=True)
+    span = np.nanmax(values, axis=1, keepdims=True) - low
+    span[~(span > 0)] = 1.0
+    y = np.nan_to_num((values - low) / span, nan=0.5)
+    x = np.arange(count, dtype=np.float64)
+
+    edges = np.empty(threshold, dtype=np.int64)
+    edges[:-1] = (np.arange(threshold - 1) * ((count - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-2], edges[-1] = count - 1, count
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end, next_end = edges[bucket], edges[bucket + 1], edges[bucket + 2]
+        avg_x = x[end:next_end].mean()
+        avg_y = y[:, end:next_end].mean(axis=1)
+        areas = np.abs(
+            (x[a] - avg_x) * (y[:, start:end] - y[:, a, None])
+            - (x[a] - x[start:end]) * (avg_y - y[:, a])[:, None]
+        ).sum(axis=0)
+        a = start + int(areas.argmax())
+        selected[bucket + 1] = a
+    return selected
+
+
+def downsample_chart(chart, max_points):
+    """
+    Returns a {labels, series} chart reduced to at most max_points aligned samples.
+    A chart that is not well formed (a series longer or shorter than the labels,
+    non-numeric samples) is returned as stored rather than failing the request.
+    """
+    values = _values(chart)
+    if values is None or values.shape[1] <= max_points:
+        return chart
+    keep = lttb_indices(values, max_points).tolist()
+    labels = chart['labels']
+    return {
+        'labels': [labels[i] for i in keep],
+        'series': [{'name': series['name'], 'data': [series['data'][i] for i in keep]} for series in chart['series']],
+    }
+
+
+def _values(chart):
+    """The (series, points) float array of a well-formed chart, None otherwise."""
+    try:
+        labels, series = chart['labels'], chart['series']
+        if not series or any(len(entry['data']) != len(labels) for entry in series):
+            return None
+        values = np.array(
+            [[np.nan if v is None else v for v in entry['data']] for entry in series], dtype=np.float64,
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+    # Nested samples parse as a third axis.
+    return values if values.ndim == 2 else None
+
+
+def downsample_charts(charts, max_points):
+    return {field: downsample_chart(chart, max_points) for field, chart in charts.items()}
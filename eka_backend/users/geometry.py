@@ -0,0 +1,53 @@
+"""
+Polyline simplification for trail paths.
+
+Points are projected onto a local equirectangular plane (longitude scaled by
+cos(latitude)) so a tolerance means the same ground distance in every
+direction; tolerances are expressed in degrees of latitude.
+"""
+from math import cos, radians
+
+TILE_SIZE = 256
+
+
+def zoom_tolerance(zoom, lat):
+    """Tolerance of one screen pixel at a Web Mercator zoom level, in degrees of latitude."""
+    return 360 * cos(radians(lat)) / (TILE_SIZE * 2 ** zoom)
+
+
+def simplify(points, tolerance):
+    """
+    Douglas-Peucker simplification of [{'lat': .., 'lng': ..}, ...].
+    Returns the kept points (always including both ends) in their original order.
+    """
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return list(points)
+    scale = cos(radians(points[0]['lat']))
+    xs = [p['lng'] * scale for p in points]
+    ys = [p['lat'] for p in points]
+    keep = bytearray(n)
+    keep[0] = keep[-1] = 1
+    tolerance_sq = tolerance * tolerance
+    # Iterative so 80k-point days don't hit the recursion limit.
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay = xs[first], ys[first]
+        dx, dy = xs[last] - ax, ys[last] - ay
+        segment_sq = dx * dx + dy * dy
+        farthest, index = tolerance_sq, None
+        for i in range(first + 1, last):
+            px, py = xs[i] - ax, ys[i] - ay
+            if segment_sq:
+                cross = px * dy - py * dx
+                distance_sq = cross * cross / segment_sq
+            else:
+                distance_sq = px * px + py * py
+            if distance_sq > farthest:
+                farthest, index = distance_sq, i
+        if index is not None:
+            keep[index] = 1
+            stack.append((first, index))
+            stack.append((index, last))
+    return [point for point, kept in zip(points, keep) if kept]
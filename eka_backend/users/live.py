@@ -0,0 +1,154 @@
+"""
+Live vehicle state for the Server-Sent Events stream (ASGI only).
+
+One VehicleStateHub per worker process polls Vehicle for rows whose
+updated_at moved, diffs them against the last known state and fans out only
+the changed fields to every connected stream. The database sees one small
+indexed query per poll interval no matter how many dispatchers are
+listening, and clients receive nothing when nothing changed.
+
+Each poll re-reads a short window before the watermark so rows committed
+late (with an older updated_at) are not missed; the diff turns the re-read
+rows into no-ops. Deleted vehicles are not announced; clients pick them up
+from the snapshot sent on every (re)connect.
+"""
+import asyncio
+import json
+import logging
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import F
+
+from .models import Vehicle
+
+logger = logging.getLogger(__name__)
+
+STATE_FIELDS = ('fleet_name', 'name', 'rating', 'speed', 'soc', 'range', 'temp', 'address')
+# Updates a slow client may fall behind by before it is sent a fresh snapshot instead.
+QUEUE_SIZE = 100
+# Re-read window for transactions that commit after a later updated_at was seen.
+COMMIT_LAG = timedelta(seconds=5)
+RESYNC = object()
+
+
+def _fetch(since):
+    # Runs outside the request cycle, so apply CONN_MAX_AGE / health checks by hand.
+    close_old_connections()
+    rows = Vehicle.objects.annotate(fleet_name=F('summary__fleet_type')).values('id', 'updated_at', *STATE_FIELDS)
+    if since is not None:
+        rows = rows.filter(updated_at__gt=since - COMMIT_LAG)
+    return list(rows)
+
+
+class VehicleStateHub:
+    def __init__(self):
+        self.states = {}
+        self.subscribers = set()
+        self.watermark = None
+        self._task = None
+        self._ready = None
+
+    async def subscribe(self):
+        """Returns (queue, snapshot); the queue receives lists of changes or RESYNC."""
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = asyncio.create_task(self._run(self._ready))
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.add(queue)
+        await self._ready.wait()
+        return queue, self.snapshot()
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def snapshot(self):
+        return [{'id': pk, **state} for pk, state in self.states.items()]
+
+    async def _run(self, ready):
+        # State is only trustworthy while polling, so every start reloads it in full.
+        self.states, self.watermark = {}, None
+        try:
+            self._apply(await sync_to_async(_fetch)(None))
+        finally:
+            ready.set()
+        while self.subscribers:
+            await asyncio.sleep(settings.VEHICLE_STREAM_POLL_SECONDS)
+            try:
+                changes = self._apply(await sync_to_async(_fetch)(self.watermark))
+            except Exception:
+                logger.exception('Polling vehicle state failed')
+                continue
+            if changes:
+                self._publish(changes)
+
+    def _apply(self, rows):
+        changes = []
+        for row in rows:
+            pk, updated_at = row.pop('id'), row.pop('updated_at')
+            if self.watermark is None or updated_at > self.watermark:
+                self.watermark = updated_at
+            previous = self.states.get(pk, {})
+            changed = {field: value for field, value in row.items() if previous.get(field) != value}
+            if changed:
+                self.states[pk] = row
+                changes.append({'id': pk, **changed})
+        return changes
+
+    def _publish(self, changes):
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(changes)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+
+
+hub = VehicleStateHub()
+
+
+def sse_event(event, data, event_id=None):
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('data: ' + json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+async def vehicle_events(fleet_type=None):
+    """
+    SSE body: a `snapshot` event with every vehicle, then `update` events
+    carrying only changed fields, keep-alive comments in between. The stream
+    ends after VEHICLE_STREAM_MAX_SECONDS and EventSource reconnects, which
+    also bounds the life of streams whose client silently went away.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.VEHICLE_STREAM_MAX_SECONDS
+
+    def visible(vehicle_id):
+        return fleet_type is None or hub.states.get(vehicle_id, {}).get('fleet_name') == fleet_type
+
+    queue, snapshot = await hub.subscribe()
+    try:
+        yield f'retry: {settings.VEHICLE_STREAM_RETRY_MS}\n\n'
+        yield sse_event('snapshot', {'vehicles': [v for v in snapshot if visible(v['id'])]})
+        sequence = 0
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                changes = await asyncio.wait_for(queue.get(), min(settings.VEHICLE_STREAM_HEARTBEAT_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            if changes is RESYNC:
+                yield sse_event('snapshot', {'vehicles': [v for v in hub.snapshot() if visible(v['id'])]})
+                continue
+            changes = [change for change in changes if visible(change['id'])]
+            if changes:
+                sequence += 1
+                yield sse_event('update', {'vehicles': changes}, sequence)
+    finally:
+        hub.unsubscribe(queue)
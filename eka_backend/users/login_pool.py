@@ -0,0 +1,130 @@
+"""
+Bounded pool for password checks.
+
+PBKDF2 is deliberately slow, so LoginAPI runs authenticate() on a small
+thread pool (hashlib releases the GIL while hashing) instead of inline. At
+most LOGIN_POOL_WORKERS hashes run at once per process and at most
+LOGIN_POOL_QUEUE more wait; anything beyond that is refused immediately
+(LoginPoolSaturated -> 429 with Retry-After), as is a login that waited
+longer than LOGIN_POOL_MAX_WAIT_SECONDS without starting. A login burst
+therefore costs a bounded amount of CPU and read traffic keeps its share.
+The bound only bites when a process serves requests concurrently: gthread
+workers under WSGI (gunicorn.conf.py), or the async login view under ASGI.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.db import close_old_connections
+
+# Recent logins kept for the latency percentiles in stats().
+LATENCY_WINDOW = 1000
+
+
+class LoginPoolSaturated(Exception):
+    pass
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+class LoginPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self.queued = self.active = 0
+        self.completed = self.rejected = 0
+        self.waits = deque(maxlen=LATENCY_WINDOW)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._executor is None:
+                workers = settings.LOGIN_POOL_WORKERS
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='login')
+                self._slots = threading.BoundedSemaphore(workers + settings.LOGIN_POOL_QUEUE)
+
+    def authenticate(self, **credentials):
+        """authenticate(**credentials) on the pool; raises LoginPoolSaturated instead of queueing without bound."""
+        future = self._submit(credentials)
+        try:
+            return future.result(timeout=settings.LOGIN_POOL_MAX_WAIT_SECONDS)
+        except TimeoutError:
+            self._give_up(future)
+            return future.result()
+
+    async def aauthenticate(self, **credentials):
+        """authenticate() for async views: the event loop serves other requests while the password is checked."""
+        future = self._submit(credentials)
+        result = asyncio.wrap_future(future)
+        try:
+            # Shielded so that timing out leaves the decision to cancel to _give_up().
+            return await asyncio.wait_for(asyncio.shield(result), settings.LOGIN_POOL_MAX_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            self._give_up(future)
+            return await result
+
+    def _submit(self, credentials):
+        self._ensure_started()
+        if not self._slots.acquire(blocking=False):
+            self._count(rejected=1)
+            raise LoginPoolSaturated
+        submitted = time.monotonic()
+        self._count(queued=1)
+        future = self._executor.submit(self._run, submitted, credentials)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _give_up(self, future):
+        # Still queued: give the slot back and refuse. Already hashing: let it finish.
+        if future.cancel():
+            self._count(queued=-1, rejected=1)
+            raise LoginPoolSaturated
+
+    def _run(self, submitted, credentials):
+        started = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self.waits.append(started - submitted)
+        # Pool threads live outside the request cycle; apply CONN_MAX_AGE by hand.
+        close_old_connections()
+        try:
+            return authenticate(**credentials)
+        finally:
+            close_old_connections()
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.latencies.append(time.monotonic() - submitted)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def stats(self):
+        with self._lock:
+            waits, latencies = list(self.waits), list(self.latencies)
+            stats = {
+                'workers': settings.LOGIN_POOL_WORKERS, 'queue_limit': settings.LOGIN_POOL_QUEUE,
+                'active': self.active, 'queued': self.queued,
+                'completed': self.completed, 'rejected': self.rejected,
+            }
+        for name, values in (('wait', waits), ('latency', latencies)):
+            for label, fraction in (('p50', 0.5), ('p95', 0.95), ('max', 1.0)):
+                value = _percentile(values, fraction)
+                stats[f'{name}_{label}_ms'] = None if value is None else round(value * 1000, 1)
+        return stats
+
+
+login_pool = LoginPool()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+from users import cache
+
+class Command(BaseCommand):
+    help = ('Invalidates cached API responses (all namespaces unless some are given). Reaches running '
+            'servers only when CACHE_URL points them at a shared cache.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('namespaces', nargs='*', help=f"Any of: {', '.join(cache.RESPONSE_NAMESPACES)}.")
+
+    def handle(self, *args, **options):
+        unknown = set(options['namespaces']) - set(cache.RESPONSE_NAMESPACES)
+        if unknown:
+            raise CommandError(f"Unknown namespace(s): {', '.join(sorted(unknown))}.")
+        cache.invalidate(*options['namespaces'])
+        self.stdout.write(self.style.SUCCESS('Cached responses invalidated.'))
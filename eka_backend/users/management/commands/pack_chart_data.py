@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from users.chart_codec import CHART_FIELDS
+from users.models import VehicleChartData
+
+class Command(BaseCommand):
+    help = 'Converts VehicleChartData rows stored as JSON into the packed columnar format.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows converted per transaction.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending = VehicleChartData.objects.filter(packed_charts__isnull=True).order_by('id')
+        packed = skipped = 0
+        last_id = 0
+        while True:
+            batch = list(pending.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            for chart in batch:
+                chart.set_charts(chart.get_charts())
+            converted = [chart for chart in batch if chart.packed_charts is not None]
+            with transaction.atomic():
+                VehicleChartData.objects.bulk_update(converted, [*CHART_FIELDS, 'packed_charts'])
+            packed += len(converted)
+            skipped += len(batch) - len(converted)
+            self.stdout.write(f'Packed {packed} rows so far...')
+
+        self.stdout.write(self.style.SUCCESS(f'Packed {packed} chart rows.'))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f'{skipped} rows kept as JSON (labels differ between charts or data is not numeric).'))
@@ -2,7 +2,8 @@ import random
 from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from users.models import Report, VehicleRegistration, VehicleType
+from users import cache
+from users.models import Report, ReportFacet, VehicleRegistration, VehicleType
 
 class Command(BaseCommand):
     help = 'Populates the database with initial data for the Reports page.'
@@ -39,4 +40,6 @@ class Command(BaseCommand):
             reports_to_create.append(report)
         
         Report.objects.bulk_create(reports_to_create)
+        ReportFacet.rebuild()
+        cache.invalidate(cache.FILTERS)
         self.stdout.write(self.style.SUCCESS(f'Successfully created {len(reports_to_create)} reports.'))
@@ -1,7 +1,8 @@
 import random
 from datetime import date, timedelta
 from django.core.management.base import BaseCommand
-from users.models import TrailVehicle, TrailDataPoint
+from users import cache
+from users.models import TrailAvailability, TrailVehicle, TrailDataPoint
 
 class Command(BaseCommand):
     help = 'Populates the database with initial data for the Trails page.'
@@ -27,22 +28,28 @@ class Command(BaseCommand):
         path_v1 = [(start_lat + i * 0.001, start_lng + i * 0.001) for i in range(5)] + \
                   [(start_lat + 0.005, start_lng + 0.005 - i * 0.001) for i in range(5)]
         
+        points_to_create = []
         for d in range(2): # Create data for today and yesterday
             current_date = date.today() - timedelta(days=d)
             for lat, lng in path_v1:
-                TrailDataPoint.objects.create(
+                points_to_create.append(TrailDataPoint(
                     vehicle=v1, date=current_date, metrics=base_metrics_v1, ecu_data=base_ecu_v1,
                     coordinates={'lat': lat, 'lng': lng}
-                )
+                ))
+        TrailDataPoint.objects.bulk_create(points_to_create)
+        TrailAvailability.record(points_to_create)
         self.stdout.write(self.style.SUCCESS(f'Created trail for {v1.registration_no} on 2 dates.'))
 
         # --- Create Trail Data for Vehicle 2 ---
         base_metrics_v2 = {'speed': {'value': '45', 'unit': 'kmph'}, 'soc': {'value': '95', 'unit': '%' }, 'motorSpeed': {'value': '1550', 'unit': 'rpm'}, 'motorTorque': {'value': '165', 'unit': 'nm'}, 'acceleration': {'value': '0', 'unit': 'km/s²'}, 'brake': {'value': '10', 'unit': '%'}, 'faults': {'value': 'Minor', 'unit': ''}}
         base_ecu_v2 = [{'name': 'BMS', 'controls': [{'name': 'Contactor Control', 'value': '2'}, {'name': 'Enable', 'value': '0'}]}, {'name': 'HVPDU', 'controls': [{'name': 'Contactor Control', 'value': '3'}, {'name': 'Enable', 'value': '1'}]}]
         path_v2 = [(start_lat - i * 0.001, start_lng + i * 0.001) for i in range(8)]
-        for lat, lng in path_v2:
-            TrailDataPoint.objects.create(
+        points_v2 = TrailDataPoint.objects.bulk_create([
+            TrailDataPoint(
                 vehicle=v2, date=date.today(), metrics=base_metrics_v2, ecu_data=base_ecu_v2,
                 coordinates={'lat': lat, 'lng': lng}
-            )
+            ) for lat, lng in path_v2
+        ])
+        TrailAvailability.record(points_v2)
+        cache.invalidate(cache.FILTERS)
         self.stdout.write(self.style.SUCCESS(f'Created trail for {v2.registration_no}.'))
@@ -1,3 +1,4 @@
+from decimal import Decimal
 from django.core.management.base import BaseCommand
 from users.models import VehicleSummary, Vehicle
 
@@ -23,12 +24,12 @@ class Command(BaseCommand):
         summary, created = VehicleSummary.objects.get_or_create(
             fleet_type='Eka 7',
             defaults={
-                'total_distance': '1280 km',
-                'co2_savings': '150 kg',
-                'avg_energy_consumption': '0.9 kWh',
-                'run_time': '45 hrs',
-                'traction_energy': '1.1 MWh',
-                'regen_energy': '0.2 MWh',
+                'total_distance': Decimal('1280'),         # km
+                'co2_savings': Decimal('150'),             # kg
+                'avg_energy_consumption': Decimal('0.9'),  # kWh
+                'run_time': Decimal('45'),                 # hrs
+                'traction_energy': Decimal('1.1'),         # MWh
+                'regen_energy': Decimal('0.2'),            # MWh
             }
         )
         
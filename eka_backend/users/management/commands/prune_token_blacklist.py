@@ -0,0 +1,35 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+class Command(BaseCommand):
+    help = ('Deletes expired outstanding refresh tokens and their blacklist entries in small batches, '
+            'so the tables stay bounded without long locks. Expired tokens fail validation anyway. '
+            'Run it daily (e.g. from cron).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Tokens deleted per transaction.')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between batches.')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be deleted.')
+
+    def handle(self, *args, **options):
+        expired = OutstandingToken.objects.filter(expires_at__lte=timezone.now())
+        if options['dry_run']:
+            count = expired.count()
+            blacklisted = BlacklistedToken.objects.filter(token__in=expired).count()
+            self.stdout.write(f'{count} expired tokens ({blacklisted} blacklisted) would be deleted.')
+            return
+
+        tokens = blacklisted = 0
+        while True:
+            ids = list(expired.order_by('id').values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            with transaction.atomic():
+                blacklisted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+                tokens += OutstandingToken.objects.filter(id__in=ids).delete()[0]
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Deleted {tokens} expired tokens and {blacklisted} blacklist entries.'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from users import cache
+from users.models import ReportFacet
+
+class Command(BaseCommand):
+    help = 'Recomputes the ReportFacet table (ReportsAPI filter options) from all reports.'
+
+    def handle(self, *args, **options):
+        ReportFacet.rebuild()
+        cache.invalidate(cache.FILTERS)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {ReportFacet.objects.count()} report facets.'))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+from users import rollups
+
+class Command(BaseCommand):
+    help = ('Folds telemetry written since the last run into the dashboard performance stats. '
+            'Use --rebuild to recompute everything from scratch, --interval to keep running.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Reset the watermark and recompute from all trail points.')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Run again every this many seconds instead of exiting after one run.')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rollups.rebuild()
+            self.stdout.write(self.style.SUCCESS('Rollups recomputed from all telemetry.'))
+            return
+        while True:
+            processed = rollups.advance()
+            self.stdout.write(self.style.SUCCESS(f'Rolled up {processed} new trail points.'))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
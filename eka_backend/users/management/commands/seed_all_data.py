@@ -1,12 +1,14 @@
 import random
 from datetime import date, timedelta
+from decimal import Decimal
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils import timezone
+from users import cache, datagen, rollups
 from users.models import (
     FleetVehicle, PerformanceStat, VehicleSummary, Vehicle,
     VehicleType, VehicleRegistration, VehicleChartData,
-    TrailVehicle, TrailDataPoint, Report
+    TrailVehicle, TrailDataPoint, TrailAvailability, Report, ReportFacet
 )
 
 class Command(BaseCommand):
@@ -23,8 +25,27 @@ class Command(BaseCommand):
         ]
         return {'labels': labels, 'series': series}
 
-    @transaction.atomic
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=0,
+                            help='Generate a production-sized dataset, this many times the base volume '
+                                 '(see users.datagen). Without it a small demo dataset is seeded.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of --scale; same seed, same data.')
+        parser.add_argument('--days', type=int, default=365, help='Days of chart and report history for --scale.')
+        parser.add_argument('--trail-days', type=int, default=7, help='Days of trail points for --scale.')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Writer processes for --scale on Postgres (default: one per CPU).')
+
     def handle(self, *args, **options):
+        if options['scale'] > 0:
+            self.stdout.write(self.style.SUCCESS(f"--- Generating scale {options['scale']} dataset ---"))
+            datagen.generate(options['scale'], seed=options['seed'], days=options['days'],
+                             trail_days=options['trail_days'], workers=options['workers'], log=self.stdout.write)
+            self.stdout.write(self.style.SUCCESS('--- Finished scaled seed ---'))
+            return
+        self._seed()
+
+    @transaction.atomic
+    def _seed(self):
         self.stdout.write(self.style.SUCCESS('--- Starting Full Database Seed ---'))
 
         # Clear old data in the correct order to respect dependencies
@@ -36,6 +57,8 @@ class Command(BaseCommand):
         registrations = self._create_vehicle_analysis_data()
         self._create_trails_data()
         self._create_reports_data(registrations)
+        # bulk_create skips model signals, so drop cached dashboard responses explicitly.
+        transaction.on_commit(cache.invalidate)
 
         self.stdout.write(self.style.SUCCESS('--- Finished Full Database Seed ---'))
 
@@ -62,21 +85,14 @@ class Command(BaseCommand):
             {'title': 'EKA 12', 'total_count': 5, 'active_count': 5, 'special': False},
         ]
         FleetVehicle.objects.bulk_create([FleetVehicle(**data) for data in fleet_data])
-
-        performance_data = [
-            {'key': 'total_distance', 'title': 'Total Distance', 'value': '12,500 km'},
-            {'key': 'co2_savings', 'title': 'CO2 Savings', 'value': '1.2 tons'},
-            {'key': 'avg_energy_consumption', 'title': 'Avg. Energy Consumption', 'value': '0.8 kWh/km'},
-        ]
-        PerformanceStat.objects.bulk_create([PerformanceStat(**data) for data in performance_data])
         self.stdout.write(self.style.SUCCESS('Dashboard data created.'))
 
     def _create_vehicle_selection_data(self):
         self.stdout.write('Populating Vehicle Selection data...')
         summary = VehicleSummary.objects.create(
-            fleet_type='Eka 7', total_distance='1280 km', co2_savings='150 kg',
-            avg_energy_consumption='0.9 kWh', run_time='45 hrs',
-            traction_energy='1.1 MWh', regen_energy='0.2 MWh'
+            fleet_type='Eka 7', total_distance=Decimal('1280'), co2_savings=Decimal('150'),
+            avg_energy_consumption=Decimal('0.9'), run_time=Decimal('45'),
+            traction_energy=Decimal('1.1'), regen_energy=Decimal('0.2')
         )
         vehicles_data = [
             {'summary': summary, 'name': 'MH12 AB 1234', 'rating': '4.8', 'speed': 25, 'soc': 78, 'range': 90, 'temp': 32, 'address': 'Near Balewadi High Street, Pune'},
@@ -99,15 +115,14 @@ class Command(BaseCommand):
         charts_to_create = []
         for reg in [reg1, reg2, reg3]:
             for i in range(2): # Data for 2 days
-                charts_to_create.append(VehicleChartData(
-                    registration=reg, date=today - timedelta(days=i),
-                    battery_data=self._generate_chart_data({'y_axes': [{'name': 'Voltage', 'min': 20, 'max': 28}]}),
-                    temperature_data=self._generate_chart_data({'y_axes': [{'name': 'Min Temp', 'min': 20, 'max': 32}, {'name': 'Max Temp', 'min': 22, 'max': 36}]}),
-                    
-                    # --- ADD THESE TWO MISSING LINES ---
-                    voltage_data=self._generate_chart_data({'y_axes': [{'name': 'A Pack', 'min': 680, 'max': 705}, {'name': 'B Pack', 'min': 685, 'max': 710}]}),
-                    current_data=self._generate_chart_data({'y_axes': [{'name': 'Current', 'min': 670, 'max': 695}, {'name': 'Peak', 'min': 690, 'max': 700}]})
-                ))
+                chart = VehicleChartData(registration=reg, date=today - timedelta(days=i))
+                chart.set_charts({
+                    'battery_data': self._generate_chart_data({'y_axes': [{'name': 'Voltage', 'min': 20, 'max': 28}]}),
+                    'temperature_data': self._generate_chart_data({'y_axes': [{'name': 'Min Temp', 'min': 20, 'max': 32}, {'name': 'Max Temp', 'min': 22, 'max': 36}]}),
+                    'voltage_data': self._generate_chart_data({'y_axes': [{'name': 'A Pack', 'min': 680, 'max': 705}, {'name': 'B Pack', 'min': 685, 'max': 710}]}),
+                    'current_data': self._generate_chart_data({'y_axes': [{'name': 'Current', 'min': 670, 'max': 695}, {'name': 'Peak', 'min': 690, 'max': 700}]}),
+                })
+                charts_to_create.append(chart)
         VehicleChartData.objects.bulk_create(charts_to_create)
         self.stdout.write(self.style.SUCCESS('Vehicle Analysis data created.'))
         return [reg1, reg2, reg3]
@@ -131,6 +146,9 @@ class Command(BaseCommand):
                         coordinates={'lat': lat, 'lng': lng}
                     ))
         TrailDataPoint.objects.bulk_create(points_to_create)
+        TrailAvailability.record(points_to_create)
+        # Performance stats are derived from the telemetry rather than seeded.
+        rollups.rebuild()
         self.stdout.write(self.style.SUCCESS('Trails data created.'))
 
     def _create_reports_data(self, registrations):
@@ -149,4 +167,5 @@ class Command(BaseCommand):
             ) for _ in range(200) # Create 200 reports
         ]
         Report.objects.bulk_create(reports_to_create)
+        ReportFacet.record(reports_to_create)
         self.stdout.write(self.style.SUCCESS('Reports data created.'))
\ No newline at end of file
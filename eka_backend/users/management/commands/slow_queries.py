@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from users.models import SlowQuery
+
+
+class Command(BaseCommand):
+    help = ('Shows the slow query log (queries over SLOW_QUERY_MS with their plans, see users.slow_queries), '
+            'newest first.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20, help='Number of entries to show.')
+        parser.add_argument('--plans', action='store_true', help='Also print the full SQL and the EXPLAIN plan.')
+        parser.add_argument('--clear', action='store_true', help='Delete all entries.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} slow queries.'))
+            return
+
+        if not settings.SLOW_QUERY_MS:
+            self.stdout.write(self.style.WARNING('SLOW_QUERY_MS is not set; no new queries are being recorded.'))
+        entries = list(SlowQuery.objects.all()[:options['limit']])
+        for entry in entries:
+            self.stdout.write(f'{entry.created_at:%Y-%m-%d %H:%M:%S}  {entry.duration_ms:9.1f} ms  [{entry.database}]  '
+                              f'{entry.view or "-"}')
+            if entry.location:
+                self.stdout.write(f'    at {entry.location}')
+            if options['plans']:
+                self.stdout.write(f'    {entry.sql}')
+                for line in (entry.plan or '(not explained: same SQL explained shortly before)').splitlines():
+                    self.stdout.write(f'      {line}')
+            else:
+                self.stdout.write(f'    {entry.sql[:200]}')
+        self.stdout.write(self.style.SUCCESS(f'{len(entries)} of {SlowQuery.objects.count()} slow queries shown.'))
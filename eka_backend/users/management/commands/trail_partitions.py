@@ -0,0 +1,97 @@
+import re
+from datetime import date, datetime, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from users import cache
+
+PARENT = 'users_traildatapoint'
+DEFAULT_PARTITION = 'users_traildatapoint_default'
+PARTITION_NAME = re.compile(r'^users_traildatapoint_p(\d{8})$')
+
+class Command(BaseCommand):
+    help = ('Maintains the daily partitions of the TrailDataPoint table: creates partitions ahead of '
+            'time, moves rows out of the DEFAULT partition and drops partitions past retention. '
+            'Safe to run repeatedly (e.g. from a daily cron job and at deploy time).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days-ahead', type=int, default=7, help='Create partitions up to this many days after today.')
+        parser.add_argument('--days-back', type=int, default=0, help='Also make sure partitions exist this many days before today.')
+        parser.add_argument('--retention-days', type=int, default=settings.TRAIL_RETENTION_DAYS,
+                            help='Drop partitions older than this many days. 0 keeps everything.')
+        parser.add_argument('--dry-run', action='store_true', help='Only print what would change.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql' or not self._is_partitioned():
+            raise CommandError(f'{PARENT} is not a partitioned Postgres table; run migrations on Postgres first.')
+
+        self.dry_run = options['dry_run']
+        today = date.today()
+        retention = options['retention_days']
+        cutoff = today - timedelta(days=retention) if retention else None
+
+        existing = self._existing_partitions()
+        wanted = {today + timedelta(days=offset) for offset in range(-options['days_back'], options['days_ahead'] + 1)}
+        wanted |= set(self._default_partition_dates())
+        created = 0
+        for day in sorted(wanted):
+            if day in existing or (cutoff and day < cutoff):
+                continue
+            self._create_partition(day)
+            created += 1
+
+        dropped = 0
+        if cutoff:
+            for day in sorted(d for d in existing if d < cutoff):
+                self._run(f'DROP TABLE {self._name(day)}')
+                dropped += 1
+            self._run(f'DELETE FROM {DEFAULT_PARTITION} WHERE date < %s', [cutoff])
+            self._run('DELETE FROM users_trailavailability WHERE date < %s', [cutoff])
+            if not self.dry_run:
+                cache.invalidate(cache.FILTERS)
+
+        self.stdout.write(self.style.SUCCESS(f'Created {created} and dropped {dropped} trail partitions.'))
+
+    def _is_partitioned(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass', [PARENT])
+            return cursor.fetchone() is not None
+
+    def _existing_partitions(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+                'WHERE i.inhparent = %s::regclass', [PARENT]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        return {datetime.strptime(m.group(1), '%Y%m%d').date() for m in map(PARTITION_NAME.match, names) if m}
+
+    def _default_partition_dates(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT DISTINCT date FROM {DEFAULT_PARTITION}')
+            return [row[0] for row in cursor.fetchall()]
+
+    def _name(self, day):
+        return f'{PARENT}_p{day:%Y%m%d}'
+
+    def _create_partition(self, day):
+        name, bounds = self._name(day), (day, day + timedelta(days=1))
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE date = %s)', [day])
+                has_default_rows = cursor.fetchone()[0]
+            if not has_default_rows:
+                self._run(f'CREATE TABLE {name} PARTITION OF {PARENT} FOR VALUES FROM (%s) TO (%s)', bounds)
+                return
+            # Rows for this day already sit in the DEFAULT partition: move them
+            # into a standalone table first, then attach it.
+            self._run(f'CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+            self._run(f'INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE date = %s', [day])
+            self._run(f'DELETE FROM {DEFAULT_PARTITION} WHERE date = %s', [day])
+            self._run(f'ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)', bounds)
+
+    def _run(self, sql, params=None):
+        self.stdout.write(sql if params is None else f'{sql}  -- {list(params)}')
+        if not self.dry_run:
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
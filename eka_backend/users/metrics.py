@@ -0,0 +1,256 @@
+"""
+Request metrics in the Prometheus text exposition format.
+
+RequestMetricsMiddleware times every request and, per view (URL name):
+counts requests by method and status, keeps latency and queries-per-request
+histograms and sums database time, serializer time and response bytes.
+Database queries are counted by an execute wrapper installed on each
+connection (users.signals) and serializer time by the Measured* serializers
+and ReportsAPI.format_page, all reporting into a per-request context variable, so the same numbers come
+out of sync views, async views and the threads sync_to_async runs them in.
+The bookkeeping is a few counter updates under a lock per request.
+
+Each process keeps its own numbers. When METRICS_DIR is set, every process
+also writes a snapshot there (at most every METRICS_FLUSH_SECONDS) and
+/api/metrics/ adds up all snapshots, so whichever gunicorn worker answers a
+scrape reports the whole pod. Counters of exited workers are kept so totals
+never go backwards; their gauges are dropped once the snapshot goes stale.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+_current = ContextVar('eka_request_metrics', default=None)
+
+
+class RequestMetrics:
+    __slots__ = ('request', 'queries', 'query_seconds', 'serializer_seconds')
+
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.query_seconds = self.serializer_seconds = 0.0
+
+
+def current_request():
+    """The HttpRequest being handled in this context, if any."""
+    current = _current.get()
+    return current.request if current is not None else None
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper: counts and times queries of the current request."""
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.queries += 1
+        current.query_seconds += perf_counter() - started
+
+
+def record_serialization(seconds):
+    current = _current.get()
+    if current is not None:
+        current.serializer_seconds += seconds
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}        # (view, method, status) -> count
+        self.latency = {}         # (view, method) -> _Histogram
+        self.queries = {}         # view -> _Histogram
+        self.totals = {}          # view -> [db seconds, serializer seconds, response bytes]
+        self.flushed_at = 0.0
+
+    def observe(self, view, method, status, seconds, request_metrics, size):
+        with self._lock:
+            key = (view, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            latency = self.latency.get((view, method)) or self.latency.setdefault((view, method), _Histogram(LATENCY_BUCKETS))
+            latency.observe(seconds)
+            queries = self.queries.get(view) or self.queries.setdefault(view, _Histogram(QUERY_BUCKETS))
+            queries.observe(request_metrics.queries)
+            totals = self.totals.setdefault(view, [0.0, 0.0, 0])
+            totals[0] += request_metrics.query_seconds
+            totals[1] += request_metrics.serializer_seconds
+            totals[2] += size
+            flush = settings.METRICS_DIR and time.monotonic() - self.flushed_at >= settings.METRICS_FLUSH_SECONDS
+            if flush:
+                self.flushed_at = time.monotonic()
+        if flush:
+            self.flush()
+
+    def snapshot(self):
+        from .login_pool import login_pool
+        with self._lock:
+            snapshot = {
+                'requests': [[*key, value] for key, value in self.requests.items()],
+                'latency': [[*key, h.counts, h.sum] for key, h in self.latency.items()],
+                'queries': [[view, h.counts, h.sum] for view, h in self.queries.items()],
+                'totals': [[view, *values] for view, values in self.totals.items()],
+            }
+        pool = login_pool.stats()
+        snapshot['login_pool'] = {name: pool[name] for name in ('active', 'queued', 'completed', 'rejected')}
+        return snapshot
+
+    def flush(self):
+        path = os.path.join(settings.METRICS_DIR, f'metrics-{os.getpid()}.json')
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f'{path}.tmp', path)
+
+
+registry = Registry()
+
+
+def _merge(snapshots):
+    merged = {'requests': {}, 'latency': {}, 'queries': {}, 'totals': {}, 'login_pool': {}}
+    for snapshot, fresh in snapshots:
+        for *key, value in snapshot['requests']:
+            merged['requests'][tuple(key)] = merged['requests'].get(tuple(key), 0) + value
+        for name, width in (('latency', 2), ('queries', 1)):
+            for row in snapshot[name]:
+                key, counts, total = tuple(row[:width]), row[width], row[width + 1]
+                previous = merged[name].get(key)
+                merged[name][key] = (counts, total) if previous is None else (
+                    [a + b for a, b in zip(previous[0], counts)], previous[1] + total)
+        for view, *values in snapshot['totals']:
+            previous = merged['totals'].get(view, [0, 0, 0])
+            merged['totals'][view] = [a + b for a, b in zip(previous, values)]
+        for name, value in snapshot['login_pool'].items():
+            if fresh or name in ('completed', 'rejected'):
+                merged['login_pool'][name] = merged['login_pool'].get(name, 0) + value
+    return merged
+
+
+def _snapshots():
+    """This process's live snapshot plus, with METRICS_DIR, every other process's last one."""
+    own = registry.snapshot()
+    yield own, True
+    if not settings.METRICS_DIR or not os.path.isdir(settings.METRICS_DIR):
+        return
+    own_file = f'metrics-{os.getpid()}.json'
+    stale_before = time.time() - 3 * settings.METRICS_FLUSH_SECONDS
+    for name in os.listdir(settings.METRICS_DIR):
+        if name == own_file or not name.endswith('.json'):
+            continue
+        path = os.path.join(settings.METRICS_DIR, name)
+        try:
+            with open(path) as f:
+                yield json.load(f), os.path.getmtime(path) >= stale_before
+        except (OSError, ValueError):
+            continue
+
+
+def _labels(**labels):
+    return ','.join('{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                    for name, value in labels.items())
+
+
+def _histogram(lines, name, buckets, labels, counts, total):
+    cumulative = 0
+    for bound, count in zip((*buckets, '+Inf'), counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{{_labels(**labels, le=bound)}}} {cumulative}')
+    lines.append(f'{name}_sum{{{_labels(**labels)}}} {total}')
+    lines.append(f'{name}_count{{{_labels(**labels)}}} {cumulative}')
+
+
+def exposition():
+    """All metrics in the Prometheus text format (version 0.0.4)."""
+    merged = _merge(_snapshots())
+    lines = []
+
+    def header(name, kind, help_text):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+
+    header('eka_http_requests_total', 'counter', 'Requests by view, method and status.')
+    for (view, method, status), value in sorted(merged['requests'].items()):
+        lines.append(f'eka_http_requests_total{{{_labels(view=view, method=method, status=status)}}} {value}')
+    header('eka_http_request_duration_seconds', 'histogram', 'Time to produce the response.')
+    for (view, method), (counts, total) in sorted(merged['latency'].items()):
+        _histogram(lines, 'eka_http_request_duration_seconds', LATENCY_BUCKETS,
+                   {'view': view, 'method': method}, counts, total)
+    header('eka_db_queries_per_request', 'histogram', 'Database queries issued per request.')
+    for (view,), (counts, total) in sorted(merged['queries'].items()):
+        _histogram(lines, 'eka_db_queries_per_request', QUERY_BUCKETS, {'view': view}, counts, total)
+    for index, (name, help_text) in enumerate((
+        ('eka_db_query_seconds_total', 'Time spent in database queries.'),
+        ('eka_serializer_seconds_total', 'Time spent serializing response data.'),
+        ('eka_http_response_bytes_total', 'Response body bytes (streamed bodies are not counted).'),
+    )):
+        header(name, 'counter', help_text)
+        for view, values in sorted(merged['totals'].items()):
+            lines.append(f'{name}{{{_labels(view=view)}}} {values[index]}')
+    for name, kind in (('active', 'gauge'), ('queued', 'gauge'), ('completed', 'counter'), ('rejected', 'counter')):
+        metric = f'eka_login_pool_{name}' + ('_total' if kind == 'counter' else '')
+        header(metric, kind, f'Login password checks {name} (users.login_pool).')
+        lines.append(f"{metric} {merged['login_pool'].get(name, 0)}")
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request_metrics = RequestMetrics(request)
+        token = _current.set(request_metrics)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._observe(request, response, perf_counter() - started, request_metrics)
+        return response
+
+    async def __acall__(self, request):
+        request_metrics = RequestMetrics(request)
+        token = _current.set(request_metrics)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self._observe(request, response, perf_counter() - started, request_metrics)
+        return response
+
+    def _observe(self, request, response, seconds, request_metrics):
+        match = request.resolver_match
+        view = (match.view_name or match._func_path) if match else 'unmatched'
+        size = 0 if response.streaming else len(response.content)
+        registry.observe(view, request.method, response.status_code, seconds, request_metrics, size)
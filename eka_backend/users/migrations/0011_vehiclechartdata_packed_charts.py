@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:03
+
+from django.db import migrations, models
+
+
+def disable_packed_compression(apps, schema_editor):
+    # Packed float arrays barely compress; skip pglz so reads never pay for decompression.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('ALTER TABLE users_vehiclechartdata ALTER COLUMN packed_charts SET STORAGE EXTERNAL')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_performancestat_alter_fleetvehicle_active_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehiclechartdata',
+            name='packed_charts',
+            field=models.BinaryField(help_text='All four charts in users.chart_codec format; the JSON fields are left empty when set.', null=True),
+        ),
+        migrations.RunPython(disable_packed_compression, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations, models
+
+# TrailDataPoint becomes a Postgres table range-partitioned by date. The primary
+# key has to include the partition key, so it is (id, date); ids still come from
+# a single sequence and stay unique. Existing rows land in the DEFAULT partition
+# until `manage.py trail_partitions` moves them into daily partitions.
+PARTITION_SQL = """
+ALTER TABLE users_traildatapoint RENAME TO users_traildatapoint_unpartitioned;
+ALTER TABLE users_traildatapoint_unpartitioned ALTER COLUMN id DROP IDENTITY IF EXISTS;
+ALTER TABLE users_traildatapoint_unpartitioned ALTER COLUMN id DROP DEFAULT;
+DROP SEQUENCE IF EXISTS users_traildatapoint_id_seq;
+CREATE TABLE users_traildatapoint (
+    id bigint NOT NULL,
+    date date NOT NULL,
+    metrics jsonb NOT NULL,
+    ecu_data jsonb NOT NULL,
+    coordinates jsonb NOT NULL,
+    vehicle_id bigint NOT NULL,
+    PRIMARY KEY (id, date)
+) PARTITION BY RANGE (date);
+CREATE SEQUENCE users_traildatapoint_id_seq OWNED BY users_traildatapoint.id;
+ALTER TABLE users_traildatapoint ALTER COLUMN id SET DEFAULT nextval('users_traildatapoint_id_seq');
+ALTER TABLE users_traildatapoint ADD CONSTRAINT users_traildatapoint_vehicle_id_fk_users_trailvehicle_id
+    FOREIGN KEY (vehicle_id) REFERENCES users_trailvehicle (id) DEFERRABLE INITIALLY DEFERRED;
+CREATE TABLE users_traildatapoint_default PARTITION OF users_traildatapoint DEFAULT;
+INSERT INTO users_traildatapoint (id, date, metrics, ecu_data, coordinates, vehicle_id)
+    SELECT id, date, metrics, ecu_data, coordinates, vehicle_id FROM users_traildatapoint_unpartitioned;
+SELECT setval('users_traildatapoint_id_seq', COALESCE((SELECT MAX(id) FROM users_traildatapoint), 0) + 1, false);
+DROP TABLE users_traildatapoint_unpartitioned;
+"""
+
+UNPARTITION_SQL = """
+ALTER TABLE users_traildatapoint RENAME TO users_traildatapoint_partitioned;
+ALTER TABLE users_traildatapoint_partitioned ALTER COLUMN id DROP DEFAULT;
+DROP SEQUENCE users_traildatapoint_id_seq;
+CREATE TABLE users_traildatapoint (
+    id bigint NOT NULL PRIMARY KEY GENERATED BY DEFAULT AS IDENTITY,
+    date date NOT NULL,
+    metrics jsonb NOT NULL,
+    ecu_data jsonb NOT NULL,
+    coordinates jsonb NOT NULL,
+    vehicle_id bigint NOT NULL
+        CONSTRAINT users_traildatapoint_vehicle_id_fk_users_trailvehicle_id
+        REFERENCES users_trailvehicle (id) DEFERRABLE INITIALLY DEFERRED
+);
+CREATE INDEX users_traildatapoint_vehicle_id_idx ON users_traildatapoint (vehicle_id);
+INSERT INTO users_traildatapoint (id, date, metrics, ecu_data, coordinates, vehicle_id)
+    SELECT id, date, metrics, ecu_data, coordinates, vehicle_id FROM users_traildatapoint_partitioned;
+SELECT setval(pg_get_serial_sequence('users_traildatapoint', 'id'), COALESCE((SELECT MAX(id) FROM users_traildatapoint), 0) + 1, false);
+DROP TABLE users_traildatapoint_partitioned CASCADE;
+"""
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(PARTITION_SQL)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(UNPARTITION_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_vehiclechartdata_packed_charts'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+        migrations.AddIndex(
+            model_name='traildatapoint',
+            index=models.Index(fields=['vehicle', 'date'], name='users_trail_vehicle_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_traildatapoint_partitioning'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['name', 'id'], name='users_report_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:06
+
+from django.db import migrations, models
+from django.db.models.functions import TruncDate
+import django.db.models.deletion
+
+
+def backfill_facets(apps, schema_editor):
+    Report = apps.get_model('users', 'Report')
+    ReportFacet = apps.get_model('users', 'ReportFacet')
+    rows = (Report.objects.annotate(date_only=TruncDate('name'))
+            .values_list('registration_id', 'report_type', 'date_only').order_by().distinct())
+    ReportFacet.objects.bulk_create(
+        [ReportFacet(registration_id=reg_id, report_type=report_type, date=day) for reg_id, report_type, day in rows],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_report_name_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_type', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('registration', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_facets', to='users.vehicleregistration')),
+            ],
+            options={
+                'unique_together': {('registration', 'report_type', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_availability(apps, schema_editor):
+    TrailDataPoint = apps.get_model('users', 'TrailDataPoint')
+    TrailAvailability = apps.get_model('users', 'TrailAvailability')
+    rows = TrailDataPoint.objects.values_list('vehicle_id', 'date').order_by().distinct()
+    TrailAvailability.objects.bulk_create(
+        [TrailAvailability(vehicle_id=vehicle_id, date=day) for vehicle_id, day in rows], batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_reportfacet'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrailAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('vehicle', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='users.trailvehicle')),
+            ],
+            options={
+                'unique_together': {('vehicle', 'date')},
+            },
+        ),
+        migrations.RunPython(backfill_availability, migrations.RunPython.noop),
+    ]
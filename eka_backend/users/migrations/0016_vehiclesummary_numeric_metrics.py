@@ -0,0 +1,81 @@
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+# field -> (target unit, {unit as written: factor to the target unit})
+METRICS = {
+    'total_distance': ('km', {'km': 1, 'm': Decimal('0.001'), 'mi': Decimal('1.609344')}),
+    'co2_savings': ('kg', {'kg': 1, 'g': Decimal('0.001'), 't': 1000, 'ton': 1000, 'tons': 1000, 'tonne': 1000, 'tonnes': 1000}),
+    'avg_energy_consumption': ('kWh', {'kwh': 1, 'kwh/km': 1, 'wh': Decimal('0.001'), 'wh/km': Decimal('0.001')}),
+    'run_time': ('hrs', {'h': 1, 'hr': 1, 'hrs': 1, 'hour': 1, 'hours': 1, 'min': Decimal(1) / 60, 'mins': Decimal(1) / 60}),
+    'traction_energy': ('MWh', {'mwh': 1, 'kwh': Decimal('0.001'), 'gwh': 1000}),
+    'regen_energy': ('MWh', {'mwh': 1, 'kwh': Decimal('0.001'), 'gwh': 1000}),
+}
+QUANTITY = re.compile(r'^\s*(-?[\d,]*\.?\d+)\s*(\S*)\s*$')
+
+
+def parse(text, factors):
+    """'1,280 km' -> Decimal('1280'); a missing unit means the target unit, unparseable text 0."""
+    match = QUANTITY.match(str(text or ''))
+    if not match:
+        return Decimal(0)
+    try:
+        number = Decimal(match.group(1).replace(',', ''))
+    except InvalidOperation:
+        return Decimal(0)
+    unit = match.group(2).lower()
+    return (number * factors.get(unit, 1)).quantize(Decimal('0.001')) if unit else number
+
+
+def to_numbers(apps, schema_editor):
+    VehicleSummary = apps.get_model('users', 'VehicleSummary')
+    for summary in VehicleSummary.objects.all():
+        for field, (_, factors) in METRICS.items():
+            setattr(summary, f'{field}_value', parse(getattr(summary, field), factors))
+        summary.save()
+
+
+def to_strings(apps, schema_editor):
+    VehicleSummary = apps.get_model('users', 'VehicleSummary')
+    for summary in VehicleSummary.objects.all():
+        for field, (unit, _) in METRICS.items():
+            value = getattr(summary, f'{field}_value')
+            setattr(summary, field, f"{format(value.normalize(), 'f')} {unit}")
+        summary.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0015_trailavailability'),
+    ]
+
+    operations = [
+        *[
+            migrations.AddField(
+                model_name='vehiclesummary',
+                name=f'{field}_value',
+                field=models.DecimalField(decimal_places=3, default=0, max_digits=14),
+            )
+            for field in METRICS
+        ],
+        migrations.RunPython(to_numbers, to_strings),
+        *[
+            operation
+            for field, (unit, _) in METRICS.items()
+            for operation in (
+                # The default only lets the string column be re-added on unapply.
+                migrations.AlterField(
+                    model_name='vehiclesummary', name=field, field=models.CharField(default='', max_length=50),
+                ),
+                migrations.RemoveField(model_name='vehiclesummary', name=field),
+                migrations.RenameField(model_name='vehiclesummary', old_name=f'{field}_value', new_name=field),
+                migrations.AlterField(
+                    model_name='vehiclesummary',
+                    name=field,
+                    field=models.DecimalField(decimal_places=3, default=0, help_text=unit, max_digits=14),
+                ),
+            )
+        ],
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 06:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0016_vehiclesummary_numeric_metrics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupState',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('last_point_id', models.BigIntegerField(default=0)),
+                ('distance_km', models.FloatField(default=0)),
+                ('run_time_hrs', models.FloatField(default=0)),
+                ('energy_kwh', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VehicleRollupState',
+            fields=[
+                ('vehicle', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='rollup_state', serialize=False, to='users.trailvehicle')),
+                ('date', models.DateField()),
+                ('lat', models.FloatField()),
+                ('lng', models.FloatField()),
+                ('soc', models.FloatField(null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.30 on 2026-10-18 07:02
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0017_rollupstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vehicle',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0018_vehicle_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('duration_ms', models.FloatField()),
+                ('database', models.CharField(max_length=100)),
+                ('view', models.CharField(blank=True, help_text='View class and request path with its query string', max_length=200)),
+                ('location', models.CharField(blank=True, help_text='Innermost app frame that ran the query', max_length=300)),
+                ('sql', models.TextField()),
+                ('plan', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0019_slowquery'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='role',
+            field=models.CharField(choices=[('superuser', 'Superuser'), ('fleet_owner', 'Fleet Owner'), ('sales', 'Sales'), ('service', 'Service'), ('telemetry', 'Telemetry Device')], default='fleet_owner', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0020_user_telemetry_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupstate',
+            name='fence_point_id',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='rollupstate',
+            name='fence_xids',
+            field=models.JSONField(default=list),
+        ),
+    ]
@@ -1,6 +1,11 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import TruncDate
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
+
+from . import cache, chart_codec
 
 class User(AbstractUser):
   
@@ -9,6 +14,8 @@ class User(AbstractUser):
         ('fleet_owner', 'Fleet Owner'),
         ('sales', 'Sales'),
         ('service', 'Service'),
+        # Vehicle/gateway accounts that post to the telemetry ingestion endpoint.
+        ('telemetry', 'Telemetry Device'),
     )
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='fleet_owner')
     email = models.EmailField(unique=True)
@@ -47,22 +54,115 @@ class PerformanceStat(models.Model):
     def __str__(self):
         return self.title
 class VehicleSummary(models.Model):
-    fleet_type = models.CharField(max_length=100, unique=True); total_distance = models.CharField(max_length=50); co2_savings = models.CharField(max_length=50); avg_energy_consumption = models.CharField(max_length=50); run_time = models.CharField(max_length=50); traction_energy = models.CharField(max_length=50); regen_energy = models.CharField(max_length=50)
+    # Metrics are stored as numbers in fixed units (see METRIC_UNITS) so they can be aggregated in SQL.
+    METRIC_UNITS = {
+        'total_distance': 'km', 'co2_savings': 'kg', 'avg_energy_consumption': 'kWh',
+        'run_time': 'hrs', 'traction_energy': 'MWh', 'regen_energy': 'MWh',
+    }
+    fleet_type = models.CharField(max_length=100, unique=True)
+    total_distance = models.DecimalField(max_digits=14, decimal_places=3, default=0, help_text="km")
+    co2_savings = models.DecimalField(max_digits=14, decimal_places=3, default=0, help_text="kg")
+    avg_energy_consumption = models.DecimalField(max_digits=14, decimal_places=3, default=0, help_text="kWh")
+    run_time = models.DecimalField(max_digits=14, decimal_places=3, default=0, help_text="hrs")
+    traction_energy = models.DecimalField(max_digits=14, decimal_places=3, default=0, help_text="MWh")
+    regen_energy = models.DecimalField(max_digits=14, decimal_places=3, default=0, help_text="MWh")
 class Vehicle(models.Model):
     summary = models.ForeignKey(VehicleSummary, related_name='vehicles', on_delete=models.CASCADE); name = models.CharField(max_length=100); rating = models.CharField(max_length=10); speed = models.IntegerField(); soc = models.IntegerField(); range = models.IntegerField(); temp = models.IntegerField(); address = models.CharField(max_length=255)
+    # Bumped on every write; the live vehicle stream (users.live) polls on it.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 class VehicleType(models.Model):
     name = models.CharField(max_length=100, unique=True)
 class VehicleRegistration(models.Model):
     vehicle_type = models.ForeignKey(VehicleType, related_name='registrations', on_delete=models.CASCADE); registration_number = models.CharField(max_length=100, unique=True)
 class VehicleChartData(models.Model):
     registration = models.ForeignKey(VehicleRegistration, related_name='chart_data', on_delete=models.CASCADE); date = models.DateField(); battery_data = models.JSONField(default=dict); temperature_data = models.JSONField(default=dict); voltage_data = models.JSONField(default=dict); current_data = models.JSONField(default=dict)
+    packed_charts = models.BinaryField(null=True, editable=False, help_text="All four charts in users.chart_codec format; the JSON fields are left empty when set.")
     class Meta: unique_together = ('registration', 'date')
+    def set_charts(self, charts):
+        """Stores the charts packed when possible, falling back to the JSON fields."""
+        self.packed_charts = chart_codec.encode(charts)
+        for field in chart_codec.CHART_FIELDS:
+            setattr(self, field, {} if self.packed_charts is not None else charts.get(field, {}))
+    def get_charts(self):
+        if self.packed_charts is not None:
+            return chart_codec.decode(self.packed_charts)
+        return {field: getattr(self, field) for field in chart_codec.CHART_FIELDS}
 class TrailVehicle(models.Model):
     vehicle_type = models.CharField(max_length=100); registration_no = models.CharField(max_length=100, unique=True); fleet = models.CharField(max_length=100)
+class TrailDataPointQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Deletes the points, then drops the availability days they leave empty
+        in one statement and bumps the trail cache of the days touched (see
+        ReportQuerySet.delete for why not post_delete).
+        """
+        with transaction.atomic():
+            days = list(self.order_by().values_list('vehicle_id', 'date').distinct())
+            deleted = super().delete()
+            if TrailAvailability.prune(vehicle_id__in={vehicle_id for vehicle_id, _ in days}):
+                transaction.on_commit(lambda: cache.invalidate(cache.FILTERS))
+            for vehicle_id, day in days:
+                namespace = cache.trail_namespace(vehicle_id, day)
+                transaction.on_commit(lambda namespace=namespace: cache.bump_version(namespace))
+        return deleted
+
 class TrailDataPoint(models.Model):
+    objects = TrailDataPointQuerySet.as_manager()
     vehicle = models.ForeignKey(TrailVehicle, related_name='trail_data', on_delete=models.CASCADE); date = models.DateField(); metrics = models.JSONField(default=dict); ecu_data = models.JSONField(default=dict); coordinates = models.JSONField(default=dict)
-    class Meta: ordering = ['date']
+    class Meta:
+        ordering = ['date']
+        # On Postgres the table is range-partitioned by date (migration 0012, trail_partitions command).
+        indexes = [models.Index(fields=['vehicle', 'date'], name='users_trail_vehicle_date_idx')]
+    def delete(self, using=None, keep_parents=False):
+        return TrailDataPoint.objects.using(using).filter(pk=self.pk).delete()
+class TrailAvailability(models.Model):
+    """
+    Per-vehicle calendar of days that have trail data, so the Trails filter
+    list is one small query instead of a DISTINCT over TrailDataPoint per
+    vehicle. Written alongside trail points (ingestion, seeds, post_save),
+    pruned when points are deleted (TrailDataPointQuerySet.delete) and together
+    with expired trail partitions; deleting a vehicle cascades to it.
+    """
+    vehicle = models.ForeignKey(TrailVehicle, related_name='availability', on_delete=models.CASCADE)
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ('vehicle', 'date')
+
+    @classmethod
+    def record(cls, points):
+        """Adds the (vehicle, day) entries of the given points; returns True if any was new."""
+        keys = {(p.vehicle_id, p.date) for p in points}
+        if not keys:
+            return False
+        vehicle_ids, days = {key[0] for key in keys}, {key[1] for key in keys}
+        keys -= set(cls.objects.filter(vehicle_id__in=vehicle_ids, date__in=days).values_list('vehicle_id', 'date'))
+        if keys:
+            cls.objects.bulk_create([cls(vehicle_id=vehicle_id, date=day) for vehicle_id, day in keys], ignore_conflicts=True)
+        return bool(keys)
+
+    @classmethod
+    def prune(cls, **filters):
+        """Drops the entries (narrowed by filters) that have no point left, in one DELETE; returns True if any was."""
+        points = TrailDataPoint.objects.filter(vehicle_id=OuterRef('vehicle_id'), date=OuterRef('date'))
+        return bool(cls.objects.filter(**filters).exclude(Exists(points)).delete()[0])
+
+class ReportQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Deletes the reports, then drops the facets left without a report in one
+        statement. Done here rather than in a post_delete receiver, which would
+        make Django load and delete every report (and cascade) row by row.
+        """
+        with transaction.atomic():
+            registration_ids = set(self.order_by().values_list('registration_id', flat=True).distinct())
+            deleted = super().delete()
+            if ReportFacet.prune(registration_id__in=registration_ids):
+                transaction.on_commit(lambda: cache.invalidate(cache.FILTERS))
+        return deleted
+
 class Report(models.Model):
+    objects = ReportQuerySet.as_manager()
     registration = models.ForeignKey(VehicleRegistration, related_name='reports', on_delete=models.CASCADE)
     report_type = models.CharField(max_length=100)
     name = models.DateTimeField()
@@ -71,5 +171,113 @@ class Report(models.Model):
     signal0 = models.CharField(max_length=50)
     signal1 = models.CharField(max_length=50)
     signal2 = models.CharField(max_length=50)
-    class Meta: ordering = ['-name']
-    def __str__(self): return f"Report for {self.registration.registration_number} at {self.name}"
\ No newline at end of file
+    class Meta:
+        ordering = ['-name']
+        # Backs the (name, id) keyset used by ReportKeysetPagination.
+        indexes = [models.Index(fields=['name', 'id'], name='users_report_name_id_idx')]
+    def __str__(self): return f"Report for {self.registration.registration_number} at {self.name}"
+    def delete(self, using=None, keep_parents=False):
+        return Report.objects.using(using).filter(pk=self.pk).delete()
+class ReportFacet(models.Model):
+    """
+    One row per (registration, report_type, day) that has at least one Report.
+    Backs the ReportsAPI filter dropdowns so they never scan the Report table.
+    Kept up to date by the Report post_save signal and ReportFacet.record()
+    for bulk writes, pruned when reports are deleted (ReportQuerySet.delete);
+    `manage.py rebuild_report_facets` recomputes it after writes that bypass
+    both (raw SQL, TRUNCATE).
+    """
+    registration = models.ForeignKey(VehicleRegistration, related_name='report_facets', on_delete=models.CASCADE)
+    report_type = models.CharField(max_length=100)
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ('registration', 'report_type', 'date')
+
+    @classmethod
+    def record(cls, reports):
+        """Adds the facets of the given reports; returns True if any combination was new."""
+        keys = {(r.registration_id, r.report_type, cls._day(r.name)) for r in reports}
+        if not keys:
+            return False
+        existing = cls.objects.filter(
+            registration_id__in={key[0] for key in keys}, report_type__in={key[1] for key in keys},
+            date__in={key[2] for key in keys},
+        ).values_list('registration_id', 'report_type', 'date')
+        keys -= set(existing)
+        if keys:
+            cls.objects.bulk_create(
+                [cls(registration_id=reg_id, report_type=report_type, date=day) for reg_id, report_type, day in keys],
+                ignore_conflicts=True,
+            )
+        return bool(keys)
+
+    @staticmethod
+    def _day(name):
+        """Local day of a Report.name as assigned: aware or naive datetime, or a string not yet parsed by save()."""
+        name = Report._meta.get_field('name').to_python(name)
+        if timezone.is_naive(name):
+            # Stored as if in the default time zone, like the DateTimeField does on save.
+            name = timezone.make_aware(name, timezone.get_default_timezone())
+        return timezone.localtime(name).date()
+
+    @classmethod
+    def prune(cls, **filters):
+        """Drops the facets (narrowed by filters) that no report is left for, in one DELETE; returns True if any was."""
+        reports = Report.objects.filter(registration_id=OuterRef('registration_id'),
+                                        report_type=OuterRef('report_type'), name__date=OuterRef('date'))
+        return bool(cls.objects.filter(**filters).exclude(Exists(reports)).delete()[0])
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes every facet from the Report table (used after bulk deletes)."""
+        rows = (Report.objects.annotate(date_only=TruncDate('name'))
+                .values_list('registration_id', 'report_type', 'date_only').order_by().distinct())
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                [cls(registration_id=reg_id, report_type=report_type, date=day) for reg_id, report_type, day in rows],
+                batch_size=5000,
+            )
+
+class RollupState(models.Model):
+    """
+    Watermark and running totals of the telemetry rollup (users.rollups).
+    `last_point_id` is the highest TrailDataPoint id already folded into the totals;
+    `fence_point_id` the next one it may advance to, once every transaction in
+    `fence_xids` has finished.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    last_point_id = models.BigIntegerField(default=0)
+    fence_point_id = models.BigIntegerField(null=True)
+    fence_xids = models.JSONField(default=list)
+    distance_km = models.FloatField(default=0)
+    run_time_hrs = models.FloatField(default=0)
+    energy_kwh = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class VehicleRollupState(models.Model):
+    """Last position and state of charge seen per vehicle, so distance and energy can be computed incrementally."""
+    vehicle = models.OneToOneField(TrailVehicle, primary_key=True, related_name='rollup_state', on_delete=models.CASCADE)
+    date = models.DateField()
+    lat = models.FloatField()
+    lng = models.FloatField()
+    soc = models.FloatField(null=True)
+
+class SlowQuery(models.Model):
+    """
+    A query that took longer than SLOW_QUERY_MS, with its plan (users.slow_queries).
+    Only the newest SLOW_QUERY_LOG_SIZE rows are kept.
+    """
+    created_at = models.DateTimeField(auto_now_add=True)
+    duration_ms = models.FloatField()
+    database = models.CharField(max_length=100)
+    view = models.CharField(max_length=200, blank=True, help_text="View class and request path with its query string")
+    location = models.CharField(max_length=300, blank=True, help_text="Innermost app frame that ran the query")
+    sql = models.TextField()
+    plan = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-id']
+
+    def __str__(self): return f"{self.duration_ms:.0f} ms {self.view or self.location}"
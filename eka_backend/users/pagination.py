@@ -0,0 +1,140 @@
+import base64
+import json
+from collections import OrderedDict
+from datetime import datetime
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ReportPagination(PageNumberPagination):
+    page_size = 10
+    # Allow the frontend to override the page size with a 'page_size' query param
+    page_size_query_param = 'page_size'
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset() with the COUNT and the page fetch done through the async ORM."""
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+        self.request = request
+        return list(self.page)
+
+
+class ReportKeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over Report ordered by (-name, -id).
+
+    Each page is fetched with `WHERE name <= last_name AND (name < last_name
+    OR id < last_id)` plus a LIMIT: the (name, id) index is entered at the
+    cursor and read in order, so latency does not grow with depth. No COUNT(*)
+    is issued unless the client passes `include_count=true`. Cursors are
+    opaque, url-safe tokens returned in `next` / `previous`.
+
+    Pagination happens in two steps, get_page_queryset() and build_page(), so
+    async views can evaluate the queryset themselves.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    count_query_param = 'include_count'
+    ordering = ('-name', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request)
+        if self.include_count:
+            self.count = queryset.count()
+        return self.build_page(list(page_queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        page_queryset = self.get_page_queryset(queryset, request)
+        if self.include_count:
+            self.count = await queryset.acount()
+        return self.build_page([row async for row in page_queryset])
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        self.include_count = request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes')
+        self.count = None
+        if self.cursor is None:
+            return queryset.order_by(*self.ordering)[:self.page_size + 1]
+        (name, pk), reverse = self.cursor
+        # (name, id) beyond the cursor. The plain bound on name (a conjunct, not
+        # inside the OR) is what lets the (name, id) index seek straight to it.
+        if reverse:
+            seek = Q(name__gte=name) & (Q(name__gt=name) | Q(id__gt=pk))
+            return queryset.filter(seek).order_by('name', 'id')[:self.page_size + 1]
+        seek = Q(name__lte=name) & (Q(name__lt=name) | Q(id__lt=pk))
+        return queryset.filter(seek).order_by(*self.ordering)[:self.page_size + 1]
+
+    def build_page(self, rows):
+        reverse = self.cursor is not None and self.cursor[1]
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = self.cursor is not None, has_more
+        self.page = rows
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        payload = OrderedDict()
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return payload
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+
+    def _link(self, row, reverse):
+        name, pk = (row['name'], row['id']) if isinstance(row, dict) else (row.name, row.id)
+        token = json.dumps({'k': [name.isoformat(), pk], 'r': reverse}, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(token.encode()).decode().rstrip('=')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            token = json.loads(base64.urlsafe_b64decode(encoded + '=' * (-len(encoded) % 4)))
+            name, pk = token['k']
+            return (datetime.fromisoformat(name), int(pk)), bool(token['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound('Invalid cursor')
@@ -0,0 +1,24 @@
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+# Roles allowed to write telemetry besides superusers.
+TELEMETRY_ROLES = ('telemetry',)
+
+
+class CanIngestTelemetry(BasePermission):
+    """Telemetry device accounts and superusers; dashboard users can read telemetry but not write it."""
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated
+                    and (user.is_superuser or getattr(user, 'role', None) in TELEMETRY_ROLES))
+
+
+class HasMetricsToken(BasePermission):
+    """Requests carrying `Authorization: Bearer <settings.METRICS_TOKEN>`; nobody when the token is unset."""
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        return bool(token and scheme.lower() == 'bearer'
+                    and hmac.compare_digest(credentials.strip().encode(), token.encode()))
@@ -0,0 +1,38 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # optional; FastJSONRenderer then renders like JSONRenderer
+    orjson = None
+
+
+class EventStreamRenderer(JSONRenderer):
+    """
+    Lets `Accept: text/event-stream` through content negotiation. The stream
+    itself is a StreamingHttpResponse; this only renders error responses
+    (e.g. 401), as JSON.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when it is installed, several times
+    faster on large pages. The output is the same bytes for strings, ints,
+    bools, dicts and lists (DRF's compact, non-ASCII-escaping style with
+    U+2028/U+2029 escaped); datetimes and other non-native types go through
+    DRF's encoder. Floats are written in orjson's shortest form (1e16 rather
+    than 1e+16), so use it on endpoints whose data is not float-heavy.
+    Indented output (`Accept: application/json; indent=4`, the browsable API)
+    and anything orjson cannot encode fall back to JSONRenderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -0,0 +1,152 @@
+"""
+Read-replica routing for opted-in read-only views.
+
+Views mixing in ReplicaReadsMixin pick a replica in initial() and the
+router sends that request's reads to it; everything else, and every write,
+goes to 'default'. The choice lives in a context variable, so it follows
+the request through sync_to_async/async ORM calls and into streamed
+responses, and is cleared on request_finished (users.signals).
+
+A replica is skipped, and the primary used instead, when:
+  * the user made a successful write (POST/PUT/PATCH/DELETE) within the last
+    REPLICA_STICKY_SECONDS, so they read their own writes
+    (ReplicaStickinessMiddleware records this in the cache, which must be
+    shared across pods for it to hold everywhere), or
+  * it lags behind by more than REPLICA_MAX_LAG_SECONDS or can't be reached;
+    lag is measured at most every REPLICA_LAG_CHECK_SECONDS per process.
+
+Data built for the shared response cache is read inside primary_reads():
+cache keys carry the version bumped when the primary committed, so a
+replica still behind that commit would store stale data under the new key
+for every user, the just-pinned writer included.
+"""
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_read_alias = ContextVar('eka_read_alias', default=None)
+# alias -> (checked_at, healthy)
+_health = {}
+
+LAG_SQL = (
+    'SELECT CASE WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+def _pin_key(user_id):
+    return f'eka:primary-pin:{user_id}'
+
+
+def replica_lag(alias):
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(LAG_SQL)
+        return float(cursor.fetchone()[0] or 0)
+
+
+def is_healthy(alias):
+    now = time.monotonic()
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is not None and now - checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+        return healthy
+    try:
+        lag = replica_lag(alias)
+        healthy = lag <= settings.REPLICA_MAX_LAG_SECONDS
+        if not healthy:
+            logger.warning('Replica %s is %.1fs behind; reading from the primary', alias, lag)
+    except DatabaseError:
+        logger.warning('Replica %s is unreachable; reading from the primary', alias, exc_info=True)
+        healthy = False
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica(request):
+    """A healthy replica alias for this request, or None to stay on the primary."""
+    if not settings.REPLICA_DATABASES or request.method not in SAFE_METHODS:
+        return None
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and cache.get(_pin_key(user.pk)):
+        return None
+    candidates = [alias for alias in settings.REPLICA_DATABASES if is_healthy(alias)]
+    return random.choice(candidates) if candidates else None
+
+
+def reset():
+    _read_alias.set(None)
+
+
+@contextmanager
+def primary_reads():
+    """Sends the reads made inside the block to the primary, whatever replica the request was given."""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaReadsMixin:
+    """Opts an APIView in to replica reads for safe methods."""
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        _read_alias.set(choose_replica(request))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaStickinessMiddleware:
+    """Pins a user to the primary for REPLICA_STICKY_SECONDS after a successful write."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        if self._wrote(request, response):
+            cache.set(_pin_key(request.user.pk), True, timeout=settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self._wrote(request, response):
+            await cache.aset(_pin_key(request.user.pk), True, timeout=settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    def _wrote(self, request, response):
+        # DRF copies the user it authenticated onto the Django request.
+        user = getattr(request, 'user', None)
+        return (request.method not in SAFE_METHODS and response.status_code < 400
+                and user is not None and user.is_authenticated)
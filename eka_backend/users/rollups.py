@@ -0,0 +1,179 @@
+"""
+Incremental telemetry rollups feeding the dashboard PerformanceStat rows.
+
+Running totals (distance, run time, energy) live in a RollupState row along
+with a watermark: the highest TrailDataPoint id already counted. advance()
+only reads points above the watermark, so the cost is proportional to new
+telemetry, never to history. It runs periodically (`manage.py run_rollups`,
+a CronJob in k8s), never on the ingestion path: ingestion only inserts.
+
+Ids are drawn from a sequence before their transaction commits, so a lower id
+can become visible after a higher one was read. The watermark therefore only
+moves up to a fence: the highest id handed out when the fence was raised,
+released once every write transaction in flight at that moment has finished.
+Until then the run folds nothing and the fence is checked again next run.
+Writers of trail points call claim_transaction_id() first, so a transaction
+holding one of those ids is always among the ones the fence waits for. On
+other databases writes are serialised and the fence is the highest id.
+"""
+from math import asin, cos, radians, sin, sqrt
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+
+from . import cache
+from .models import PerformanceStat, RollupState, TrailDataPoint, VehicleRollupState
+
+FLEET = 'fleet'
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(radians, (lat1, lng1, lat2, lng2))
+    a = sin((lat2 - lat1) / 2) ** 2 + cos(lat1) * cos(lat2) * sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * asin(sqrt(a))
+
+
+def _metric(metrics, name):
+    try:
+        return float(metrics[name]['value'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def lock_state():
+    """Locks (creating if needed) the fleet rollup row until the surrounding transaction ends."""
+    RollupState.objects.get_or_create(name=FLEET)
+    return RollupState.objects.select_for_update().get(name=FLEET)
+
+
+def claim_transaction_id():
+    """
+    Gives the current transaction its id before it draws any trail point id.
+    Postgres assigns one only at the first row written, which would leave a
+    moment where a point id is handed out by a transaction the fence can't see.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_current_xact_id()')
+
+
+def advance(batch_size=None):
+    """Folds the points up to the fence into the totals once it has settled. Returns the number of points read."""
+    with transaction.atomic():
+        return _advance(lock_state(), batch_size)
+
+
+def rebuild():
+    """Resets the watermark, fence and totals and recomputes them from all telemetry."""
+    with transaction.atomic():
+        state = lock_state()
+        state.last_point_id = 0
+        # A stale fence would pull the watermark back up past point ids reused since (e.g. after a reset).
+        state.fence_point_id, state.fence_xids = None, []
+        state.distance_km = state.run_time_hrs = state.energy_kwh = 0
+        VehicleRollupState.objects.all().delete()
+        if not _advance(state):
+            publish(state)
+
+
+def _advance(state, batch_size=None):
+    if state.fence_point_id is None:
+        _raise_fence(state)
+    processed = 0
+    # The second pass reaches points written since the last run when none are still in flight.
+    for _ in range(2):
+        if not _settled(state):
+            break
+        processed += _fold(state, state.fence_point_id, batch_size or settings.ROLLUP_BATCH_SIZE)
+        _raise_fence(state)
+    state.save()
+    if processed:
+        publish(state)
+    return processed
+
+
+def _raise_fence(state):
+    if connection.vendor != 'postgresql':
+        state.fence_point_id = TrailDataPoint.objects.aggregate(highest=Max('id'))['highest'] or 0
+        state.fence_xids = []
+        return
+    with connection.cursor() as cursor:
+        # The sequence is read before the snapshot: a transaction that drew an id
+        # below the fence has committed, aborted or is listed as in flight.
+        cursor.execute("SELECT pg_get_serial_sequence('users_traildatapoint', 'id')")
+        cursor.execute(f'SELECT last_value, is_called FROM {cursor.fetchone()[0]}')
+        last_value, is_called = cursor.fetchone()
+        cursor.execute(
+            'SELECT xid::text FROM pg_snapshot_xip(pg_current_snapshot()) AS xid '
+            'WHERE xid IS DISTINCT FROM pg_current_xact_id_if_assigned()'
+        )
+        state.fence_xids = [int(row[0]) for row in cursor.fetchall()]
+    state.fence_point_id = last_value if is_called else last_value - 1
+
+
+def _settled(state):
+    if not state.fence_xids:
+        return True
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM unnest(%s::text[]::xid8[]) AS xid WHERE pg_xact_status(xid) = 'in progress'",
+            [[str(xid) for xid in state.fence_xids]],
+        )
+        return cursor.fetchone()[0] == 0
+
+
+def _fold(state, upper, batch_size):
+    sample_hours = settings.ROLLUP_SAMPLE_INTERVAL_SECONDS / 3600
+    battery_kwh = settings.ROLLUP_BATTERY_CAPACITY_KWH
+    processed = 0
+    while state.last_point_id < upper:
+        rows = list(
+            TrailDataPoint.objects.filter(id__gt=state.last_point_id, id__lte=upper).order_by('id')
+            .values_list('id', 'vehicle_id', 'date', 'metrics', 'coordinates')[:batch_size]
+        )
+        if not rows:
+            break
+        vehicles = VehicleRollupState.objects.in_bulk({row[1] for row in rows})
+        for point_id, vehicle_id, day, metrics, coordinates in rows:
+            lat, lng = coordinates.get('lat'), coordinates.get('lng')
+            soc, speed = _metric(metrics, 'soc'), _metric(metrics, 'speed')
+            previous = vehicles.get(vehicle_id)
+            # Distance and energy are only measured between consecutive points of the same day.
+            if previous is not None and previous.date == day and lat is not None and lng is not None:
+                state.distance_km += haversine_km(previous.lat, previous.lng, lat, lng)
+                if soc is not None and previous.soc is not None and soc < previous.soc:
+                    state.energy_kwh += (previous.soc - soc) / 100 * battery_kwh
+            if speed:
+                state.run_time_hrs += sample_hours
+            if lat is not None and lng is not None:
+                vehicles[vehicle_id] = VehicleRollupState(vehicle_id=vehicle_id, date=day, lat=lat, lng=lng, soc=soc)
+        state.last_point_id = rows[-1][0]
+        processed += len(rows)
+        VehicleRollupState.objects.bulk_create(
+            vehicles.values(), update_conflicts=True,
+            unique_fields=['vehicle'], update_fields=['date', 'lat', 'lng', 'soc'],
+        )
+        if len(rows) < batch_size:
+            break
+    # Everything up to a settled fence is visible: ids still missing below it never will be.
+    state.last_point_id = max(state.last_point_id, upper)
+    return processed
+
+
+def publish(state):
+    """Writes the totals into the dashboard's PerformanceStat rows."""
+    co2_kg = state.distance_km * settings.ROLLUP_CO2_SAVINGS_KG_PER_KM
+    energy_per_km = state.energy_kwh / state.distance_km if state.distance_km else 0
+    values = {
+        'total_distance': ('Total Distance', f'{state.distance_km:,.0f} km', 1),
+        'co2_savings': ('CO2 Savings', f'{co2_kg / 1000:,.1f} tons' if co2_kg >= 1000 else f'{co2_kg:,.0f} kg', 2),
+        'avg_energy_consumption': ('Avg. Energy Consumption', f'{energy_per_km:.2f} kWh/km', 3),
+        'total_run_time': ('Total Run Time', f'{state.run_time_hrs:,.0f} hrs', 4),
+    }
+    for key, (title, value, order) in values.items():
+        if not PerformanceStat.objects.filter(key=key).update(value=value):
+            PerformanceStat.objects.create(key=key, title=title, value=value, order=order)
+    # update() skips the model signals, so drop the cached dashboard explicitly.
+    transaction.on_commit(lambda: cache.invalidate(cache.DASHBOARD))
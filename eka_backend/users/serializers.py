@@ -1,17 +1,52 @@
+from time import perf_counter
+
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
-from .models import (FleetVehicle, Report,
-                     TrailVehicle, Vehicle, VehicleChartData, VehicleRegistration,
-                     VehicleSummary, VehicleType)
+from . import metrics
+from .authentication import UserRefreshToken, set_user_claims
+from .models import (FleetVehicle, Report, Vehicle, VehicleChartData,
+                     VehicleSummary)
+from .permissions import TELEMETRY_ROLES
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class MeasuredDataMixin:
+    """Reports the time spent building .data to users.metrics."""
+    @property
+    def data(self):
+        started = perf_counter()
+        try:
+            return super().data
+        finally:
+            metrics.record_serialization(perf_counter() - started)
+
+class MeasuredListSerializer(MeasuredDataMixin, serializers.ListSerializer):
+    pass
+
+class MeasuredModelSerializer(MeasuredDataMixin, serializers.ModelSerializer):
+    """Output serializers used with many=True also set Meta.list_serializer_class = MeasuredListSerializer."""
+
+class UserSerializer(MeasuredModelSerializer):
     name = serializers.CharField(source='username')
     class Meta:
         model = User
         fields = ('id', 'name', 'email', 'role')
+        list_serializer_class = MeasuredListSerializer
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """Re-reads the user's claims on every refresh, so role changes and deactivation reach new access tokens."""
+    token_class = UserRefreshToken
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user = User.objects.filter(pk=refresh.get(api_settings.USER_ID_CLAIM)).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('User not found or inactive.', code='user_inactive')
+        set_user_claims(refresh, user)
+        return super().validate({**attrs, 'refresh': str(refresh)})
 
 class RegisterSerializer(serializers.ModelSerializer):
     class Meta:
@@ -21,68 +56,58 @@ class RegisterSerializer(serializers.ModelSerializer):
             'password': {'write_only': True},
             'role': {'default': 'fleet_owner'}
         }
+    def validate_role(self, value):
+        # Telemetry device accounts can write data; an administrator creates them.
+        if value in TELEMETRY_ROLES:
+            raise serializers.ValidationError('This role cannot be chosen at sign-up.')
+        return value
     def create(self, validated_data):
         return User.objects.create_user(**validated_data)
 
-class FleetVehicleSerializer(serializers.ModelSerializer):
+class FleetVehicleSerializer(MeasuredModelSerializer):
     value = serializers.IntegerField(source='total_count')
     active = serializers.IntegerField(source='active_count')
     class Meta:
         model = FleetVehicle
         fields = ('title', 'value', 'active', 'special')
+        list_serializer_class = MeasuredListSerializer
 
 class VehicleSerializer(serializers.ModelSerializer):
     class Meta:
         model = Vehicle
         fields = ('name', 'rating', 'speed', 'soc', 'range', 'temp', 'address')
 
-class VehicleSummarySerializer(serializers.ModelSerializer):
+class VehicleSummarySerializer(MeasuredModelSerializer):
     vehicles = VehicleSerializer(many=True, read_only=True)
     fleet_name = serializers.CharField(source='fleet_type')
     summary_data = serializers.SerializerMethodField()
     class Meta:
         model = VehicleSummary
         fields = ('fleet_name', 'summary_data', 'vehicles')
+    SUMMARY_TITLES = (
+        ('total_distance', 'Total Distance'),
+        ('co2_savings', 'CO2 Savings'),
+        ('avg_energy_consumption', 'Avg. Energy Consumption'),
+        ('run_time', 'Run Time'),
+        ('traction_energy', 'Traction Energy'),
+        ('regen_energy', 'Regen. Energy'),
+    )
     def get_summary_data(self, obj):
+        # Values are rendered as plain strings ('1280', '0.9') like the unit-suffixed text they replace.
         return [
-            {'title': 'Total Distance', 'value': str(obj.total_distance).split()[0], 'unit': 'km'},
-            {'title': 'CO2 Savings', 'value': str(obj.co2_savings).split()[0], 'unit': 'kg'},
-            {'title': 'Avg. Energy Consumption', 'value': str(obj.avg_energy_consumption).split()[0], 'unit': 'kWh'},
-            {'title': 'Run Time', 'value': str(obj.run_time).split()[0], 'unit': 'hrs'},
-            {'title': 'Traction Energy', 'value': str(obj.traction_energy).split()[0], 'unit': 'MWh'},
-            {'title': 'Regen. Energy', 'value': str(obj.regen_energy).split()[0], 'unit': 'MWh'}
+            {'title': title, 'value': format(getattr(obj, field).normalize(), 'f'), 'unit': VehicleSummary.METRIC_UNITS[field]}
+            for field, title in self.SUMMARY_TITLES
         ]
 
-class VehicleChartDataSerializer(serializers.ModelSerializer):
+class VehicleChartDataSerializer(MeasuredModelSerializer):
     class Meta:
         model = VehicleChartData
         fields = ('battery_data', 'temperature_data', 'voltage_data', 'current_data')
+    def to_representation(self, instance):
+        # Packed rows keep their charts in a single binary column.
+        return instance.get_charts()
 
-class VehicleRegistrationSerializer(serializers.ModelSerializer):
-    dates = serializers.SerializerMethodField()
-    class Meta:
-        model = VehicleRegistration
-        fields = ('id', 'registration_number', 'dates')
-    def get_dates(self, obj):
-        # PERFORMANCE NOTE: Ensure the view uses .prefetch_related('registrations__chart_data')
-        return obj.chart_data.values_list('date', flat=True).order_by('-date')
-
-class VehicleTypeSerializer(serializers.ModelSerializer):
-    registrations = VehicleRegistrationSerializer(many=True, read_only=True)
-    class Meta:
-        model = VehicleType
-        fields = ('id', 'name', 'registrations')
-
-class TrailVehicleSerializer(serializers.ModelSerializer):
-    available_dates = serializers.SerializerMethodField()
-    class Meta:
-        model = TrailVehicle
-        fields = ('id', 'vehicle_type', 'registration_no', 'fleet', 'available_dates')
-    def get_available_dates(self, obj):
-        # PERFORMANCE NOTE: Ensure the view uses .prefetch_related('trail_data')
-        return obj.trail_data.values_list('date', flat=True).distinct().order_by('-date')
-
-class ReportSerializer(serializers.ModelSerializer):
+class ReportSerializer(MeasuredModelSerializer):
     name = serializers.DateTimeField(format="%d %b %Y, %H:%M")
     registration_number = serializers.CharField(source='registration.registration_number', read_only=True)
     vehicle_type = serializers.CharField(source='registration.vehicle_type.name', read_only=True)
@@ -100,4 +125,5 @@ class ReportSerializer(serializers.ModelSerializer):
             'signal0', 
             'signal1', 
             'signal2'
-        )
\ No newline at end of file
+        )
+        list_serializer_class = MeasuredListSerializer
\ No newline at end of file
@@ -0,0 +1,83 @@
+"""
+Model signal receivers. Cache versions are bumped on commit: bumped any earlier,
+a concurrent read could cache the pre-commit rows under the new version.
+Outside a transaction on_commit() runs the bump at once.
+"""
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, metrics, replicas, slow_queries
+from .authentication import user_cache
+from .cache import bump_version, chart_namespace, trail_namespace
+from .models import (FleetVehicle, PerformanceStat, Report, ReportFacet, TrailAvailability,
+                     TrailDataPoint, TrailVehicle, User, Vehicle, VehicleChartData, VehicleRegistration,
+                     VehicleSummary, VehicleType)
+
+
+@receiver(post_save, sender=Report)
+def record_report_facet(sender, instance, **kwargs):
+    if ReportFacet.record([instance]):
+        transaction.on_commit(lambda: cache.invalidate(cache.FILTERS))
+
+
+@receiver(post_save, sender=TrailDataPoint)
+def record_trail_availability(sender, instance, created, **kwargs):
+    # Only a new day changes the cached Trails filter list.
+    if created and TrailAvailability.record([instance]):
+        transaction.on_commit(lambda: cache.invalidate(cache.FILTERS))
+    namespace = trail_namespace(instance.vehicle_id, instance.date)
+    transaction.on_commit(lambda: bump_version(namespace))
+
+
+@receiver(post_save, sender=VehicleChartData)
+def invalidate_chart_cache(sender, instance, created, **kwargs):
+    namespace = chart_namespace(instance.registration_id, instance.date)
+    transaction.on_commit(lambda: bump_version(namespace))
+    if created:
+        transaction.on_commit(lambda: cache.invalidate(cache.FILTERS))
+
+
+@receiver([post_save, post_delete], sender=VehicleType)
+@receiver([post_save, post_delete], sender=VehicleRegistration)
+@receiver([post_save, post_delete], sender=TrailVehicle)
+@receiver(post_delete, sender=VehicleChartData)
+def invalidate_filter_cache(sender, **kwargs):
+    transaction.on_commit(lambda: cache.invalidate(cache.FILTERS))
+
+
+@receiver([post_save, post_delete], sender=FleetVehicle)
+@receiver([post_save, post_delete], sender=PerformanceStat)
+def invalidate_dashboard_cache(sender, **kwargs):
+    transaction.on_commit(lambda: cache.invalidate(cache.DASHBOARD))
+
+
+@receiver([post_save, post_delete], sender=VehicleSummary)
+@receiver([post_save, post_delete], sender=Vehicle)
+def invalidate_vehicle_selection_cache(sender, **kwargs):
+    transaction.on_commit(lambda: cache.invalidate(cache.VEHICLE_SELECTION))
+
+
+@receiver([post_save, post_delete], sender=User)
+def drop_cached_user(sender, instance, **kwargs):
+    user_cache.discard(instance.pk)
+
+
+@receiver(request_finished)
+def reset_replica_reads(sender, **kwargs):
+    replicas.reset()
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    # Fires again on reconnect of the same connection object; install once.
+    if metrics.record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.record_query)
+
+
+@receiver(connection_created)
+def install_slow_query_capture(sender, connection, **kwargs):
+    if slow_queries.enabled() and slow_queries.capture not in connection.execute_wrappers:
+        connection.execute_wrappers.append(slow_queries.capture)
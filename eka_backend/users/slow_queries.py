@@ -0,0 +1,138 @@
+"""
+Opt-in capture of slow ORM queries (SLOW_QUERY_MS, off by default).
+
+When enabled, an execute wrapper on every connection (users.signals) times
+each query. One that takes SLOW_QUERY_MS or longer is stored as a SlowQuery
+row with:
+
+- the view that issued it: view class, method and the request path with its
+  query string, e.g. "ReportsAPI GET /api/reports/?report_type=Fault&...",
+  which is the filter combination the queryset was built from;
+- the innermost frame in this app that ran it (get_queryset, a serializer, ...);
+- the SQL with its parameters interpolated;
+- its plan: SELECTs are run again under EXPLAIN (ANALYZE, BUFFERS) on Postgres
+  (plain EXPLAIN elsewhere), at most once per SQL statement per
+  SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS per process, so a slow query that runs
+  hot does not run twice as often. Later captures in that window have no plan.
+
+The table is a ring buffer of the newest SLOW_QUERY_LOG_SIZE rows. Read it
+in the admin or with `manage.py slow_queries`.
+"""
+import logging
+import os
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__)) + os.sep
+# Frames skipped when looking for the code that ran a query: the execute wrappers themselves.
+WRAPPER_FILES = {os.path.join(APP_DIR, 'metrics.py'), os.path.join(APP_DIR, 'slow_queries.py')}
+# Transaction control (BEGIN, SAVEPOINT, ...) is never recorded, nor are the log's own queries.
+RECORDED_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+_capturing = ContextVar('eka_slow_query_capturing', default=False)
+_explained = {}     # SQL -> time.monotonic() of its last EXPLAIN in this process
+_explained_lock = threading.Lock()
+
+
+def enabled():
+    return settings.SLOW_QUERY_MS > 0
+
+
+def capture(execute, sql, params, many, context):
+    """Connection execute wrapper: records queries slower than SLOW_QUERY_MS."""
+    if many or _capturing.get() or not enabled():
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    result = execute(sql, params, many, context)
+    duration_ms = (perf_counter() - started) * 1000
+    if duration_ms >= settings.SLOW_QUERY_MS and _recorded(sql):
+        token = _capturing.set(True)
+        try:
+            _record(context, sql, params, duration_ms)
+        except Exception:
+            # Never fail the request because instrumentation did.
+            logger.exception('Recording a slow query failed')
+        finally:
+            _capturing.reset(token)
+    return result
+
+
+def _record(context, sql, params, duration_ms):
+    from .models import SlowQuery
+
+    connection = context['connection']
+    statement = connection.ops.last_executed_query(context['cursor'], sql, params)
+    plan = _explain(connection, sql, params) if _should_explain(sql) else ''
+    entry = SlowQuery(duration_ms=round(duration_ms, 3), database=connection.alias, view=_view()[:200],
+                      location=_location()[:300], sql=statement, plan=plan)
+
+    def save():
+        token = _capturing.set(True)
+        try:
+            entry.save()
+            SlowQuery.objects.filter(id__lte=entry.id - settings.SLOW_QUERY_LOG_SIZE).delete()
+        finally:
+            _capturing.reset(token)
+
+    # Runs right away outside a transaction; a rolled back request keeps no entry.
+    transaction.on_commit(save)
+
+
+def _recorded(sql):
+    return sql.lstrip()[:6].upper().startswith(RECORDED_STATEMENTS) and 'users_slowquery' not in sql
+
+
+def _should_explain(sql):
+    if not sql.lstrip()[:6].upper().startswith(('SELECT', 'WITH')):
+        return False
+    now = time.monotonic()
+    with _explained_lock:
+        last = _explained.get(sql)
+        if last is not None and now - last < settings.SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+            return False
+        if len(_explained) >= 1000:
+            _explained.clear()
+        _explained[sql] = now
+    return True
+
+
+def _explain(connection, sql, params):
+    options = {'analyze': True, 'buffers': True} if connection.vendor == 'postgresql' else {}
+    prefix = connection.ops.explain_query_prefix(**options)
+    try:
+        # Inside a transaction, a savepoint keeps a failed EXPLAIN from breaking it.
+        with transaction.atomic(using=connection.alias) if connection.in_atomic_block else nullcontext():
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f'EXPLAIN failed: {exc}'
+
+
+def _view():
+    request = metrics.current_request()
+    if request is None:
+        return ''
+    match = request.resolver_match
+    view_class = getattr(match.func, 'view_class', None) if match else None
+    name = view_class.__name__ if view_class else (match.view_name if match else 'unmatched')
+    return f'{name} {request.method} {request.get_full_path()}'
+
+
+def _location():
+    for frame, lineno in traceback.walk_stack(None):
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(APP_DIR) and filename not in WRAPPER_FILES:
+            return f'{os.path.relpath(filename, os.path.dirname(APP_DIR.rstrip(os.sep)))}:{lineno} in {frame.f_code.co_name}'
+    return ''
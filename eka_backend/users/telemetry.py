@@ -0,0 +1,235 @@
+"""
+Bulk telemetry ingestion.
+
+Batches posted by vehicles or gateways are validated as a whole (one lookup
+per batch for vehicle/registration resolution, no per-row serializers) and
+written with multi-row INSERTs inside a single transaction.
+"""
+import math
+from datetime import datetime
+from numbers import Real
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import rollups
+from .cache import FILTERS, VEHICLE_SELECTION, bump_version, chart_namespace, invalidate, trail_namespace
+from .chart_codec import CHART_FIELDS
+from .models import (TrailAvailability, TrailDataPoint, TrailVehicle, Vehicle,
+                     VehicleChartData, VehicleRegistration)
+
+# Stop collecting errors after this many so a bad batch can't produce a huge response.
+MAX_REPORTED_ERRORS = 50
+
+
+class _Errors:
+    def __init__(self, section):
+        self.section = section
+        self.items = {}
+
+    def add(self, index, message):
+        if len(self.items) < MAX_REPORTED_ERRORS:
+            self.items.setdefault(index, []).append(message)
+
+    def raise_if_any(self):
+        if self.items:
+            raise ValidationError({self.section: self.items})
+
+
+def _parse_date(value, cache):
+    """Parses 'YYYY-MM-DD', memoised per batch since most rows share a day."""
+    if value not in cache:
+        try:
+            cache[value] = datetime.strptime(value, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            cache[value] = None
+    return cache[value]
+
+
+def _check_batch(rows, section):
+    if not isinstance(rows, list):
+        raise ValidationError({section: 'Expected a list of objects.'})
+    if len(rows) > settings.TELEMETRY_INGEST_MAX_BATCH:
+        raise ValidationError({section: f'At most {settings.TELEMETRY_INGEST_MAX_BATCH} rows per request.'})
+
+
+def _coordinate(value, bound):
+    # bool is a Real subclass but never a coordinate; NaN and infinities are not positions.
+    return (isinstance(value, Real) and not isinstance(value, bool)
+            and math.isfinite(value) and -bound <= value <= bound)
+
+
+def _valid_chart(chart):
+    if chart == {}:
+        return True
+    if not isinstance(chart, dict):
+        return False
+    labels, series = chart.get('labels'), chart.get('series')
+    if not isinstance(labels, list) or not isinstance(series, list):
+        return False
+    return all(
+        isinstance(s, dict) and isinstance(s.get('data'), list) and len(s['data']) == len(labels)
+        for s in series
+    )
+
+
+def build_trail_points(rows):
+    """Validates raw trail rows and returns unsaved TrailDataPoint instances."""
+    _check_batch(rows, 'trail_points')
+    errors = _Errors('trail_points')
+    registration_nos = {row.get('registration_no') for row in rows if isinstance(row, dict)}
+    vehicle_ids = dict(
+        TrailVehicle.objects.filter(registration_no__in=registration_nos).values_list('registration_no', 'id')
+    )
+    dates = {}
+    points = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.add(index, 'Expected an object.')
+            continue
+        vehicle_id = vehicle_ids.get(row.get('registration_no'))
+        if vehicle_id is None:
+            errors.add(index, f"Unknown registration_no {row.get('registration_no')!r}.")
+        day = _parse_date(row.get('date'), dates)
+        if day is None:
+            errors.add(index, 'date must be in YYYY-MM-DD format.')
+        coordinates = row.get('coordinates')
+        if not (isinstance(coordinates, dict)
+                and _coordinate(coordinates.get('lat'), 90) and _coordinate(coordinates.get('lng'), 180)):
+            errors.add(index, 'coordinates must be an object with numeric lat (-90..90) and lng (-180..180).')
+        metrics = row.get('metrics', {})
+        if not isinstance(metrics, dict):
+            errors.add(index, 'metrics must be an object.')
+        ecu_data = row.get('ecu_data', {})
+        if not isinstance(ecu_data, (dict, list)):
+            errors.add(index, 'ecu_data must be an object or a list.')
+        if index not in errors.items:
+            points.append(TrailDataPoint(
+                vehicle_id=vehicle_id, date=day, metrics=metrics,
+                ecu_data=ecu_data, coordinates=coordinates,
+            ))
+    errors.raise_if_any()
+    return points
+
+
+def build_chart_data(rows):
+    """Validates raw chart rows and returns unsaved VehicleChartData instances."""
+    _check_batch(rows, 'chart_data')
+    errors = _Errors('chart_data')
+    registration_numbers = {row.get('registration_number') for row in rows if isinstance(row, dict)}
+    registration_ids = dict(
+        VehicleRegistration.objects.filter(registration_number__in=registration_numbers)
+        .values_list('registration_number', 'id')
+    )
+    dates = {}
+    seen = set()
+    charts = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.add(index, 'Expected an object.')
+            continue
+        registration_id = registration_ids.get(row.get('registration_number'))
+        if registration_id is None:
+            errors.add(index, f"Unknown registration_number {row.get('registration_number')!r}.")
+        day = _parse_date(row.get('date'), dates)
+        if day is None:
+            errors.add(index, 'date must be in YYYY-MM-DD format.')
+        elif (registration_id, day) in seen:
+            errors.add(index, 'Duplicate registration_number and date in batch.')
+        seen.add((registration_id, day))
+        for field in CHART_FIELDS:
+            if not _valid_chart(row.get(field, {})):
+                errors.add(index, f'{field} must be an object with labels and equally long series data.')
+        if index not in errors.items:
+            chart = VehicleChartData(registration_id=registration_id, date=day)
+            chart.set_charts({field: row.get(field, {}) for field in CHART_FIELDS})
+            charts.append(chart)
+    errors.raise_if_any()
+    return charts
+
+
+VEHICLE_STATE_FIELDS = {'speed': int, 'soc': int, 'range': int, 'temp': int, 'address': str}
+
+
+def _vehicle_id(row):
+    # `true` would otherwise pass as vehicle 1.
+    vehicle_id = row.get('id') if isinstance(row, dict) else None
+    return vehicle_id if isinstance(vehicle_id, int) and not isinstance(vehicle_id, bool) else None
+
+
+def build_vehicle_states(rows):
+    """Validates partial Vehicle state rows ({id, speed, soc, ...}) and returns the updated instances."""
+    _check_batch(rows, 'vehicle_states')
+    errors = _Errors('vehicle_states')
+    vehicles = Vehicle.objects.in_bulk({_vehicle_id(row) for row in rows} - {None})
+    updated = {}
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors.add(index, 'Expected an object.')
+            continue
+        vehicle = vehicles.get(_vehicle_id(row))
+        if vehicle is None:
+            errors.add(index, f"Unknown vehicle id {row.get('id')!r}.")
+            continue
+        for field, kind in VEHICLE_STATE_FIELDS.items():
+            if field not in row:
+                continue
+            # bool is an int subclass but never a valid reading.
+            if not isinstance(row[field], kind) or isinstance(row[field], bool):
+                errors.add(index, f'{field} must be {"an integer" if kind is int else "a string"}.')
+            else:
+                setattr(vehicle, field, row[field])
+        updated[vehicle.id] = vehicle
+    errors.raise_if_any()
+    return list(updated.values())
+
+
+def _invalidate_trails(points):
+    for vehicle_id, day in {(p.vehicle_id, p.date) for p in points}:
+        bump_version(trail_namespace(vehicle_id, day))
+
+
+def _invalidate_charts(charts):
+    for chart in charts:
+        bump_version(chart_namespace(chart.registration_id, chart.date))
+
+
+def ingest(payload):
+    """
+    Validates and stores a telemetry batch. Nothing is written unless every
+    row in every section is valid. Chart rows replace any existing charts for
+    the same registration and day; vehicle state rows update only the fields
+    they carry.
+    """
+    if not isinstance(payload, dict):
+        raise ValidationError('Expected an object with trail_points, chart_data and/or vehicle_states.')
+    points = build_trail_points(payload.get('trail_points', []))
+    charts = build_chart_data(payload.get('chart_data', []))
+    vehicles = build_vehicle_states(payload.get('vehicle_states', []))
+    batch_size = settings.TELEMETRY_INGEST_INSERT_BATCH
+    with transaction.atomic():
+        if points:
+            # The rollup job folds new points in later; it only needs to see this transaction.
+            rollups.claim_transaction_id()
+        TrailDataPoint.objects.bulk_create(points, batch_size=batch_size)
+        if TrailAvailability.record(points):
+            transaction.on_commit(lambda: invalidate(FILTERS))
+        transaction.on_commit(lambda: _invalidate_trails(points))
+        VehicleChartData.objects.bulk_create(
+            charts, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['registration', 'date'], update_fields=[*CHART_FIELDS, 'packed_charts'],
+        )
+        transaction.on_commit(lambda: _invalidate_charts(charts))
+        if charts:
+            # A chart row is its own calendar entry in the Vehicle Analysis filters.
+            transaction.on_commit(lambda: invalidate(FILTERS))
+        if vehicles:
+            # bulk_update() skips auto_now and the model signals.
+            now = timezone.now()
+            for vehicle in vehicles:
+                vehicle.updated_at = now
+            Vehicle.objects.bulk_update(vehicles, ['updated_at', *VEHICLE_STATE_FIELDS], batch_size=batch_size)
+            transaction.on_commit(lambda: invalidate(VEHICLE_SELECTION))
+    return {'trail_points': len(points), 'chart_data': len(charts), 'vehicle_states': len(vehicles)}
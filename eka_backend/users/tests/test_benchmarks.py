@@ -0,0 +1,285 @@
+"""
+Endpoint benchmarks: query-count and latency budgets.
+
+setUpTestData seeds a fleet at realistic volume (the *_COUNT / *_DAYS
+constants below, deterministic), then every endpoint in BENCHMARKS is
+requested with the response caches cleared, as the first request after a
+write would be. A test fails when an endpoint issues more queries than its
+budget or its response does not have the expected content.
+
+Query budgets are tight on purpose: they do not depend on the data volume,
+so an N+1 shows up as a count that jumps by the number of rows. They are
+the gate. Latency budgets (median over LATENCY_RUNS) depend on the machine,
+so they are only enforced when BENCHMARK_LATENCY_FACTOR is set, scaled by
+it (1 on a quiet reference machine, more on a loaded runner):
+
+    python manage.py test users
+    BENCHMARK_LATENCY_FACTOR=1 python manage.py test users.tests.test_benchmarks
+
+AsyncEndpointBenchmarkTests holds the async views (users.async_views, served
+under ASGI) to the same budgets through the ASGI test client.
+"""
+import importlib
+import os
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+from statistics import median
+from time import perf_counter
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from .. import async_views, rollups, urls
+from ..authentication import UserRefreshToken
+from ..models import (FleetVehicle, Report, ReportFacet, TrailAvailability, TrailDataPoint, TrailVehicle,
+                     User, Vehicle, VehicleChartData, VehicleRegistration, VehicleSummary, VehicleType)
+
+FLEET_TYPES = ('Eka 7', 'Eka 9', 'Eka 12', 'Eka 2.0')
+VEHICLE_COUNT = 50          # per fleet type
+REGISTRATION_COUNT = 25     # per fleet type
+CHART_DAYS = 14
+TRAIL_VEHICLE_COUNT = 20
+TRAIL_DAYS = 7
+TRAIL_POINTS_PER_DAY = 200
+REPORT_COUNT = 20000
+REPORT_TYPES = ('Performance', 'Health', 'Charging', 'Fault')
+
+LATENCY_RUNS = 3
+# Unset: latency is measured but not asserted.
+LATENCY_FACTOR = float(os.environ['BENCHMARK_LATENCY_FACTOR']) if os.environ.get('BENCHMARK_LATENCY_FACTOR') else None
+
+def _keys(*keys):
+    def check(test, response):
+        test.assertEqual(list(response.json()), list(keys))
+    return check
+
+
+def _page(size, *keys):
+    def check(test, response):
+        data = response.json()
+        test.assertEqual(list(data), list(keys))
+        test.assertEqual(len(data['results']), size)
+    return check
+
+
+def _filtered_reports(test, response):
+    data = response.json()
+    test.assertTrue(data['results'])
+    test.assertTrue(all(row['report_type'] == 'Health' for row in data['results']))
+
+
+def _charts(max_points):
+    def check(test, response):
+        charts = response.json()['charts']
+        test.assertTrue(charts)
+        for chart in charts.values():
+            test.assertLessEqual(len(chart['labels']), max_points)
+            for series in chart['series']:
+                test.assertEqual(len(series['data']), len(chart['labels']))
+    return check
+
+
+def _trail(max_points):
+    def check(test, response):
+        path = response.json()['trail_path']
+        test.assertTrue(2 <= len(path) <= max_points)
+    return check
+
+
+def _filters(test, response):
+    test.assertTrue(response.json()['filters'])
+
+
+def _csv(test, response):
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    test.assertEqual(lines[0].split(',')[:2], ['id', 'name'])
+    test.assertEqual(len(lines) - 1, Report.objects.filter(report_type='Fault').count())
+
+
+# (name, path, max queries, latency budget in ms, content check). The
+# {placeholders} are filled in from the seeded data (EndpointBenchmarkTests.params).
+BENCHMARKS = [
+    ('dashboard-stats', '/api/dashboard-stats/', 2, 100, _keys('fleet_stats', 'performance_stats')),
+    ('vehicle-selection', '/api/vehicle-selection/', 2, 100, _keys('fleet_name', 'summary_data', 'vehicles')),
+    ('vehicle-selection by fleet type', '/api/vehicle-selection/?fleet_type={fleet_type}', 2, 100,
+     _keys('fleet_name', 'summary_data', 'vehicles')),
+    ('vehicle-summary-stats', '/api/vehicle-summary-stats/', 2, 100, _keys('units', 'fleet', 'by_type')),
+    ('vehicle-analysis filters', '/api/vehicle-analysis/?fetch_filters', 1, 150, _filters),
+    ('vehicle-analysis charts', '/api/vehicle-analysis/?registration_id={reg_id}&date={chart_date}', 1, 100, _charts(96)),
+    ('vehicle-analysis downsampled', '/api/vehicle-analysis/?registration_id={reg_id}&date={chart_date}&max_points=50',
+     1, 100, _charts(50)),
+    ('trails filters', '/api/trails/?fetch_filters', 1, 100, _filters),
+    ('trails', '/api/trails/?vehicle_id={trail_id}&date={trail_date}', 2, 150, _trail(TRAIL_POINTS_PER_DAY)),
+    ('trails simplified', '/api/trails/?vehicle_id={trail_id}&date={trail_date}&zoom=12', 2, 150,
+     _trail(TRAIL_POINTS_PER_DAY - 1)),
+    ('reports', '/api/reports/', 2, 200, _page(10, 'count', 'next', 'previous', 'results')),
+    ('reports deep page', '/api/reports/?page=150', 2, 250, _page(10, 'count', 'next', 'previous', 'results')),
+    ('reports cursor', '/api/reports/?pagination=cursor', 1, 150, _page(10, 'next', 'previous', 'results')),
+    ('reports filtered', '/api/reports/?report_type=Health&start_date={report_start}&end_date={report_end}', 2, 500,
+     _filtered_reports),
+    ('reports fetch_filters', '/api/reports/?fetch_filters', 4, 100,
+     _keys('reportTypes', 'vehicleTypes', 'registrations', 'dates')),
+    ('reports csv export', '/api/reports/?export=csv&report_type=Fault', 1, 1500, _csv),
+]
+
+
+def _chart(rng, series_ranges):
+    labels = [f'{h:02d}:{m:02d}' for h in range(24) for m in (0, 15, 30, 45)]
+    return {'labels': labels, 'series': [
+        {'name': name, 'data': [round(rng.uniform(low, high), 2) for _ in labels]}
+        for name, low, high in series_ranges
+    ]}
+
+
+def seed_fleet():
+    rng = random.Random(2024)
+    today = date.today()
+    FleetVehicle.objects.bulk_create([
+        FleetVehicle(title=name.upper(), total_count=VEHICLE_COUNT, active_count=rng.randint(0, VEHICLE_COUNT), order=i)
+        for i, name in enumerate(FLEET_TYPES)
+    ])
+    for fleet_type in FLEET_TYPES:
+        summary = VehicleSummary.objects.create(fleet_type=fleet_type, total_distance=Decimal('1280'))
+        Vehicle.objects.bulk_create([
+            Vehicle(summary=summary, name=f'{fleet_type} #{i}', rating='4.5', speed=rng.randint(0, 60),
+                    soc=rng.randint(10, 100), range=rng.randint(20, 150), temp=rng.randint(20, 40), address='Pune')
+            for i in range(VEHICLE_COUNT)
+        ])
+        vehicle_type = VehicleType.objects.create(name=fleet_type)
+        VehicleRegistration.objects.bulk_create([
+            VehicleRegistration(vehicle_type=vehicle_type, registration_number=f'{fleet_type} REG {i:03d}')
+            for i in range(REGISTRATION_COUNT)
+        ])
+    registrations = list(VehicleRegistration.objects.all())
+    charts = []
+    for registration in registrations:
+        for offset in range(CHART_DAYS):
+            chart = VehicleChartData(registration=registration, date=today - timedelta(days=offset))
+            chart.set_charts({
+                'battery_data': _chart(rng, [('Voltage', 20, 28)]),
+                'temperature_data': _chart(rng, [('Min Temp', 20, 32), ('Max Temp', 22, 36)]),
+                'voltage_data': _chart(rng, [('A Pack', 680, 705), ('B Pack', 685, 710)]),
+                'current_data': _chart(rng, [('Current', 670, 695), ('Peak', 690, 700)]),
+            })
+            charts.append(chart)
+    VehicleChartData.objects.bulk_create(charts, batch_size=500)
+
+    trail_vehicles = TrailVehicle.objects.bulk_create([
+        TrailVehicle(vehicle_type=FLEET_TYPES[i % len(FLEET_TYPES)].upper(), registration_no=f'MH 12 TR {i:04d}', fleet='PMPML')
+        for i in range(TRAIL_VEHICLE_COUNT)
+    ])
+    points = []
+    for vehicle in TrailVehicle.objects.filter(pk__in=[v.pk for v in trail_vehicles]):
+        for offset in range(TRAIL_DAYS):
+            lat, lng = 18.5 + rng.random() / 10, 73.8 + rng.random() / 10
+            for _ in range(TRAIL_POINTS_PER_DAY):
+                lat, lng = lat + rng.uniform(-0.0005, 0.001), lng + rng.uniform(-0.0005, 0.001)
+                points.append(TrailDataPoint(
+                    vehicle=vehicle, date=today - timedelta(days=offset), coordinates={'lat': lat, 'lng': lng},
+                    metrics={'speed': {'value': rng.randint(0, 60), 'unit': 'kmph'},
+                             'soc': {'value': rng.randint(10, 100), 'unit': '%'}},
+                    ecu_data=[{'name': 'BMS', 'controls': [{'name': 'Enable', 'value': '1'}]}],
+                ))
+    TrailDataPoint.objects.bulk_create(points, batch_size=2000)
+    TrailAvailability.record(points)
+    rollups.rebuild()
+
+    now = timezone.now()
+    reports = [
+        Report(registration=rng.choice(registrations), report_type=rng.choice(REPORT_TYPES),
+               name=now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)), col2=f'Val-{rng.randint(10, 99)}',
+               signal=f'Sig-{rng.randint(100, 999)}', signal0='S0-0', signal1='S1-1', signal2='S2-0')
+        for _ in range(REPORT_COUNT)
+    ]
+    Report.objects.bulk_create(reports, batch_size=2000)
+    ReportFacet.record(reports)
+
+
+class EndpointBenchmarkTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        seed_fleet()
+        user = User.objects.create_user(username='bench', email='bench@example.com', password='bench-pass-123')
+        cls.access = str(UserRefreshToken.for_user(user).access_token)
+        chart = VehicleChartData.objects.order_by('id').first()
+        trail = TrailDataPoint.objects.order_by('id').first()
+        today = date.today()
+        cls.params = {
+            'fleet_type': FLEET_TYPES[1], 'reg_id': chart.registration_id, 'chart_date': chart.date,
+            'trail_id': trail.vehicle_id, 'trail_date': trail.date,
+            'report_start': today - timedelta(days=30), 'report_end': today,
+        }
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+    def _measure(self, path):
+        """(response, queries of a cold request, median cold latency in ms)."""
+        timings = []
+        for run in range(LATENCY_RUNS if LATENCY_FACTOR else 1):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                started = perf_counter()
+                response = self._get(path)
+                timings.append((perf_counter() - started) * 1000)
+            if run == 0:
+                first_response, query_count = response, len(queries)
+        return first_response, query_count, median(timings)
+
+    def _get(self, path):
+        response = self.client.get(path)
+        if response.streaming:
+            response.streaming_content = [b''.join(response.streaming_content)]
+        return response
+
+    def test_endpoint_budgets(self):
+        for name, path, max_queries, budget_ms, check in BENCHMARKS:
+            with self.subTest(endpoint=name):
+                response, query_count, latency_ms = self._measure(path.format(**self.params))
+                self.assertEqual(response.status_code, 200, response.content[:200] if not response.streaming else '')
+                self.assertLessEqual(query_count, max_queries, f'{name}: {query_count} queries, budget {max_queries}')
+                check(self, response)
+                if LATENCY_FACTOR:
+                    self.assertLessEqual(latency_ms, budget_ms * LATENCY_FACTOR,
+                                         f'{name}: {latency_ms:.0f} ms, budget {budget_ms * LATENCY_FACTOR:.0f} ms')
+
+
+def _reload_urls():
+    # users.urls picks the sync or async views when it is imported; the root
+    # URLconf holds a resolver that has already read its patterns.
+    importlib.reload(urls)
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+class AsyncEndpointBenchmarkTests(EndpointBenchmarkTests):
+    @classmethod
+    def setUpClass(cls):
+        # Cleanups run last-in first-out: the URLs are reloaded once the override is gone.
+        cls.addClassCleanup(_reload_urls)
+        cls.enterClassContext(override_settings(ASYNC_VIEWS=True))
+        _reload_urls()
+        super().setUpClass()
+
+    def _get(self, path):
+        return async_to_sync(self._aget)(path)
+
+    async def _aget(self, path):
+        response = await self.async_client.get(path, headers={'Authorization': f'Bearer {self.access}'})
+        if response.streaming and response.is_async:
+            response.streaming_content = [b''.join([chunk async for chunk in response.streaming_content])]
+        elif response.streaming:
+            response.streaming_content = [b''.join(response.streaming_content)]
+        return response
+
+    def test_async_views_are_served(self):
+        self.assertIs(urls.TrailsAPI, async_views.AsyncTrailsAPI)
+        self.assertIs(urls.ReportsAPI, async_views.AsyncReportsAPI)
@@ -0,0 +1,90 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from ..authentication import UserRefreshToken
+from .. import blacklist
+from ..blacklist import BloomFilter, announce_revocation, blacklist_filter
+from ..models import User
+
+
+class BloomFilterTests(APITestCase):
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        bloom = BloomFilter(5000)
+        members = [f'jti-{i}' for i in range(5000)]
+        for member in members:
+            bloom.add(member)
+        self.assertTrue(all(member in bloom for member in members))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 10000 * 0.03)
+
+
+class RefreshBlacklistTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='u', email='u@example.com', password='pw-12345-x')
+
+    def setUp(self):
+        blacklist_filter.bloom = None
+
+    def _refresh(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': str(token)}, format='json')
+
+    def test_logout_revokes_refresh_token(self):
+        refresh = UserRefreshToken.for_user(self.user)
+        self.assertEqual(self._refresh(refresh).status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+        response = self.client.post('/api/auth/logout/', {'refresh': str(refresh)}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self._refresh(refresh).status_code, 401)
+
+    def _shared_cache(self):
+        shared = mock.patch.object(blacklist.cache, 'is_shared', return_value=True)
+        shared.start()
+        self.addCleanup(shared.stop)
+
+    def test_without_a_shared_cache_every_refresh_checks_the_database(self):
+        refresh = UserRefreshToken.for_user(self.user)
+        self.assertEqual(self._refresh(refresh).status_code, 200)
+        # Revoked by another process, which has no way to tell this one.
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=refresh['jti']))
+        self.assertEqual(self._refresh(refresh).status_code, 401)
+
+    @override_settings(BLACKLIST_FILTER_VERSION_CHECK_SECONDS=0)
+    def test_revocation_elsewhere_is_seen_after_the_filter_was_built(self):
+        self._shared_cache()
+        refresh = UserRefreshToken.for_user(self.user)
+        self.assertEqual(self._refresh(refresh).status_code, 200)
+        # Blacklisted by another process: only the announcement reaches this one.
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=refresh['jti']))
+        announce_revocation()
+        self.assertEqual(self._refresh(refresh).status_code, 401)
+
+    @override_settings(BLACKLIST_FILTER_VERSION_CHECK_SECONDS=60, BLACKLIST_FILTER_REFRESH_SECONDS=60)
+    def test_announcements_are_checked_at_most_once_per_interval(self):
+        self._shared_cache()
+        blacklist_filter.might_contain('warm')
+        with mock.patch.object(blacklist, 'get_version', wraps=blacklist.get_version) as get_version:
+            for i in range(50):
+                self.assertFalse(blacklist_filter.might_contain(f'jti-{i}'))
+        self.assertEqual(get_version.call_count, 0)
+        blacklist_filter.version_checked_at -= 61
+        with mock.patch.object(blacklist, 'get_version', wraps=blacklist.get_version) as get_version:
+            blacklist_filter.might_contain('jti-0')
+            blacklist_filter.might_contain('jti-1')
+        self.assertEqual(get_version.call_count, 1)
+
+    def test_prune_deletes_only_expired_tokens(self):
+        live = UserRefreshToken.for_user(self.user)
+        expired = UserRefreshToken.for_user(self.user)
+        OutstandingToken.objects.filter(jti=expired['jti']).update(expires_at=timezone.now() - timedelta(days=1))
+        BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=expired['jti']))
+        call_command('prune_token_blacklist', stdout=StringIO())
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), [live['jti']])
+        self.assertFalse(BlacklistedToken.objects.exists())
@@ -0,0 +1,62 @@
+import json
+import struct
+
+from django.test import SimpleTestCase
+
+from .. import chart_codec
+
+LABELS = ['00:00', '00:15', '00:30']
+
+
+def _charts(*series):
+    return {
+        'battery_data': {'labels': LABELS, 'series': [{'name': f's{i}', 'data': data} for i, data in enumerate(series)]},
+        'temperature_data': {},
+        'voltage_data': {'labels': LABELS, 'series': []},
+        'current_data': {},
+    }
+
+
+class ChartCodecTests(SimpleTestCase):
+    def assertRoundTrips(self, charts):
+        blob = chart_codec.encode(charts)
+        self.assertIsNotNone(blob)
+        decoded = chart_codec.decode(blob)
+        # Compare the JSON text so 25 vs 25.0 counts as a difference.
+        self.assertEqual(json.dumps(decoded, sort_keys=True), json.dumps(charts, sort_keys=True))
+
+    def test_round_trips_exactly(self):
+        cases = {
+            'integers': [25, 26, -3],
+            'two decimals': [24.51, 25.0, 698.37],
+            'needs float64': [0.1 + 0.2, 1e-300, 123456.789012345],
+            'missing values': [None, 25, None],
+            'large integers': [2 ** 40, -(2 ** 52), 7],
+            'all missing': [None, None, None],
+        }
+        for name, data in cases.items():
+            with self.subTest(name):
+                self.assertRoundTrips(_charts(data))
+        self.assertRoundTrips(_charts(*cases.values()))
+
+    def test_keeps_json_for_what_it_cannot_reproduce(self):
+        cases = {
+            'mixed int and float': _charts([25, 25.5, 26]),
+            'integers beyond float64': _charts([2 ** 60 + 1, 0, 0]),
+            'bool values': _charts([True, False, True]),
+            'ragged series': _charts([1, 2]),
+            'different label axes': {**_charts([1, 2, 3]), 'current_data': {'labels': ['x'], 'series': []}},
+        }
+        for name, charts in cases.items():
+            with self.subTest(name):
+                self.assertIsNone(chart_codec.encode(charts))
+
+    def test_decodes_legacy_blobs(self):
+        labels = chart_codec.LABEL_SEPARATOR.join(LABELS).encode()
+        blob = b''.join([
+            struct.pack('<4sII', b'EKC1', len(LABELS), len(labels)), labels,
+            struct.pack('<H', 1), struct.pack('<HBB', 1, 1, 4), b'v', struct.pack('<3f', 24.5, 25.0, 25.5),
+            *[struct.pack('<H', chart_codec.EMPTY_CHART)] * 3,
+        ])
+        self.assertEqual(chart_codec.decode(blob)['battery_data'],
+                         {'labels': LABELS, 'series': [{'name': 'v', 'data': [24.5, 25.0, 25.5]}]})
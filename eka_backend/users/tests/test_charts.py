@@ -0,0 +1,97 @@
+from datetime import date
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from .. import downsampling
+from ..authentication import UserRefreshToken
+from ..cache import chart_namespace, get_version, versioned_key
+from ..models import User, VehicleChartData, VehicleRegistration, VehicleType
+
+DAY = date(2024, 1, 5)
+
+
+def _chart(*series, count=200):
+    return {'labels': [f'{i // 60:02d}:{i % 60:02d}' for i in range(count)],
+            'series': [{'name': f's{n}', 'data': data} for n, data in enumerate(series)]}
+
+
+class LttbTests(SimpleTestCase):
+    def test_keeps_the_ends_and_the_peaks_with_labels_aligned(self):
+        voltage = [24.0] * 200
+        voltage[77] = 30.0
+        current = [float(i % 7) for i in range(200)]
+        chart = _chart(voltage, current)
+        reduced = downsampling.downsample_chart(chart, 20)
+        self.assertEqual(len(reduced['labels']), 20)
+        self.assertEqual((reduced['labels'][0], reduced['labels'][-1]), (chart['labels'][0], chart['labels'][-1]))
+        self.assertIn(chart['labels'][77], reduced['labels'])
+        for label, v, c in zip(reduced['labels'], *(series['data'] for series in reduced['series'])):
+            i = chart['labels'].index(label)
+            self.assertEqual((v, c), (voltage[i], current[i]))
+
+    def test_gaps_stay_none(self):
+        data = [None if i % 10 == 0 else float(i) for i in range(200)]
+        reduced = downsampling.downsample_chart(_chart(data), 50)
+        self.assertEqual(len(reduced['labels']), 50)
+        self.assertIsNone(reduced['series'][0]['data'][0])
+
+    def test_small_charts_are_returned_as_is(self):
+        chart = _chart(list(range(10)), count=10)
+        self.assertIs(downsampling.downsample_chart(chart, 50), chart)
+        self.assertEqual(downsampling.downsample_chart({}, 50), {})
+
+    def test_malformed_charts_are_returned_as_stored(self):
+        for chart in (
+            _chart(list(range(200)), list(range(150))),     # ragged
+            _chart(['high'] * 200),                         # non-numeric
+            _chart([[1, 2]] * 200),                         # nested
+            {'labels': list(range(200))},                   # no series
+        ):
+            self.assertIs(downsampling.downsample_chart(chart, 20), chart)
+
+
+class VehicleAnalysisParamsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='u', email='u@example.com', password='pw-12345-x')
+        cls.registration = VehicleRegistration.objects.create(
+            vehicle_type=VehicleType.objects.create(name='Eka 9'), registration_number='MH 12 AB 0001')
+        chart_data = VehicleChartData(registration=cls.registration, date=DAY)
+        chart_data.set_charts({
+            'battery_data': _chart([float(i) for i in range(200)]),
+            'voltage_data': _chart(list(range(200)), list(range(100))),
+        })
+        chart_data.save()
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {UserRefreshToken.for_user(self.user).access_token}')
+
+    def test_equivalent_parameters_share_one_cache_entry(self):
+        key = versioned_key(chart_namespace(self.registration.id, DAY), 20)
+        cache.delete(key)
+        response = self.client.get(f'/api/vehicle-analysis/?registration_id=0{self.registration.id}'
+                                   '&date=2024-01-05&max_points=20')
+        self.assertEqual(response.status_code, 200)
+        charts = response.json()['charts']
+        self.assertEqual(cache.get(key), charts)
+        self.assertEqual(len(charts['battery_data']['labels']), 20)
+        # The ragged chart comes back whole instead of failing the request.
+        self.assertEqual(len(charts['voltage_data']['labels']), 200)
+
+    def test_malformed_parameters_are_rejected(self):
+        for query in ('registration_id=x&date=2024-01-05', f'registration_id={self.registration.id}&date=2024-13-01',
+                      f'registration_id={self.registration.id}&date=2024-01-05&max_points=2'):
+            self.assertEqual(self.client.get(f'/api/vehicle-analysis/?{query}').status_code, 400, query)
+
+    def test_writes_bump_the_chart_version_only_on_commit(self):
+        namespace = chart_namespace(self.registration.id, DAY)
+        before = get_version(namespace)
+        chart_data = VehicleChartData.objects.get()
+        with self.captureOnCommitCallbacks() as callbacks:
+            chart_data.save()
+            self.assertEqual(get_version(namespace), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_version(namespace), before)
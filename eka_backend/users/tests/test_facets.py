@@ -0,0 +1,114 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from ..authentication import UserRefreshToken
+from ..models import (Report, ReportFacet, TrailAvailability, TrailDataPoint, TrailVehicle, User, VehicleRegistration,
+                      VehicleType)
+
+MORNING = datetime(2024, 1, 5, 8, tzinfo=dt_timezone.utc)
+EVENING = datetime(2024, 1, 5, 18, tzinfo=dt_timezone.utc)
+
+
+class ReportFacetTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.registration = VehicleRegistration.objects.create(
+            vehicle_type=VehicleType.objects.create(name='Eka 9'), registration_number='MH 12 AB 0001')
+
+    def _report(self, name, report_type='Fault'):
+        return Report.objects.create(registration=self.registration, report_type=report_type, name=name,
+                                     col2='c', signal='s', signal0='0', signal1='1', signal2='2')
+
+    def _facets(self):
+        return set(ReportFacet.objects.values_list('report_type', 'date'))
+
+    def test_saving_reports_records_their_facets(self):
+        self._report(MORNING)
+        self._report(EVENING)
+        self._report(MORNING, report_type='Alert')
+        self.assertEqual(self._facets(), {('Fault', MORNING.date()), ('Alert', MORNING.date())})
+
+    def test_naive_and_string_names_are_recorded(self):
+        with self.assertWarns(RuntimeWarning):
+            self._report(datetime(2024, 1, 6, 9))
+        self._report('2024-01-07T10:00:00Z')
+        self.assertEqual(self._facets(), {('Fault', date(2024, 1, 6)), ('Fault', date(2024, 1, 7))})
+
+    def test_deleting_the_last_report_of_a_facet_drops_it(self):
+        morning, evening = self._report(MORNING), self._report(EVENING)
+        alert = self._report(MORNING, report_type='Alert')
+        with self.captureOnCommitCallbacks(execute=True):
+            morning.delete()
+        self.assertEqual(self._facets(), {('Fault', MORNING.date()), ('Alert', MORNING.date())})
+        with self.captureOnCommitCallbacks(execute=True):
+            evening.delete()
+        self.assertEqual(self._facets(), {('Alert', MORNING.date())})
+        with self.captureOnCommitCallbacks(execute=True):
+            Report.objects.filter(id=alert.id).delete()
+        self.assertEqual(self._facets(), set())
+
+    def test_filter_options_follow_deletes(self):
+        user = User.objects.create_user(username='u', email='u@example.com', password='pw-12345-x')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {UserRefreshToken.for_user(user).access_token}')
+        with self.captureOnCommitCallbacks(execute=True):
+            report = self._report(MORNING, report_type='Alert')
+            self._report(MORNING)
+        self.assertEqual(self._report_types(), ['Alert', 'Fault'])
+        with self.captureOnCommitCallbacks(execute=True):
+            report.delete()
+        self.assertEqual(self._report_types(), ['Fault'])
+
+    def test_deletes_stay_bulk(self):
+        Report.objects.bulk_create([Report(registration=self.registration, report_type='Fault', name=MORNING, col2='c',
+                                           signal='s', signal0='0', signal1='1', signal2='2') for _ in range(200)])
+        ReportFacet.record(Report.objects.all()[:1])
+        with CaptureQueriesContext(connection) as queries:
+            Report.objects.all().delete()
+        self.assertLess(len(queries), 10)
+        self.assertFalse(ReportFacet.objects.exists())
+        with CaptureQueriesContext(connection) as queries:
+            self.registration.delete()
+        self.assertLess(len(queries), 15)
+
+    def _report_types(self):
+        return self.client.get('/api/reports/?fetch_filters=1').json()['reportTypes']
+
+
+class TrailAvailabilityTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle = TrailVehicle.objects.create(vehicle_type='EKA 9', registration_no='MH 12 TR 0001', fleet='PMPML')
+        cls.user = User.objects.create_user(username='u', email='u@example.com', password='pw-12345-x')
+
+    def _point(self, day):
+        return TrailDataPoint.objects.create(vehicle=self.vehicle, date=day, coordinates={'lat': 18.52, 'lng': 73.85})
+
+    def _available_dates(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {UserRefreshToken.for_user(self.user).access_token}')
+        return self.client.get('/api/trails/?fetch_filters=1').json()['filters'][0]['available_dates']
+
+    def test_deleting_the_last_point_of_a_day_drops_the_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            first, second = self._point(date(2024, 1, 5)), self._point(date(2024, 1, 5))
+            other_day = self._point(date(2024, 1, 6))
+        self.assertEqual(self._available_dates(), ['2024-01-06', '2024-01-05'])
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(TrailAvailability.objects.count(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            TrailDataPoint.objects.filter(id__in=[second.id, other_day.id]).delete()
+        self.assertFalse(TrailAvailability.objects.exists())
+        self.assertEqual(self._available_dates(), [])
+
+    def test_deleting_a_vehicle_stays_bulk(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            TrailDataPoint.objects.bulk_create(
+                [TrailDataPoint(vehicle=self.vehicle, date=date(2024, 1, 5), coordinates={}) for _ in range(300)])
+            TrailAvailability.record(TrailDataPoint.objects.all()[:1])
+        with CaptureQueriesContext(connection) as queries:
+            self.vehicle.delete()
+        self.assertLess(len(queries), 15)
+        self.assertFalse(TrailAvailability.objects.exists())
@@ -0,0 +1,95 @@
+import threading
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory, APITestCase, APITransactionTestCase
+
+from ..async_views import AsyncLoginAPI
+from ..login_pool import LoginPool, login_pool
+from ..models import User
+from ..views import LoginAPI
+
+
+def _async_login(password='pw-12345-x'):
+    request = APIRequestFactory().post('/api/auth/login/', {'email': 'u@example.com', 'password': password},
+                                       format='json')
+    return async_to_sync(AsyncLoginAPI.as_view())(request)
+
+
+class LoginPoolTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='u', email='u@example.com', password='pw-12345-x')
+
+    def _fill_slots(self):
+        login_pool._ensure_started()
+        taken = 0
+        while login_pool._slots.acquire(blocking=False):
+            taken += 1
+        self.addCleanup(lambda: [login_pool._slots.release() for _ in range(taken)])
+
+    def _busy_workers(self):
+        login_pool._ensure_started()
+        release = threading.Event()
+        self.addCleanup(release.set)
+        for _ in range(login_pool._executor._max_workers):
+            login_pool._executor.submit(release.wait)
+
+    def test_logins_over_the_queue_bound_get_429(self):
+        self._fill_slots()
+        response = self.client.post('/api/auth/login/', {'email': 'u@example.com', 'password': 'pw-12345-x'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+
+    @override_settings(LOGIN_POOL_WORKERS=1, LOGIN_POOL_QUEUE=1)
+    def test_concurrent_logins_beyond_the_pool_and_queue_get_429(self):
+        # As on a threaded worker: five logins at once against one hash slot and one queue slot.
+        release = threading.Event()
+        self.addCleanup(release.set)
+        statuses = []
+
+        def slow_check(**credentials):
+            release.wait(5)
+            return None
+
+        def login():
+            request = APIRequestFactory().post('/api/auth/login/', {'email': 'u@example.com', 'password': 'x'},
+                                               format='json')
+            statuses.append(LoginAPI.as_view()(request).status_code)
+
+        with mock.patch('users.login_pool.authenticate', slow_check), \
+                mock.patch('users.views.login_pool', LoginPool()):
+            threads = [threading.Thread(target=login) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            deadline = time.monotonic() + 5
+            while len(statuses) < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(statuses, [429] * 3)
+            release.set()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(sorted(statuses), [401, 401, 429, 429, 429])
+
+    @override_settings(LOGIN_POOL_MAX_WAIT_SECONDS=0.05)
+    def test_async_login_gives_up_on_a_stalled_queue(self):
+        self._busy_workers()
+        queued = login_pool.stats()['queued']
+        response = _async_login()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '2')
+        self.assertEqual(login_pool.stats()['queued'], queued)
+
+
+class AsyncLoginTests(APITransactionTestCase):
+    # The password check runs on a pool thread, which only sees committed rows.
+    def setUp(self):
+        User.objects.create_user(username='u', email='u@example.com', password='pw-12345-x')
+
+    def test_async_login_issues_tokens(self):
+        response = _async_login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user']['email'], 'u@example.com')
+        self.assertEqual(_async_login(password='wrong').status_code, 401)
@@ -0,0 +1,18 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsAccessTests(APITestCase):
+    def test_scraper_with_the_token_gets_metrics(self):
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+    def test_other_callers_are_refused(self):
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}, {'HTTP_AUTHORIZATION': 'Basic scrape-secret'}):
+            self.assertEqual(self.client.get('/api/metrics/', **headers).status_code, 403, headers)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_refused_when_no_token_is_configured(self):
+        self.assertEqual(self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer ').status_code, 403)
@@ -0,0 +1,33 @@
+import datetime
+import uuid
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from .. import renderers
+from ..renderers import FastJSONRenderer
+
+
+@skipUnless(renderers.orjson, 'orjson is not installed')
+class FastJSONRendererTests(SimpleTestCase):
+    def test_same_bytes_as_drf(self):
+        data = {
+            'results': [{
+                'id': 7, 'name': 'Zoë – line\u2028break\u2029end "quoted" \\ / \t',
+                'active': True, 'archived': False, 'note': None, 'tags': ['a', 'ß', '日本'],
+                'created': datetime.datetime(2024, 1, 5, 9, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+                'naive': datetime.datetime(2024, 1, 5, 9, 30), 'day': datetime.date(2024, 1, 5),
+                'at': datetime.time(9, 30, 15), 'uuid': uuid.UUID(int=42), 'amount': Decimal('12.5'),
+                'ratio': 0.25, 'big': 2 ** 53, 'nested': {'empty': {}, 'list': []},
+            }],
+            'count': 1, 'next': None,
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indented_output_falls_back_to_drf(self):
+        data = {'a': [1, 2]}
+        context = {'indent': 4}
+        self.assertEqual(FastJSONRenderer().render(data, 'application/json', context),
+                         JSONRenderer().render(data, 'application/json', context))
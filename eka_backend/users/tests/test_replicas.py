@@ -0,0 +1,69 @@
+from datetime import date
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from rest_framework.test import APITestCase
+
+from .. import replicas
+from ..authentication import UserRefreshToken
+from ..cache import trail_namespace, versioned_key
+from ..models import TrailDataPoint, TrailVehicle, User
+from ..views import TrailsAPI
+
+DAY = date(2024, 1, 5)
+
+
+@override_settings(REPLICA_DATABASES=['replica-1'])
+class ReplicaStickinessTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='u', email='u@example.com', password='pw-12345-x')
+        cls.vehicle = TrailVehicle.objects.create(vehicle_type='EKA 9', registration_no='MH 12 TR 0001', fleet='PMPML')
+        TrailDataPoint.objects.bulk_create(
+            TrailDataPoint(vehicle=cls.vehicle, date=DAY, coordinates={'lat': 18.5 + i * 0.001, 'lng': 73.8})
+            for i in range(10)
+        )
+
+    def setUp(self):
+        cache.delete(replicas._pin_key(self.user.pk))
+        healthy = mock.patch.object(replicas, 'is_healthy', return_value=True)
+        healthy.start()
+        self.addCleanup(healthy.stop)
+
+    def _request(self, method='get'):
+        request = getattr(RequestFactory(), method)('/api/trails/')
+        request.user = self.user
+        return request
+
+    def test_writers_read_from_the_primary_until_the_pin_expires(self):
+        self.assertEqual(replicas.choose_replica(self._request()), 'replica-1')
+        middleware = replicas.ReplicaStickinessMiddleware(lambda request: HttpResponse(status=201))
+        middleware(self._request('post'))
+        self.assertIsNone(replicas.choose_replica(self._request()))
+        cache.delete(replicas._pin_key(self.user.pk))
+        self.assertEqual(replicas.choose_replica(self._request()), 'replica-1')
+
+    def test_cache_misses_are_built_from_the_primary(self):
+        # Stand in for the replica: record where the cached trail was read from.
+        aliases = []
+        build = TrailsAPI._trail
+
+        def trail(view, *args):
+            aliases.append(replicas._read_alias.get())
+            return build(view, *args)
+
+        cache.delete(versioned_key(trail_namespace(self.vehicle.id, DAY), 'zoom', 10))
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {UserRefreshToken.for_user(self.user).access_token}')
+        with mock.patch.object(TrailsAPI, '_trail', trail):
+            response = self.client.get(f'/api/trails/?vehicle_id={self.vehicle.id}&date=2024-01-05&zoom=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(aliases, [None])
+
+    def test_primary_reads_restores_the_request_replica(self):
+        token = replicas._read_alias.set('replica-1')
+        self.addCleanup(replicas._read_alias.reset, token)
+        with replicas.primary_reads():
+            self.assertIsNone(replicas._read_alias.get())
+        self.assertEqual(replicas._read_alias.get(), 'replica-1')
@@ -0,0 +1,100 @@
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from .. import datagen, rollups
+from ..authentication import UserRefreshToken
+from ..models import PerformanceStat, RollupState, TrailDataPoint, TrailVehicle, User
+
+DAY = date(2024, 1, 5)
+
+
+def _point(lat, soc, speed=30):
+    return {'registration_no': 'MH 12 TR 0001', 'date': DAY.isoformat(), 'coordinates': {'lat': lat, 'lng': 73.85},
+            'metrics': {'soc': {'value': soc, 'unit': '%'}, 'speed': {'value': speed, 'unit': 'kmph'}}}
+
+
+class RollupTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.vehicle = TrailVehicle.objects.create(vehicle_type='EKA 9', registration_no='MH 12 TR 0001', fleet='PMPML')
+        cls.device = User.objects.create_user(username='gw', email='gw@example.com', password='pw-12345-x', role='telemetry')
+
+    def _ingest(self, *points):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {UserRefreshToken.for_user(self.device).access_token}')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/telemetry/ingest/', {'trail_points': list(points)}, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return [query['sql'] for query in queries]
+
+    def _run(self):
+        output = StringIO()
+        call_command('run_rollups', stdout=output)
+        return output.getvalue()
+
+    def _distance(self):
+        return PerformanceStat.objects.get(key='total_distance').value
+
+    def test_ingestion_only_inserts(self):
+        statements = self._ingest(_point(18.52, 80), _point(18.53, 79))
+        self.assertFalse(any('users_rollupstate' in sql or 'users_performancestat' in sql for sql in statements))
+        self.assertFalse(RollupState.objects.exists())
+        self.assertFalse(PerformanceStat.objects.exists())
+
+    def test_runs_fold_only_new_points(self):
+        self._ingest(_point(18.52, 80), _point(18.53, 79))
+        self.assertIn('Rolled up 2 new trail points.', self._run())
+        self.assertEqual(self._distance(), '1 km')
+        state = RollupState.objects.get()
+        self.assertEqual(state.last_point_id, TrailDataPoint.objects.latest('id').id)
+        self.assertAlmostEqual(state.energy_kwh, 2.5)
+
+        self.assertIn('Rolled up 0 new trail points.', self._run())
+        self._ingest(_point(18.62, 70))
+        self.assertIn('Rolled up 1 new trail points.', self._run())
+        self.assertEqual(self._distance(), '11 km')
+
+    def test_watermark_stops_at_the_fence(self):
+        self._ingest(_point(18.52, 80), _point(18.53, 79), _point(18.54, 78))
+        _, second, third = TrailDataPoint.objects.order_by('id').values_list('id', flat=True)
+        state = RollupState.objects.create(name=rollups.FLEET)
+        self.assertEqual(rollups._fold(state, second, batch_size=1), 2)
+        self.assertEqual(state.last_point_id, second)
+        # A fence past ids that never became visible still moves the watermark over them.
+        self.assertEqual(rollups._fold(state, third + 10, batch_size=1), 1)
+        self.assertEqual(state.last_point_id, third + 10)
+
+    def test_rebuild_recomputes_from_all_points(self):
+        self._ingest(_point(18.52, 80), _point(18.53, 79))
+        self._run()
+        RollupState.objects.update(distance_km=1000)
+        call_command('run_rollups', '--rebuild', stdout=StringIO())
+        self.assertEqual(self._distance(), '1 km')
+
+    def test_rebuild_forgets_the_old_fence(self):
+        self._ingest(_point(18.52, 80), _point(18.53, 79))
+        self._run()
+        # As after the points were wiped and their ids restarted below the old fence.
+        RollupState.objects.update(last_point_id=1000, fence_point_id=1000)
+        rollups.rebuild()
+        state = RollupState.objects.get()
+        self.assertEqual(state.last_point_id, TrailDataPoint.objects.latest('id').id)
+        self.assertEqual(self._distance(), '1 km')
+        self._ingest(_point(18.62, 70))
+        self.assertIn('Rolled up 1 new trail points.', self._run())
+        self.assertEqual(self._distance(), '11 km')
+
+    def test_clearing_seeded_data_resets_the_rollups(self):
+        self._ingest(_point(18.52, 80), _point(18.62, 70))
+        self._run()
+        datagen.clear()
+        self.assertFalse(RollupState.objects.exists())
+        vehicle = TrailVehicle.objects.create(vehicle_type='EKA 9', registration_no='MH 12 TR 0001', fleet='PMPML')
+        self.assertGreater(vehicle.id, self.vehicle.id)
+        self._ingest(_point(18.52, 80), _point(18.53, 79))
+        self.assertIn('Rolled up 2 new trail points.', self._run())
+        self.assertEqual(self._distance(), '1 km')
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone as dt_timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from .. import slow_queries
+from ..authentication import UserRefreshToken
+from ..models import Report, SlowQuery, User, VehicleRegistration, VehicleType
+
+
+@override_settings(SLOW_QUERY_MS=0.000001, SLOW_QUERY_LOG_SIZE=5, SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS=60)
+class SlowQueryCaptureTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='u', email='u@example.com', password='pw-12345-x')
+        cls.access = str(UserRefreshToken.for_user(user).access_token)
+        registration = VehicleRegistration.objects.create(
+            vehicle_type=VehicleType.objects.create(name='Eka 9'), registration_number='MH 12 AB 0001')
+        Report.objects.create(registration=registration, report_type='Fault', name=datetime(2024, 1, 5, 10, tzinfo=dt_timezone.utc),
+                              col2='x', signal='s', signal0='0', signal1='1', signal2='2')
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        slow_queries._explained.clear()
+
+    def _get(self, path):
+        # The wrapper is installed when a connection opens; the test connection already is.
+        with connection.execute_wrapper(slow_queries.capture), self.captureOnCommitCallbacks(execute=True):
+            return self.client.get(path)
+
+    def test_records_view_location_sql_and_plan(self):
+        self.assertEqual(self._get('/api/reports/?report_type=Fault').status_code, 200)
+        entry = SlowQuery.objects.filter(sql__contains='"users_report"."report_type" = \'Fault\'').first()
+        self.assertIsNotNone(entry)
+        self.assertEqual(entry.view, 'ReportsAPI GET /api/reports/?report_type=Fault')
+        self.assertTrue(entry.location.startswith('users/'), entry.location)
+        self.assertTrue(entry.plan)
+        self.assertFalse(SlowQuery.objects.filter(sql__contains='users_slowquery').exists())
+
+    def test_explains_each_statement_once_per_interval(self):
+        self._get('/api/reports/?report_type=Fault')
+        self._get('/api/reports/?report_type=Fault')
+        plans = SlowQuery.objects.filter(sql__contains='COUNT(*)').values_list('plan', flat=True)
+        self.assertEqual(sorted(bool(plan) for plan in plans), [False, True])
+
+    def test_keeps_only_the_newest_entries(self):
+        for _ in range(4):
+            self._get('/api/reports/')
+        self.assertEqual(SlowQuery.objects.count(), 5)
+
+    def test_off_by_default(self):
+        with override_settings(SLOW_QUERY_MS=0):
+            self._get('/api/reports/')
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_command_lists_and_clears(self):
+        self._get('/api/reports/')
+        out = StringIO()
+        call_command('slow_queries', '--plans', stdout=out)
+        self.assertIn('ReportsAPI GET /api/reports/', out.getvalue())
+        call_command('slow_queries', '--clear', stdout=StringIO())
+        self.assertFalse(SlowQuery.objects.exists())
@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+
+from ..authentication import STREAM_TICKET_KEY, StreamTicketAuthentication, UserRefreshToken
+from ..models import User
+from ..views import StreamTicketAPI
+
+
+class StreamTicketTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='u', email='u@example.com', password='pw-12345-x')
+
+    def setUp(self):
+        self.access = str(UserRefreshToken.for_user(self.user).access_token)
+
+    def _issue(self, **headers):
+        request = APIRequestFactory().post('/api/vehicle-stream/ticket/', **headers)
+        return StreamTicketAPI.as_view()(request)
+
+    def _authenticate(self, query):
+        return StreamTicketAuthentication().authenticate(Request(APIRequestFactory().get(f'/api/vehicle-stream/?{query}')))
+
+    def test_tickets_need_an_authenticated_caller(self):
+        self.assertEqual(self._issue().status_code, 401)
+
+    def test_a_ticket_opens_the_stream_once(self):
+        response = self._issue(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        self.assertEqual(response.status_code, 201)
+        ticket = response.data['ticket']
+        self.assertNotIn(self.access, ticket)
+        user, _ = self._authenticate(f'ticket={ticket}')
+        self.assertEqual(user.id, self.user.id)
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(f'ticket={ticket}')
+
+    def test_expired_or_unknown_tickets_are_rejected(self):
+        ticket = self._issue(HTTP_AUTHORIZATION=f'Bearer {self.access}').data['ticket']
+        cache.delete(STREAM_TICKET_KEY.format(ticket))
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate(f'ticket={ticket}')
+        with self.assertRaises(AuthenticationFailed):
+            self._authenticate('ticket=made-up')
+
+    def test_access_tokens_are_not_accepted_in_the_url(self):
+        self.assertIsNone(self._authenticate(f'token={self.access}'))
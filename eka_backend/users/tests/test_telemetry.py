@@ -0,0 +1,97 @@
+from rest_framework.test import APITestCase
+
+from .. import telemetry
+from ..authentication import UserRefreshToken
+from ..models import (TrailAvailability, TrailDataPoint, TrailVehicle, User, Vehicle, VehicleChartData,
+                      VehicleRegistration, VehicleSummary, VehicleType)
+
+CHART = {'labels': ['00:00', '00:15'], 'series': [{'name': 'Voltage', 'data': [24.5, 25]}]}
+
+
+def _point(**overrides):
+    return {'registration_no': 'MH 12 TR 0001', 'date': '2024-01-05',
+            'coordinates': {'lat': 18.52, 'lng': 73.85}, 'metrics': {'speed': {'value': 30, 'unit': 'kmph'}},
+            **overrides}
+
+
+class TelemetryIngestTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        TrailVehicle.objects.create(vehicle_type='EKA 9', registration_no='MH 12 TR 0001', fleet='PMPML')
+        VehicleRegistration.objects.create(vehicle_type=VehicleType.objects.create(name='Eka 9'),
+                                           registration_number='MH 12 AB 0001')
+        cls.vehicle = Vehicle.objects.create(summary=VehicleSummary.objects.create(fleet_type='Eka 9'), name='Eka 9 #1',
+                                             rating='4.5', speed=0, soc=50, range=80, temp=30, address='Pune')
+        cls.device = User.objects.create_user(username='gw', email='gw@example.com', password='pw-12345-x', role='telemetry')
+        cls.owner = User.objects.create_user(username='fo', email='fo@example.com', password='pw-12345-x')
+
+    def _post(self, payload, user=None):
+        token = UserRefreshToken.for_user(user or self.device).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return self.client.post('/api/telemetry/ingest/', payload, format='json')
+
+    def test_stores_a_valid_batch(self):
+        response = self._post({
+            'trail_points': [_point(), _point(coordinates={'lat': 18.53, 'lng': 73.86})],
+            'chart_data': [{'registration_number': 'MH 12 AB 0001', 'date': '2024-01-05', 'battery_data': CHART}],
+            'vehicle_states': [{'id': self.vehicle.id, 'speed': 42, 'soc': 61}],
+        })
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()['created'], {'trail_points': 2, 'chart_data': 1, 'vehicle_states': 1})
+        self.assertEqual(TrailDataPoint.objects.count(), 2)
+        self.assertEqual(TrailAvailability.objects.count(), 1)
+        self.assertEqual(VehicleChartData.objects.get().get_charts()['battery_data'], CHART)
+        self.vehicle.refresh_from_db()
+        self.assertEqual((self.vehicle.speed, self.vehicle.soc), (42, 61))
+
+    def test_rejects_the_whole_batch_with_per_row_errors(self):
+        response = self._post({'trail_points': [
+            _point(),
+            _point(registration_no='UNKNOWN'),
+            _point(date='2024-1-5x'),
+            _point(coordinates={'lat': True, 'lng': 73.85}),
+            _point(coordinates={'lat': 91, 'lng': 73.85}),
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.json()['trail_points']), ['1', '2', '3', '4'])
+        self.assertFalse(TrailDataPoint.objects.exists())
+
+    def test_rejects_non_finite_coordinates(self):
+        for value in (float('nan'), float('inf'), -float('inf')):
+            with self.subTest(value=value), self.assertRaises(telemetry.ValidationError):
+                telemetry.build_trail_points([_point(coordinates={'lat': 18.5, 'lng': value})])
+
+    def test_rejects_ragged_chart_series(self):
+        ragged = {'labels': ['00:00'], 'series': [{'name': 'Voltage', 'data': [1, 2]}]}
+        response = self._post({
+            'chart_data': [{'registration_number': 'MH 12 AB 0001', 'date': '2024-01-05', 'battery_data': ragged}],
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('chart_data', response.json())
+        self.assertFalse(VehicleChartData.objects.exists())
+
+    def test_rejects_bool_state_values(self):
+        response = self._post({'vehicle_states': [{'id': self.vehicle.id, 'speed': True}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('vehicle_states', response.json())
+        self.vehicle.refresh_from_db()
+        self.assertEqual(self.vehicle.speed, 0)
+
+    def test_rejects_bool_vehicle_ids(self):
+        # true == 1 in Python, so make sure there is a vehicle 1 it could be mistaken for.
+        if not Vehicle.objects.filter(id=1).exists():
+            Vehicle.objects.create(id=1, summary=self.vehicle.summary, name='Eka 9 #0', rating='4.5', speed=0,
+                                   soc=50, range=80, temp=30, address='Pune')
+        response = self._post({'vehicle_states': [{'id': True, 'speed': 42}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('vehicle_states', response.json())
+        self.assertEqual(Vehicle.objects.get(id=1).speed, 0)
+
+    def test_only_device_accounts_may_ingest(self):
+        self.assertEqual(self._post({'trail_points': [_point()]}, user=self.owner).status_code, 403)
+        self.assertFalse(TrailDataPoint.objects.exists())
+
+    def test_device_role_cannot_be_chosen_at_sign_up(self):
+        response = self.client.post('/api/auth/register/', {
+            'username': 'x', 'email': 'x@example.com', 'password': 'pw-12345-x', 'role': 'telemetry'}, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,74 @@
+import math
+from datetime import date
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from rest_framework.test import APITestCase
+
+from .. import geometry
+from ..authentication import UserRefreshToken
+from ..cache import trail_namespace, versioned_key
+from ..models import TrailDataPoint, TrailVehicle, User
+
+DAY = date(2024, 1, 5)
+
+
+def _distance_to_segment(point, start, end, scale):
+    px, py = (point['lng'] - start['lng']) * scale, point['lat'] - start['lat']
+    dx, dy = (end['lng'] - start['lng']) * scale, end['lat'] - start['lat']
+    t = max(0, min(1, (px * dx + py * dy) / (dx * dx + dy * dy))) if dx or dy else 0
+    return math.hypot(px - t * dx, py - t * dy)
+
+
+class SimplifyTests(SimpleTestCase):
+    def test_keeps_both_ends_and_drops_collinear_points(self):
+        line = [{'lat': 18.5 + i * 0.001, 'lng': 73.8 + i * 0.001} for i in range(50)]
+        self.assertEqual(geometry.simplify(line, 1e-6), [line[0], line[-1]])
+
+    def test_every_dropped_point_is_within_tolerance_of_the_result(self):
+        path = [{'lat': 18.5 + i * 0.0005, 'lng': 73.8 + 0.002 * math.sin(i / 3)} for i in range(300)]
+        tolerance = 0.0004
+        kept = geometry.simplify(path, tolerance)
+        self.assertLess(len(kept), len(path))
+        self.assertEqual((kept[0], kept[-1]), (path[0], path[-1]))
+        scale = math.cos(math.radians(path[0]['lat']))
+        indexes = [path.index(point) for point in kept]
+        self.assertEqual(indexes, sorted(indexes))
+        for start, end in zip(indexes, indexes[1:]):
+            for point in path[start + 1:end]:
+                self.assertLessEqual(_distance_to_segment(point, path[start], path[end], scale), tolerance + 1e-12)
+
+    def test_short_paths_and_zero_tolerance_are_returned_whole(self):
+        path = [{'lat': 18.5, 'lng': 73.8}, {'lat': 18.6, 'lng': 73.9}]
+        self.assertEqual(geometry.simplify(path, 1), path)
+        self.assertEqual(len(geometry.simplify(path * 3, 0)), 6)
+
+    def test_zoom_tolerance_halves_per_level(self):
+        self.assertAlmostEqual(geometry.zoom_tolerance(11, 18.5) * 2, geometry.zoom_tolerance(10, 18.5))
+
+
+class TrailsParamsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='u', email='u@example.com', password='pw-12345-x')
+        cls.vehicle = TrailVehicle.objects.create(vehicle_type='EKA 9', registration_no='MH 12 TR 0001', fleet='PMPML')
+        TrailDataPoint.objects.bulk_create(
+            TrailDataPoint(vehicle=cls.vehicle, date=DAY, coordinates={'lat': 18.5 + i * 0.001, 'lng': 73.8})
+            for i in range(10)
+        )
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {UserRefreshToken.for_user(self.user).access_token}')
+
+    def test_equivalent_parameters_share_one_cache_entry(self):
+        key = versioned_key(trail_namespace(self.vehicle.id, DAY), 'zoom', 12)
+        cache.delete(key)
+        response = self.client.get(f'/api/trails/?vehicle_id=0{self.vehicle.id}&date=2024-01-05&zoom=12')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(cache.get(key), response.json())
+        self.assertEqual(len(response.json()['trail_path']), 2)
+
+    def test_malformed_parameters_are_rejected(self):
+        for query in ('vehicle_id=x&date=2024-01-05', f'vehicle_id={self.vehicle.id}&date=05-01-2024',
+                      f'vehicle_id={self.vehicle.id}&date=2024-01-05&zoom=30'):
+            self.assertEqual(self.client.get(f'/api/trails/?{query}').status_code, 400, query)
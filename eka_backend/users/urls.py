@@ -1,12 +1,23 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
 from .views import (
-    LoginAPI, LogoutAPI, RegisterAPI, UserProfileAPI, DashboardStatsAPI, 
-    VehicleSelectionAPI, VehicleAnalysisAPI, TrailsAPI, ReportsAPI, UserListAPI, HealthCheckAPI
+    LoginAPI, LoginStatsAPI, LogoutAPI, RegisterAPI, UserProfileAPI, DashboardStatsAPI, 
+    VehicleSelectionAPI, VehicleAnalysisAPI, TrailsAPI, ReportsAPI, UserListAPI, HealthCheckAPI,
+    TelemetryIngestAPI, VehicleSummaryStatsAPI, ReadinessAPI, MetricsAPI, StreamTicketAPI
 )
 
+# Under ASGI the I/O-heavy endpoints (and login, which waits on the hashing pool)
+# are served by their async versions.
+if settings.ASYNC_VIEWS:
+    from .async_views import (
+        AsyncHealthCheckAPI as HealthCheckAPI, AsyncLoginAPI as LoginAPI, AsyncReportsAPI as ReportsAPI,
+        AsyncTrailsAPI as TrailsAPI, AsyncVehicleAnalysisAPI as VehicleAnalysisAPI, VehicleStateStreamAPI,
+    )
+
 urlpatterns = [
     path('auth/login/', LoginAPI.as_view(), name='login'),
+    path('auth/login/stats/', LoginStatsAPI.as_view(), name='login-stats'),
     path('auth/logout/', LogoutAPI.as_view(), name='logout'), 
     path('auth/register/', RegisterAPI.as_view(), name='register'),
     path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -14,10 +25,21 @@ urlpatterns = [
     path('auth/me/', UserProfileAPI.as_view(), name='user-profile'),
     path('users/list/', UserListAPI.as_view(), name='user-list'), 
      path('health/', HealthCheckAPI.as_view(), name='health-check'),
+    path('ready/', ReadinessAPI.as_view(), name='readiness'),
+    path('metrics/', MetricsAPI.as_view(), name='metrics'),
 
     path('dashboard-stats/', DashboardStatsAPI.as_view(), name='dashboard-stats'),
     path('vehicle-selection/', VehicleSelectionAPI.as_view(), name='vehicle-selection'),
+    path('vehicle-summary-stats/', VehicleSummaryStatsAPI.as_view(), name='vehicle-summary-stats'),
     path('vehicle-analysis/', VehicleAnalysisAPI.as_view(), name='vehicle-analysis'),
     path('trails/', TrailsAPI.as_view(), name='trails'),
     path('reports/', ReportsAPI.as_view(), name='reports'),
-]
\ No newline at end of file
+    path('telemetry/ingest/', TelemetryIngestAPI.as_view(), name='telemetry-ingest'),
+]
+
+# The live stream holds its connection open, so it is only offered on the ASGI path.
+if settings.ASYNC_VIEWS:
+    urlpatterns += [
+        path('vehicle-stream/', VehicleStateStreamAPI.as_view(), name='vehicle-stream'),
+        path('vehicle-stream/ticket/', StreamTicketAPI.as_view(), name='vehicle-stream-ticket'),
+    ]
\ No newline at end of file
@@ -1,38 +1,68 @@
-from django.contrib.auth import get_user_model, authenticate
-from django.db.models.functions import TruncDate
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Avg, Count, Sum
+from django.http import HttpResponse, StreamingHttpResponse
 from rest_framework import generics, permissions, status
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import TokenError
-from rest_framework_simplejwt.tokens import RefreshToken
 from datetime import datetime
+from time import perf_counter
 
-from .models import (FleetVehicle, PerformanceStat, Report, TrailDataPoint,
-                     TrailVehicle, VehicleChartData, VehicleSummary,
-                     VehicleType)
-from .serializers import (RegisterSerializer, ReportSerializer,
-                          TrailVehicleSerializer, UserSerializer,
+from .authentication import UserRefreshToken, issue_stream_ticket
+from .login_pool import LoginPoolSaturated, login_pool
+from .models import (FleetVehicle, PerformanceStat, Report, ReportFacet,
+                     TrailDataPoint, VehicleChartData, VehicleRegistration,
+                     VehicleSummary, VehicleType)
+from .pagination import ReportKeysetPagination, ReportPagination
+from .permissions import CanIngestTelemetry, HasMetricsToken
+from .renderers import FastJSONRenderer
+from .replicas import ReplicaReadsMixin, primary_reads
+from .serializers import (RegisterSerializer, ReportSerializer, UserSerializer,
                           VehicleChartDataSerializer, FleetVehicleSerializer,
-                          VehicleSummarySerializer, VehicleTypeSerializer)
+                          VehicleSummarySerializer)
+from . import availability, downsampling, exports, geometry, metrics, telemetry, warmup
+from .cache import (DASHBOARD, FILTERS, VEHICLE_SELECTION, cached_response, chart_namespace,
+                    get_or_build, trail_namespace, versioned_key)
 
 User = get_user_model()
 
+def _id_and_day(raw_id, raw_date):
+    """(int id, date) from query parameters, so '7' / '07' and the same day always build the same cache key."""
+    return int(raw_id), datetime.strptime(raw_date, '%Y-%m-%d').date()
+
 class LoginAPI(APIView):
     permission_classes = [permissions.AllowAny]
     def post(self, request, *args, **kwargs):
-        email = request.data.get('email')
-        password = request.data.get('password')
-        user = authenticate(username=email, password=password)
+        try:
+            user = login_pool.authenticate(username=request.data.get('email'), password=request.data.get('password'))
+        except LoginPoolSaturated:
+            return self._saturated()
+        return self._login_response(user)
+
+    def _saturated(self):
+        return Response({'error': 'Too many logins in progress, please retry shortly.'},
+                        status=status.HTTP_429_TOO_MANY_REQUESTS,
+                        headers={'Retry-After': str(settings.LOGIN_RETRY_AFTER_SECONDS)})
+
+    def _login_response(self, user):
         if not user:
             return Response({'error': 'Invalid Credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-        refresh = RefreshToken.for_user(user)
+        refresh = UserRefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
             'access': str(refresh.access_token),
         })
 
+class LoginStatsAPI(APIView):
+    """Login pool load for this worker process: queue depth, rejections and latency percentiles."""
+    permission_classes = [permissions.IsAdminUser]
+    def get(self, request, *args, **kwargs):
+        return Response(login_pool.stats())
+
 class LogoutAPI(APIView):
     permission_classes = [permissions.IsAuthenticated]
     def post(self, request, *args, **kwargs):
@@ -40,7 +70,7 @@ class LogoutAPI(APIView):
         if not refresh_token:
             return Response({'error': 'Refresh token is required.'}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            token = RefreshToken(refresh_token)
+            token = UserRefreshToken(refresh_token)
             token.blacklist()
             return Response(status=status.HTTP_204_NO_CONTENT)
         except TokenError:
@@ -64,13 +94,17 @@ class UserListAPI(generics.ListAPIView):
 
 class DashboardStatsAPI(APIView):
     permission_classes = [permissions.IsAuthenticated]
+    @cached_response(DASHBOARD)
     def get(self, request, *args, **kwargs):
+        return Response(self.dashboard_data())
+    @staticmethod
+    def dashboard_data():
         fleet_vehicles = FleetVehicle.objects.all()
         performance_stats_qs = PerformanceStat.objects.values('key', 'value')
-        return Response({
+        return {
             'fleet_stats': FleetVehicleSerializer(fleet_vehicles, many=True).data,
             'performance_stats': {stat['key']: stat['value'] for stat in performance_stats_qs}
-        })
+        }
 
 class VehicleSelectionAPI(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -81,6 +115,7 @@ class VehicleSelectionAPI(generics.RetrieveAPIView):
         if fleet_type_query:
             return generics.get_object_or_404(self.get_queryset(), fleet_type=fleet_type_query)
         return self.get_queryset().first()
+    @cached_response(VEHICLE_SELECTION)
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         if not instance:
@@ -88,52 +123,177 @@ class VehicleSelectionAPI(generics.RetrieveAPIView):
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
 
-class VehicleAnalysisAPI(APIView):
+class VehicleSummaryStatsAPI(APIView):
+    """
+    Fleet-wide totals (and the average energy consumption) plus per-type
+    figures for VehicleSummary, aggregated in the database.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    averaged = ('avg_energy_consumption',)
+    @cached_response(VEHICLE_SELECTION)
+    def get(self, request, *args, **kwargs):
+        return Response(self.summary_stats())
+    @classmethod
+    def summary_stats(cls):
+        metrics = list(VehicleSummary.METRIC_UNITS)
+        fleet = VehicleSummary.objects.aggregate(
+            fleet_types=Count('id'),
+            **{field: Avg(field) if field in cls.averaged else Sum(field) for field in metrics},
+        )
+        by_type = VehicleSummary.objects.values('fleet_type', *metrics).order_by('fleet_type')
+        return {
+            'units': VehicleSummary.METRIC_UNITS,
+            'fleet': fleet,
+            'by_type': list(by_type),
+        }
+
+class VehicleAnalysisAPI(ReplicaReadsMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request, *args, **kwargs):
         if 'fetch_filters' in request.query_params or not request.query_params:
-            vehicle_types = VehicleType.objects.prefetch_related('registrations__chart_data').all()
-            return Response({"filters": VehicleTypeSerializer(vehicle_types, many=True).data})
-        reg_id = request.query_params.get('registration_id')
-        date = request.query_params.get('date')
+            return Response({"filters": availability.chart_filters()})
+        params = self._chart_params(request.query_params)
+        if isinstance(params, Response):
+            return params
+        reg_id, date, max_points = params
+        if max_points is None:
+            chart_data = generics.get_object_or_404(VehicleChartData, registration_id=reg_id, date=date)
+            return Response({"charts": VehicleChartDataSerializer(chart_data).data})
+        # Downsampled charts are cached per (registration, date, max_points); writes to that day bump the version.
+        # Misses are read from the primary so a lagging replica can't fill the new version with old data.
+        key = versioned_key(chart_namespace(reg_id, date), max_points)
+        charts = cache.get(key)
+        if charts is None:
+            with primary_reads():
+                chart_data = generics.get_object_or_404(VehicleChartData, registration_id=reg_id, date=date)
+            charts = downsampling.downsample_charts(VehicleChartDataSerializer(chart_data).data, max_points)
+            cache.set(key, charts, timeout=settings.CHART_CACHE_TIMEOUT)
+        return Response({"charts": charts})
+
+    def _chart_params(self, params):
+        """(registration_id, date, max_points or None), or the 400 response for bad parameters."""
+        reg_id = params.get('registration_id')
+        date = params.get('date')
         if not reg_id or not date:
             return Response({'error': 'registration_id and date parameters are required.'}, status=status.HTTP_400_BAD_REQUEST)
-        chart_data = generics.get_object_or_404(VehicleChartData, registration_id=reg_id, date=date)
-        return Response({"charts": VehicleChartDataSerializer(chart_data).data})
+        try:
+            reg_id, date = _id_and_day(reg_id, date)
+        except ValueError:
+            return Response({'error': 'registration_id must be an integer and date a YYYY-MM-DD date.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        max_points = params.get('max_points')
+        if max_points is None:
+            return reg_id, date, None
+        try:
+            max_points = int(max_points)
+            if max_points < 3:
+                raise ValueError(max_points)
+        except ValueError:
+            return Response({'error': 'max_points must be an integer of at least 3.'}, status=status.HTTP_400_BAD_REQUEST)
+        return reg_id, date, max_points
 
-class TrailsAPI(APIView):
+class TrailsAPI(ReplicaReadsMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     def get(self, request, *args, **kwargs):
         if 'fetch_filters' in request.query_params or not request.query_params:
-            trail_vehicles = TrailVehicle.objects.prefetch_related('trail_data').all()
-            return Response({"filters": TrailVehicleSerializer(trail_vehicles, many=True).data})
-        vehicle_id = request.query_params.get('vehicle_id')
-        date = request.query_params.get('date')
+            return Response({"filters": availability.trail_filters()})
+        params = self._trail_params(request.query_params)
+        if isinstance(params, Response):
+            return params
+        vehicle_id, date, level = params
+        if level is None:
+            data = self._trail(vehicle_id, date, None)
+        else:
+            # Simplified paths are cached per (vehicle, date, level); new points for the day bump the version.
+            key = versioned_key(trail_namespace(vehicle_id, date), *level)
+            data = cache.get(key)
+            if data is None:
+                with primary_reads():
+                    data = self._trail(vehicle_id, date, level)
+                if data is not None:
+                    cache.set(key, data, timeout=settings.TRAIL_CACHE_TIMEOUT)
+        if data is None:
+            return self._not_found()
+        return Response(data)
+
+    def _trail_params(self, params):
+        """(vehicle_id, date, simplification level or None), or the 400 response for bad parameters."""
+        vehicle_id = params.get('vehicle_id')
+        date = params.get('date')
         if not vehicle_id or not date:
             return Response({'error': 'vehicle_id and date parameters are required.'}, status=status.HTTP_400_BAD_REQUEST)
-        trail_points = TrailDataPoint.objects.filter(vehicle_id=vehicle_id, date=date)
-        first_point = trail_points.first()
+        try:
+            vehicle_id, date = _id_and_day(vehicle_id, date)
+        except ValueError:
+            return Response({'error': 'vehicle_id must be an integer and date a YYYY-MM-DD date.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return vehicle_id, date, self._simplification_level(params)
+        except ValueError:
+            return Response({'error': 'zoom must be an integer between 0 and 22 and tolerance a positive number.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    def _not_found(self):
+        return Response({"error": "No trail data found for the specified vehicle and date."}, status=status.HTTP_404_NOT_FOUND)
+
+    def _simplification_level(self, params):
+        """('zoom', z) or ('tolerance', degrees) when the client asked for a simplified path."""
+        if 'zoom' in params:
+            zoom = int(params['zoom'])
+            if not 0 <= zoom <= 22:
+                raise ValueError(zoom)
+            return ('zoom', zoom)
+        if 'tolerance' in params:
+            tolerance = float(params['tolerance'])
+            if not tolerance > 0:
+                raise ValueError(tolerance)
+            return ('tolerance', tolerance)
+        return None
+
+    def _trail_points(self, vehicle_id, date):
+        return TrailDataPoint.objects.filter(vehicle_id=vehicle_id, date=date).order_by('id')
+
+    def _trail(self, vehicle_id, date, level):
+        trail_points = self._trail_points(vehicle_id, date)
+        first_point = trail_points.only('metrics', 'ecu_data').first()
         if not first_point:
-            return Response({"error": "No trail data found for the specified vehicle and date."}, status=status.HTTP_404_NOT_FOUND)
-        return Response({
+            return None
+        return self._trail_data(first_point, list(trail_points.values_list('coordinates', flat=True)), level)
+
+    def _trail_data(self, first_point, path, level):
+        if level is not None:
+            kind, value = level
+            tolerance = geometry.zoom_tolerance(value, path[0]['lat']) if kind == 'zoom' else value
+            path = geometry.simplify(path, tolerance)
+        return {
             "metrics": first_point.metrics,
             "ecu_data": first_point.ecu_data,
-            "trail_path": [p.coordinates for p in trail_points]
-        })
+            "trail_path": path,
+        }
 
-class ReportsAPI(generics.ListAPIView):
+class TelemetryIngestAPI(APIView):
+    """
+    Accepts batches of trail points, daily chart data and live vehicle state
+    in one request: {"trail_points": [...], "chart_data": [...],
+    "vehicle_states": [...]}. The whole batch is validated up front and
+    written in a single transaction. Only telemetry device accounts (and
+    superusers) may post.
+    """
+    permission_classes = [CanIngestTelemetry]
+    def post(self, request, *args, **kwargs):
+        created = telemetry.ingest(request.data)
+        return Response({'created': created}, status=status.HTTP_201_CREATED)
+
+class ReportsAPI(ReplicaReadsMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ReportSerializer
-    
-    # --- PAGINATION CONFIGURATION ADDED HERE ---
-    pagination_class = PageNumberPagination
-    # Set a default page size
-    pagination_class.page_size = 10 
-    # Allow the frontend to override the page size with a 'page_size' query param
-    pagination_class.page_size_query_param = 'page_size'
+    # Page-number pagination by default; `?pagination=cursor` (or any `cursor`
+    # param) switches to keyset pagination, which stays fast at any depth.
+    pagination_class = ReportPagination
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
 
     def get_queryset(self):
-        queryset = Report.objects.select_related('registration__vehicle_type').all().order_by('-name')
+        queryset = Report.objects.select_related('registration__vehicle_type').all().order_by('-name', '-id')
         
         start_date_str = self.request.query_params.get('start_date')
         end_date_str = self.request.query_params.get('end_date')
@@ -158,24 +318,103 @@ class ReportsAPI(generics.ListAPIView):
     def get(self, request, *args, **kwargs):
         if 'fetch_filters' in request.query_params:
             return self._get_filter_options()
+        if 'export' in request.query_params:
+            return self._export(request.query_params['export'])
+        if 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor':
+            self.pagination_class = ReportKeysetPagination
         return self.list(request, *args, **kwargs)
 
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_rows_queryset())
+        return self.get_paginated_response(self.format_page(page))
+
+    def get_rows_queryset(self):
+        # Pages are read as values() rows and formatted like ReportSerializer
+        # (exports.format_report), which costs a fraction of serializing instances.
+        return exports.report_values(self.filter_queryset(self.get_queryset()))
+
+    @staticmethod
+    def format_page(rows):
+        started = perf_counter()
+        try:
+            return [exports.format_report(row) for row in rows]
+        finally:
+            metrics.record_serialization(perf_counter() - started)
+
+    def _export(self, export_format):
+        """Streams every report matching the filters as CSV or NDJSON, unpaginated."""
+        if export_format not in exports.EXPORT_FORMATS:
+            return Response({'error': f"export must be one of: {', '.join(exports.EXPORT_FORMATS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        rows = exports.report_rows(self.get_queryset())
+        response = StreamingHttpResponse(exports.stream(export_format, rows),
+                                         content_type=exports.EXPORT_FORMATS[export_format][0])
+        response['Content-Disposition'] = f'attachment; filename="reports.{export_format}"'
+        return response
+
     def _get_filter_options(self):
-        filters = {
-            "reportTypes": Report.objects.values_list('report_type', flat=True).distinct(),
-            "vehicleTypes": VehicleType.objects.values_list('name', flat=True).distinct(),
-            "registrations": {
-                vt.name: list(vt.registrations.values_list('registration_number', flat=True)) 
-                for vt in VehicleType.objects.prefetch_related('registrations').all()
-            },
-            "dates": Report.objects.annotate(date_only=TruncDate('name'))
-                                .values_list('date_only', flat=True).distinct().order_by('-date_only'),
+        return Response(self.filter_options())
+
+    def filter_options(self):
+        return get_or_build(FILTERS, 'reports', lambda: self._filter_options(*self._filter_querysets()))
+
+    def _filter_querysets(self):
+        # Report types and dates come from the small ReportFacet table, never from Report itself.
+        return (
+            VehicleType.objects.values_list('name', flat=True).order_by('id'),
+            VehicleRegistration.objects.values_list('vehicle_type__name', 'registration_number').order_by('id'),
+            ReportFacet.objects.values_list('report_type', flat=True).distinct().order_by('report_type'),
+            ReportFacet.objects.values_list('date', flat=True).distinct().order_by('-date'),
+        )
+
+    def _filter_options(self, vehicle_types, registration_rows, report_types, dates):
+        vehicle_types = list(vehicle_types)
+        registrations = {name: [] for name in vehicle_types}
+        for type_name, reg_no in registration_rows:
+            registrations[type_name].append(reg_no)
+        return {
+            "reportTypes": list(report_types),
+            "vehicleTypes": vehicle_types,
+            "registrations": registrations,
+            "dates": list(dates),
         }
-        return Response(filters)
+class StreamTicketAPI(APIView):
+    """
+    Exchanges the caller's access token for a short-lived, single-use ticket
+    to open the live vehicle stream with (?ticket=, see
+    StreamTicketAuthentication).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    def post(self, request, *args, **kwargs):
+        return Response({'ticket': issue_stream_ticket(str(request.auth)), 'expires_in': settings.STREAM_TICKET_TTL},
+                        status=status.HTTP_201_CREATED)
+
 class HealthCheckAPI(APIView):
     """
     A simple endpoint that returns a 200 OK status if the API is running.
     """
     permission_classes = [permissions.AllowAny]
     def get(self, request, *args, **kwargs):
-        return Response({"status": "ok"}, status=status.HTTP_200_OK)    
\ No newline at end of file
+        return Response({"status": "ok"}, status=status.HTTP_200_OK)
+
+class MetricsAPI(APIView):
+    """
+    Request metrics in the Prometheus text format (users.metrics), for a
+    scraper inside the cluster presenting settings.METRICS_TOKEN.
+    """
+    permission_classes = [HasMetricsToken]
+    authentication_classes = []
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class ReadinessAPI(APIView):
+    """
+    200 once this worker has finished warming up (users.warmup), 503 before.
+    A probe that finds the worker cold starts the warmup in the background.
+    """
+    permission_classes = [permissions.AllowAny]
+    def get(self, request, *args, **kwargs):
+        if warmup.is_ready():
+            return Response({"status": "ready"}, status=status.HTTP_200_OK)
+        warmup.start_in_background()
+        return Response({"status": "warming up"}, status=status.HTTP_503_SERVICE_UNAVAILABLE)    
\ No newline at end of file
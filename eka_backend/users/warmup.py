@@ -0,0 +1,111 @@
+"""
+Worker warmup and readiness.
+
+gunicorn.conf.py loads the application in the gunicorn master before
+forking (preload_app) and calls preload() there, so URLconf, views,
+serializers, model metadata and the DRF/JWT classes are imported once and
+shared copy-on-write instead of on each worker's first request. preload()
+never touches the database: connections must not be opened before the fork.
+
+Each worker then runs warm_up() before accepting traffic: it connects to the
+database, builds this process's refresh-token blacklist filter and primes
+the shared cache with the hot responses (dashboard, vehicle selection and
+every filter list). Entries another worker already cached are left alone,
+so a fleet of workers starting together does the work once. /api/ready/
+reports ready only after warm_up() has completed; a cold worker (e.g. under
+runserver, or after a failed warmup) warms up in the background when probed.
+"""
+import logging
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, connections
+from django.http import QueryDict
+from django.urls import get_resolver
+from rest_framework.settings import api_settings
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+_lock = threading.Lock()
+_thread_lock = threading.Lock()
+_thread = None
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def preload():
+    """Imports and builds everything loaded lazily on first request; no database access."""
+    # Resolving the URLconf imports every view (and through them serializers and helpers).
+    get_resolver().reverse_dict
+    for model in apps.get_models():
+        model._meta.get_fields()
+    for name in ('DEFAULT_AUTHENTICATION_CLASSES', 'DEFAULT_PERMISSION_CLASSES',
+                 'DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES'):
+        getattr(api_settings, name)
+
+
+def warm_up():
+    """Preloads, connects and primes the caches; marks the worker ready. Safe to call repeatedly."""
+    from . import availability
+    from .blacklist import blacklist_filter
+    from .views import ReportsAPI
+
+    with _lock:
+        if _ready.is_set():
+            return
+        started = time.monotonic()
+        preload()
+        connection.ensure_connection()
+        blacklist_filter.might_contain('')
+        availability.chart_filters()
+        availability.trail_filters()
+        ReportsAPI().filter_options()
+        _prime_responses()
+        if settings.ASYNC_VIEWS:
+            # Async views query from sync_to_async's worker thread, never this one.
+            connection.close()
+        _ready.set()
+        logger.info('Worker warmed up in %.2fs', time.monotonic() - started)
+
+
+def _prime_responses():
+    from .cache import DASHBOARD, VEHICLE_SELECTION, warm_response
+    from .serializers import VehicleSummarySerializer
+    from .views import DashboardStatsAPI, VehicleSelectionAPI, VehicleSummaryStatsAPI
+
+    warm_response(DASHBOARD, DashboardStatsAPI.get, DashboardStatsAPI.dashboard_data)
+    warm_response(VEHICLE_SELECTION, VehicleSummaryStatsAPI.get, VehicleSummaryStatsAPI.summary_stats)
+    summaries = VehicleSelectionAPI.queryset.all()
+    first = summaries.first()
+    if first is not None:
+        warm_response(VEHICLE_SELECTION, VehicleSelectionAPI.retrieve, lambda: VehicleSummarySerializer(first).data)
+    for summary in summaries:
+        query = QueryDict(mutable=True)
+        query['fleet_type'] = summary.fleet_type
+        warm_response(VEHICLE_SELECTION, VehicleSelectionAPI.retrieve,
+                      lambda: VehicleSummarySerializer(summary).data, query)
+
+
+def _warm_up_logged():
+    try:
+        warm_up()
+    except Exception:
+        logger.exception('Worker warmup failed; it is retried on the next readiness probe')
+    finally:
+        # Runs outside the request cycle, so release this thread's connections.
+        connections.close_all()
+
+
+def start_in_background():
+    """Starts warm_up() in a thread unless the worker is ready or already warming up."""
+    global _thread
+    with _thread_lock:
+        if _ready.is_set() or (_thread is not None and _thread.is_alive()):
+            return
+        _thread = threading.Thread(target=_warm_up_logged, name='warmup', daemon=True)
+        _thread.start()